@@ -1,13 +1,15 @@
 # app.py — Interfaz Streamlit para el sistema predictivo de anemia
 import streamlit as st
 import pandas as pd
-import joblib
+import io
 import json
 import os
 from src import config
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from src.inference import find_pipeline_path, load_pipeline
+from src.prediction_cache import PredictionCache
+from src.explanations import ContributionExplainer
+from src.geo_rollups import ROLLUP_PATH, SEGMENTS, RollupStore
+from src.profiling import StepMetrics
 
 # ===== CONFIGURACIÓN GENERAL =====
 st.set_page_config(
@@ -19,57 +21,114 @@ st.set_page_config(
 st.title("Sistema Predictivo de Anemia — Perú 2025")
 st.markdown("**Para niños menores de 5 años**")
 
-# ===== CARGA DE MODELOS Y MAPEOS =====
-base_dir = os.getcwd()
+# ===== CARGA DE MODELOS (con caché entre reruns y sesiones) =====
+def _mtime(path):
+    """Parte de la clave de caché: si el artefacto cambia en disco, se vuelve a cargar."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@st.cache_resource(max_entries=4, show_spinner="Cargando modelo...")
+def cargar_pipeline(path, mtime):
+    return load_pipeline(path)
+
+
+@st.cache_resource(max_entries=4)
+def obtener_cache(model_name, version):
+    """Una caché de predicciones por modelo y versión, compartida entre sesiones."""
+    return PredictionCache(model_name, version)
+
+
+@st.cache_resource(max_entries=4)
+def obtener_explicador(path, mtime):
+    """Explicador TreeSHAP del pipeline; None si el modelo no es XGBoost."""
+    pipeline = cargar_pipeline(path, mtime)
+    return ContributionExplainer(pipeline) if hasattr(pipeline.model, "get_booster") else None
+
+
+@st.cache_resource
+def _abrir_agregados(path):
+    return RollupStore(path)
+
+
+@st.cache_resource
+def obtener_metricas():
+    """Mediciones de la app en memoria, compartidas entre sesiones (se escriben cada METRICS_FLUSH_S)."""
+    return StepMetrics(config.METRICS_FLUSH_S)
+
+
+def obtener_agregados(path):
+    """Almacén de agregados por región (lo llenan las puntuaciones por lotes); None si no existe.
+
+    Solo se cachea el almacén abierto: mientras el archivo no exista se vuelve a
+    comprobar en cada ejecución, y aparece en cuanto se puntúa el primer lote.
+    """
+    return _abrir_agregados(path) if os.path.exists(path) else None
+
+
+@st.cache_data(max_entries=16)
+def cargar_json(path, mtime):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@st.cache_data(max_entries=16)
+def cargar_imagen(path, mtime):
+    with open(path, "rb") as f:
+        return f.read()
 
-# Buscar label_mapping.json (prioriza raíz si está desplegado en la nube)
-if os.path.exists(os.path.join(base_dir, "label_mapping.json")):
-    map_path = os.path.join(base_dir, "label_mapping.json")
-else:
-    map_path = os.path.join(config.ARTIFACTS_DIR, "label_mapping.json")
-
-# Buscar modelos entrenados (prioriza raíz si está en la nube)
-model_paths = {
-    "RandomForest": os.path.join(base_dir, "model_RandomForest.joblib")
-        if os.path.exists(os.path.join(base_dir, "model_RandomForest.joblib"))
-        else os.path.join(config.ARTIFACTS_DIR, "model_RandomForest.joblib"),
-    "XGBoost": os.path.join(base_dir, "model_XGBoost.joblib")
-        if os.path.exists(os.path.join(base_dir, "model_XGBoost.joblib"))
-        else os.path.join(config.ARTIFACTS_DIR, "model_XGBoost.joblib")
-}
-
-# Cargar mapeo y modelos
-with open(map_path, "r", encoding="utf-8") as f:
-    label_map = json.load(f)
-inv_label_map = {v: k for k, v in label_map.items()}
-
-models = {}
-for name, path in model_paths.items():
-    if os.path.exists(path):
-        models[name] = joblib.load(path)
-    else:
-        st.warning(f"No se encontró el modelo {name}. Verifica que el archivo esté en el repositorio.")
+
+# Buscar pipelines de inferencia (preprocesador + modelo; prioriza raíz si está en la nube)
+pipeline_paths = {name: find_pipeline_path(name) for name in ["RandomForest", "XGBoost", "XGBoostExterno"]}
+
+# Solo se listan los modelos disponibles; se carga únicamente el seleccionado
+available = [name for name, path in pipeline_paths.items() if os.path.exists(path)]
+# XGBoostExterno solo existe si se corrió train_external.py: su ausencia no se avisa
+for name in ["RandomForest", "XGBoost"]:
+    if name not in available:
+        st.warning(f"No se encontró el pipeline de inferencia {name}. Verifica que el archivo esté en el repositorio.")
+
+if not available:
+    st.error("No hay modelos disponibles para predecir.")
+    st.stop()
 
 st.sidebar.header("Selecciona el Modelo")
-selected_model_name = st.sidebar.selectbox("Modelo", list(models.keys()))
-model = models[selected_model_name]
+selected_model_name = st.sidebar.selectbox("Modelo", available)
+selected_path = pipeline_paths[selected_model_name]
+model = cargar_pipeline(selected_path, _mtime(selected_path))
+# Un artefacto reentrenado trae otra versión y, con ella, una caché nueva
+cache = obtener_cache(model.model_name, model.version) if config.PREDICTION_CACHE else None
+
+
+def predecir_etiquetas(df):
+    return cache.predict_labels(model, df) if cache is not None else model.predict_labels(df)
+
+
+explainer = obtener_explicador(selected_path, _mtime(selected_path))
+
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Visualizaciones**")
 if st.sidebar.button("Ver métricas y gráficos"):
     metrics_path = os.path.join(config.ARTIFACTS_DIR, "metrics_report.json")
-    with open(metrics_path, "r", encoding="utf-8") as f:
-        metrics = json.load(f)
-    st.json(metrics)
-    st.image(os.path.join(config.OUTPUT_DIR, "metrics_summary.png"))
-    st.image(os.path.join(config.OUTPUT_DIR, f"cm_{selected_model_name}.png"))
-    st.image(os.path.join(config.OUTPUT_DIR, f"roc_{selected_model_name}.png"))
+    st.json(cargar_json(metrics_path, _mtime(metrics_path)))
+    for image_name in ["metrics_summary.png", f"cm_{selected_model_name}.png",
+                       f"roc_{selected_model_name}.png"]:
+        image_path = os.path.join(config.OUTPUT_DIR, image_name)
+        if os.path.exists(image_path):
+            st.image(cargar_imagen(image_path, _mtime(image_path)))
 
 # ===== FUNCIÓN PARA GENERAR INFORME PDF =====
-def generar_informe_pdf(datos, prediccion, modelo):
-    """Genera un informe PDF simple con los resultados de predicción."""
-    pdf_path = "informe_prediccion_anemia.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
+def generar_informe_pdf(datos, prediccion, modelo, factores=None):
+    """Genera un informe PDF simple en memoria (bytes), sin archivos compartidos entre sesiones.
+
+    factores: lista de (columna, valor, aporte) que más empujaron hacia la predicción.
+    """
+    # reportlab solo se carga al pedir un informe
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
 
@@ -84,10 +143,18 @@ def generar_informe_pdf(datos, prediccion, modelo):
     story.append(Spacer(1, 12))
     story.append(Paragraph(f"**Resultado de la predicción:** {prediccion}", styles["Heading2"]))
     story.append(Spacer(1, 12))
+
+    if factores:
+        story.append(Paragraph("**Factores principales de la predicción:**", styles["Heading3"]))
+        for columna, valor, aporte in factores:
+            story.append(Paragraph(f"{columna} = {valor} (aporte {aporte:+.2f})", styles["Normal"]))
+        story.append(Paragraph("Aporte: contribución TreeSHAP del modelo XGBoost a la clase predicha "
+                               "(escala log-odds; positivo = empuja hacia esa clase).", styles["Italic"]))
+        story.append(Spacer(1, 12))
     story.append(Paragraph("Este informe fue generado automáticamente por el sistema predictivo de anemia desarrollado en el marco del Proyecto IDL3 — Universidad Continental.", styles["Normal"]))
 
     doc.build(story)
-    return pdf_path
+    return buffer.getvalue()
 
 # ===== OPCIÓN 1: CARGAR CSV =====
 st.header("Cargar datos desde un archivo CSV")
@@ -98,9 +165,12 @@ if uploaded_file:
     st.dataframe(df_input.head())
 
     if st.button("Predecir desde CSV"):
-        predictions = model.predict(df_input)
-        decoded = [inv_label_map[int(p)] for p in predictions]
-        df_input["Predicción"] = decoded
+        # El pipeline aplica el preprocesador ajustado a las filas crudas en una sola llamada
+        with obtener_metricas().measure("app_prediccion_csv", rows=len(df_input)):
+            df_input["Predicción"] = predecir_etiquetas(df_input)
+            if explainer is not None:
+                target = pd.Index(model.classes).get_indexer(df_input["Predicción"])
+                df_input = df_input.join(explainer.explain_frame(df_input, target=target))
         st.success("Predicciones generadas correctamente")
         st.dataframe(df_input)
         st.download_button(
@@ -120,39 +190,100 @@ with col1:
     talla = st.number_input("Talla (cm)", min_value=30.0, max_value=120.0, value=80.0)
 with col2:
     hemoglobina = st.number_input("Hemoglobina (g/dL)", min_value=5.0, max_value=18.0, value=11.0)
-    hierro = st.number_input("Hierro sérico (µg/dL)", min_value=10.0, max_value=200.0, value=70.0)
-    ferritina = st.number_input("Ferritina (ng/mL)", min_value=1.0, max_value=300.0, value=25.0)
+    altitud = st.number_input("Altitud (m s. n. m.)", min_value=0, max_value=5000, value=150)
+    ingreso = st.number_input("Ingreso familiar (S/)", min_value=0, max_value=20000, value=1200)
 with col3:
-    vitA = st.number_input("Vitamina A (µg/dL)", min_value=0.0, max_value=100.0, value=40.0)
-    proteina = st.number_input("Proteína total (g/dL)", min_value=3.0, max_value=9.0, value=6.0)
-    zinc = st.number_input("Zinc (µg/dL)", min_value=10.0, max_value=200.0, value=90.0)
+    nro_hijos = st.number_input("Número de hijos", min_value=1, max_value=15, value=2)
+    sexo = st.selectbox("Sexo", ["F", "M"])
+    area = st.selectbox("Área", ["Urbana", "Rural"])
 
 if st.button("Predecir manualmente"):
+    # Las columnas no ingresadas las completa el imputador ajustado en el entrenamiento
     data = {
-        "Edad": edad,
-        "Peso": peso,
-        "Talla": talla,
-        "Hemoglobina": hemoglobina,
-        "Hierro": hierro,
-        "Ferritina": ferritina,
-        "Vitamina_A": vitA,
-        "Proteina": proteina,
-        "Zinc": zinc
+        "Edad_meses": edad,
+        "Peso_kg": peso,
+        "Talla_cm": talla,
+        "Hemoglobina_g_dL": hemoglobina,
+        "Altitud_m": altitud,
+        "Ingreso_Familiar_Soles": ingreso,
+        "Nro_Hijos": nro_hijos,
+        "Sexo": sexo,
+        "Area": area
     }
 
     df_input = pd.DataFrame([data])
-    prediction = model.predict(df_input)[0]
-    decoded = inv_label_map[int(prediction)]
+    with obtener_metricas().measure("app_prediccion", rows=1):
+        decoded = predecir_etiquetas(df_input)[0]
 
     st.success(f"Predicción del modelo **{selected_model_name}**: **{decoded}**")
     st.balloons()
 
-    # Generar PDF con resultados
-    pdf_path = generar_informe_pdf(data, decoded, selected_model_name)
-    with open(pdf_path, "rb") as pdf_file:
-        st.download_button(
-            label="Descargar Informe en PDF",
-            data=pdf_file,
-            file_name="informe_prediccion_anemia.pdf",
-            mime="application/pdf"
-        )
+    factores = None
+    if explainer is not None:
+        target = [list(model.classes).index(decoded)]
+        columnas, aportes = explainer.top_factors(df_input, config.EXPLAIN_TOP_K, target=target)
+        # Las columnas no ingresadas las completó el imputador
+        factores = [(c, data.get(c, "valor imputado"), float(a)) for c, a in zip(columnas[0], aportes[0])]
+        st.markdown("**Factores principales:** " +
+                    ", ".join(f"{c} ({a:+.2f})" for c, _, a in factores))
+
+    # Generar PDF con resultados (en memoria)
+    st.download_button(
+        label="Descargar Informe en PDF",
+        data=generar_informe_pdf(data, decoded, selected_model_name, factores),
+        file_name="informe_prediccion_anemia.pdf",
+        mime="application/pdf"
+    )
+
+# ===== OPCIÓN 3: RIESGO POR REGIÓN (agregados de las puntuaciones por lotes) =====
+st.header("Riesgo de anemia por región")
+agregados = obtener_agregados(ROLLUP_PATH)
+# Solo los lotes puntuados con la versión cargada: los de un modelo anterior no se mezclan
+version = str(model.version)
+if agregados is None or version not in agregados.versions(selected_model_name):
+    st.info(f"Aún no hay agregados de {selected_model_name} v{version}: se generan al puntuar archivos "
+            f"(`python score.py pacientes.csv salida.csv --model {selected_model_name}`).")
+else:
+    # Cada consulta lee filas ya resumidas por su clave indexada: la bajada responde en milisegundos
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        departamentos = agregados.query(selected_model_name, "Departamento", version=version)["region"].tolist()
+        departamento = st.selectbox("Departamento", ["(todos)"] + departamentos)
+    with col2:
+        provincias = [] if departamento == "(todos)" else agregados.query(
+            selected_model_name, "Provincia", departamento=departamento, version=version)["region"].tolist()
+        provincia = st.selectbox("Provincia", ["(todas)"] + provincias, disabled=not provincias)
+    with col3:
+        segmento = st.selectbox("Segmento", ["Total"] + SEGMENTS)
+    with col4:
+        valores = [] if segmento == "Total" else agregados.segment_values(selected_model_name, segmento, version)
+        valor = st.selectbox("Valor", valores or [""], disabled=not valores)
+
+    if departamento == "(todos)":
+        nivel, filtros = "Departamento", {}
+    elif provincia == "(todas)":
+        nivel, filtros = "Provincia", {"departamento": departamento}
+    else:
+        nivel, filtros = "Distrito", {"departamento": departamento, "provincia": provincia}
+    with obtener_metricas().measure("app_agregados_region"):
+        tabla = agregados.query(selected_model_name, nivel, segment="" if segmento == "Total" else segmento,
+                                value=valor if segmento != "Total" else "", version=version, **filtros)
+    clases = agregados.classes(selected_model_name)
+    if tabla.empty:
+        st.info("Sin filas puntuadas para esta selección.")
+    else:
+        st.bar_chart(tabla.set_index("region")[[f"pct_{c}" for c in clases]])
+        st.dataframe(tabla.rename(columns={"region": nivel, "filas": "Niños"}).round(3), hide_index=True)
+    lotes = agregados.batches(selected_model_name, version)
+    st.caption(f"{int(lotes['filas'].sum())} filas puntuadas en {len(lotes)} lotes con v{version}; "
+               f"% por clase predicha y probabilidad media (prob_) de cada clase.")
+
+# ===== CACHÉ DE PREDICCIONES (al final: incluye las predicciones de esta ejecución) =====
+if cache is not None:
+    cache_stats = cache.stats()
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("**Caché de predicciones**")
+    st.sidebar.caption(
+        f"{cache_stats['aciertos']} aciertos · {cache_stats['fallos']} fallos · "
+        f"tasa {cache_stats['tasa_aciertos']:.0%} · {cache_stats['entradas_memoria']} filas en memoria"
+    )
@@ -0,0 +1,91 @@
+# benchmarks/bench_artifact_load.py — Arranque en frío y memoria por trabajador
+import argparse
+import json
+import multiprocessing as mp
+import time
+import pandas as pd
+from src import config
+from src.inference import find_pipeline_path
+
+
+def _memory_mb():
+    """RSS y PSS (RSS prorrateado entre procesos que comparten páginas), en MB; solo Linux."""
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    out[key.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+        out["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return out
+
+
+def _worker(mode, path, sample_path, n_rows, barrier, results):
+    # Las importaciones se miden aparte: son iguales en ambos modos
+    start = time.perf_counter()
+    import sklearn.compose  # noqa: F401  (lo necesita el preprocesador)
+    if mode == "shared":
+        from src.model_artifacts import load_shared_model as loader
+    else:
+        import xgboost  # noqa: F401  (lo necesita el pickle del modelo)
+        from src.inference import load_pipeline as loader
+    import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline = loader(path)
+    load_s = time.perf_counter() - start
+
+    df = pd.read_csv(sample_path, encoding="utf-8-sig", nrows=n_rows)
+    pipeline.predict_proba(df)
+    # Todos los trabajadores vivos a la vez: así el PSS refleja las páginas compartidas
+    barrier.wait()
+    results.put({"importacion_s": round(import_s, 3), "carga_s": round(load_s, 4), **_memory_mb()})
+    barrier.wait()
+
+
+def run(mode, path, workers, sample_path, n_rows):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, path, sample_path, n_rows, barrier, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    summary = {"modo": mode, "trabajadores": workers}
+    for key in stats[0]:
+        values = [s[key] for s in stats]
+        summary[f"{key}_medio"] = round(sum(values) / len(values), 3)
+        if key.endswith("_mb"):
+            summary[f"{key}_total"] = round(sum(values), 1)
+    return summary
+
+
+def main():
+    from src.model_artifacts import shared_model_dir
+    parser = argparse.ArgumentParser(description="Compara pickle privado vs. artefacto memory-mapped.")
+    parser.add_argument("--model", default="RandomForest", choices=["RandomForest", "XGBoost"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=1000, help="Filas puntuadas por trabajador")
+    parser.add_argument("--data", default=config.DATASET_PATH)
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    report = [
+        run("pickle", find_pipeline_path(args.model), args.workers, args.data, args.rows),
+        run("shared", shared_model_dir(args.model), args.workers, args.data, args.rows)
+    ]
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
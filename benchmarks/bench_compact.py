@@ -0,0 +1,118 @@
+# benchmarks/bench_compact.py — Modo compacto (float32 + códigos de categoría) frente a float64 one-hot
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from benchmarks.bench_scaling import run_stage
+from benchmarks.synthetic_data import dataset_path, generate_dataset, parse_size
+
+STAGES = ["preprocesamiento", "balanceo", "entrenamiento", "evaluacion", "puntuacion"]
+MODES = {
+    "float64": {"COMPACT_FEATURES": False},
+    "compacto": {"COMPACT_FEATURES": True}
+}
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def _store_summary(work_dir):
+    """Bytes de la matriz de características (sin etiquetas) y forma/tipo según meta.json."""
+    store = os.path.join(work_dir, "output", "feature_store", "featured")
+    with open(os.path.join(store, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    matrix = sum(os.path.getsize(os.path.join(store, name)) for name in os.listdir(store)
+                 if name.endswith(".npy") and name != "labels.npy")
+    return {"bytes_matriz": matrix, "columnas": meta["shape"][1], "dtype": meta["dtype"],
+            "disperso": meta["sparse"]}
+
+
+def run_mode(mode, dataset, stages, keep_work=False):
+    work_dir = tempfile.mkdtemp(prefix=f"compact_{mode}_")
+    results = {"etapas": {}}
+    try:
+        for stage in stages:
+            result = run_stage(stage, dataset, work_dir, MODES[mode])
+            results["etapas"][stage] = result
+            if "error" in result:
+                print(f"{mode:>9} {stage:>17}  ✘ {result['error']}; se omiten las etapas siguientes")
+                break
+            print(f"{mode:>9} {stage:>17}  {result['segundos']:9.1f}s  "
+                  f"{result['filas_por_segundo']:>12,.0f} filas/s  RSS pico={result['rss_pico_mb']:9.1f} MB")
+        if "preprocesamiento" in results["etapas"]:
+            results["almacen"] = _store_summary(work_dir)
+        models_dir = os.path.join(work_dir, "artifacts", "models")
+        if os.path.isdir(models_dir):
+            results["bytes_modelos"] = _dir_bytes(models_dir)
+        report = os.path.join(work_dir, "artifacts", "metrics_report.json")
+        if os.path.exists(report):
+            with open(report, "r", encoding="utf-8") as f:
+                results["metricas"] = json.load(f)
+    finally:
+        if keep_work:
+            print(f"Espacio de trabajo conservado en {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _ratio(base, compact):
+    return f"x{base / compact:5.2f}" if base and compact else "  -  "
+
+
+def print_comparison(report):
+    base, compact = report["float64"], report["compacto"]
+    print(f"\n{'etapa':>17} {'seg float64':>12} {'seg compacto':>13} {'acel.':>7} "
+          f"{'RSS float64':>12} {'RSS compacto':>13} {'ahorro':>7}")
+    for stage, b in base["etapas"].items():
+        c = compact["etapas"].get(stage, {})
+        if "error" in b or not c or "error" in c:
+            continue
+        print(f"{stage:>17} {b['segundos']:12.1f} {c['segundos']:13.1f} {_ratio(b['segundos'], c['segundos']):>7} "
+              f"{b['rss_pico_mb']:12.1f} {c['rss_pico_mb']:13.1f} {_ratio(b['rss_pico_mb'], c['rss_pico_mb']):>7}")
+    if "almacen" in base and "almacen" in compact:
+        b, c = base["almacen"], compact["almacen"]
+        print(f"\nMatriz de características: {b['bytes_matriz'] / 2**20:,.1f} MB ({b['columnas']} columnas "
+              f"{b['dtype']}{' CSR' if b['disperso'] else ''}) → {c['bytes_matriz'] / 2**20:,.1f} MB "
+              f"({c['columnas']} columnas {c['dtype']}) {_ratio(b['bytes_matriz'], c['bytes_matriz'])}")
+    if "bytes_modelos" in base and "bytes_modelos" in compact:
+        print(f"Artefactos compartidos: {base['bytes_modelos'] / 2**20:,.1f} MB → "
+              f"{compact['bytes_modelos'] / 2**20:,.1f} MB")
+    for name in base.get("metricas", {}):
+        b, c = base["metricas"][name], compact.get("metricas", {}).get(name)
+        if c:
+            print(f"{name:>12}: F1 macro {b['f1_macro']:.4f} → {c['f1_macro']:.4f}, "
+                  f"accuracy {b['accuracy']:.4f} → {c['accuracy']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara memoria y throughput del modo compacto frente al camino float64 one-hot."
+    )
+    parser.add_argument("--size", default="200k", help="Tamaño del dataset sintético (200k, 2M, 20M o filas)")
+    parser.add_argument("--input", default=None, help="CSV propio en lugar del sintético")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    parser.add_argument("--keep-work", action="store_true")
+    args = parser.parse_args()
+
+    dataset = args.input or dataset_path(args.size)
+    if not os.path.exists(dataset):
+        print(f"Generando {args.size} en {dataset}...")
+        generate_dataset(parse_size(args.size), dataset)
+
+    report = {mode: run_mode(mode, dataset, args.stages, args.keep_work) for mode in MODES}
+    print_comparison(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✔ Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
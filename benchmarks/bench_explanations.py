@@ -0,0 +1,98 @@
+# benchmarks/bench_explanations.py — Throughput de las explicaciones TreeSHAP por lotes
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from src import config
+from src.explanations import ContributionExplainer
+from src.inference import find_pipeline_path, load_pipeline
+
+
+def _rows(df, n):
+    """Primeras n filas crudas del dataset, repitiéndolas si es más chico."""
+    reps = int(np.ceil(n / len(df)))
+    return pd.concat([df] * reps, ignore_index=True).iloc[:n] if reps > 1 else df.iloc[:n]
+
+
+def _timeit(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _max_additivity_error(explainer, pipeline, batch):
+    """sesgo + suma de contribuciones debe reproducir predict_proba (vía softmax)."""
+    contrib, bias = explainer.contributions(batch)
+    margin = contrib.sum(axis=-1) + bias
+    proba = np.exp(margin - margin.max(axis=1, keepdims=True))
+    proba /= proba.sum(axis=1, keepdims=True)
+    return float(np.abs(proba - pipeline.predict_proba(batch)).max())
+
+
+def bench(df, sizes, repeats, row_sample):
+    pipeline = load_pipeline(find_pipeline_path("XGBoost"))
+    explainer = ContributionExplainer(pipeline)
+    explainer.top_factors(df.iloc[:1])  # calentamiento
+
+    # Línea base: una llamada por fila, como haría un explicador fila a fila
+    sample = df.iloc[:row_sample]
+    start = time.perf_counter()
+    for i in range(len(sample)):
+        explainer.top_factors(sample.iloc[i:i + 1])
+    per_row_s = (time.perf_counter() - start) / len(sample)
+    print(f"fila a fila: {per_row_s * 1000:8.2f} ms/fila  ({1 / per_row_s:10,.0f} filas/s)")
+
+    results = []
+    for size in sizes:
+        batch = _rows(df, size)
+        reps = repeats if size <= 1000 else max(1, repeats // 10)
+        t_contrib = _timeit(lambda: explainer.contributions(batch), reps)
+        t_top = _timeit(lambda: explainer.top_factors(batch), reps)
+        t_predict = _timeit(lambda: pipeline.predict_proba(batch), reps)
+        results.append({
+            "batch": size,
+            "contribuciones_ms": round(t_contrib * 1000, 3),
+            "factores_ms": round(t_top * 1000, 3),
+            "predict_proba_ms": round(t_predict * 1000, 3),
+            "filas_s": round(size / t_top, 1),
+            "aceleracion_vs_fila": round(per_row_s * size / t_top, 2),
+            "costo_vs_predict": round(t_top / t_predict, 1),
+            "max_error_aditividad": _max_additivity_error(explainer, pipeline, batch.iloc[:2000])
+        })
+        r = results[-1]
+        print(f"batch={size:>7}  factores={r['factores_ms']:10.1f} ms  {r['filas_s']:>10,.0f} filas/s  "
+              f"x{r['aceleracion_vs_fila']:7.1f} vs fila a fila  "
+              f"{r['costo_vs_predict']:6.1f}x predict_proba  err={r['max_error_aditividad']:.1e}")
+    return {
+        "fila_a_fila_ms": round(per_row_s * 1000, 3),
+        "columnas": len(explainer.columns),
+        "caracteristicas": len(pipeline.feature_names),
+        "chunk_rows": explainer.chunk_rows,
+        "resultados": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las explicaciones TreeSHAP por lotes (XGBoost).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--row-sample", type=int, default=50,
+                        help="Filas para medir la línea base fila a fila")
+    parser.add_argument("--input", default=config.DATASET_PATH, help="CSV crudo de pacientes")
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, encoding="utf-8-sig", nrows=max(args.sizes))
+    report = bench(df, args.sizes, args.repeats, args.row_sample)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✔ Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
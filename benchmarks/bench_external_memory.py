@@ -0,0 +1,95 @@
+# benchmarks/bench_external_memory.py — XGBoost en memoria vs. por bloques (RSS pico y exactitud)
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import time
+from src import config
+
+
+def _peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _in_memory(path, n_jobs):
+    """Camino actual: CSV completo en pandas, preprocesador y DMatrix en RAM.
+
+    Usa el mismo split por hash y los mismos hiperparámetros que el camino por bloques.
+    """
+    import numpy as np
+    import pandas as pd
+    import xgboost
+    from sklearn.metrics import accuracy_score, f1_score, cohen_kappa_score
+    from src.data_split import is_test_row
+    from src.external_training import _booster_params, _typed
+    from src.preprocessing import NUM_COLS, build_preprocessor
+
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    df = df[df["Anemia"].notna()]
+    test = is_test_row(df.index.to_numpy())  # posiciones originales de fila
+    num_cols = list(NUM_COLS)
+    cat_cols = [c for c in df.columns if c not in num_cols + ["Anemia", "ID"]]
+    classes = sorted(df["Anemia"].astype(str).unique())
+    y = df["Anemia"].astype(str).map({c: i for i, c in enumerate(classes)}).to_numpy()
+
+    preprocessor = build_preprocessor(num_cols, cat_cols, sparse_output=True)
+    X = preprocessor.fit_transform(_typed(df, num_cols, cat_cols))
+    params, rounds = _booster_params(len(classes), n_jobs)
+    booster = xgboost.train(params, xgboost.DMatrix(X[~test], label=y[~test]), num_boost_round=rounds)
+    y_pred = booster.predict(xgboost.DMatrix(X[test])).argmax(axis=1)
+    return {
+        "accuracy": accuracy_score(y[test], y_pred),
+        "f1_macro": f1_score(y[test], y_pred, average="macro"),
+        "kappa": cohen_kappa_score(y[test], y_pred),
+        "filas_prueba": int(test.sum())
+    }
+
+
+def _worker(mode, path, chunk_rows, n_jobs, results):
+    start = time.perf_counter()
+    if mode == "memoria":
+        metrics = _in_memory(path, n_jobs)
+    else:
+        from src.external_training import train_xgboost_external
+        _, metrics = train_xgboost_external(path, chunk_rows=chunk_rows, dmatrix=mode,
+                                            n_jobs=n_jobs, save=False)
+    metrics.pop("segundos", None)
+    results.put({"modo": mode, "segundos": round(time.perf_counter() - start, 2),
+                 "rss_pico_mb": _peak_rss_mb(), **metrics})
+
+
+def run(mode, path, chunk_rows, n_jobs):
+    # Un proceso nuevo por modo: el RSS pico no se contamina entre corridas
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(mode, path, chunk_rows, n_jobs, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara XGBoost en memoria y fuera de memoria.")
+    parser.add_argument("--input", default=config.DATASET_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=config.EXTERNAL_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=config.N_JOBS)
+    parser.add_argument("--modes", nargs="+", default=["memoria", "external", "quantile"])
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    report = []
+    for mode in args.modes:
+        result = run(mode, args.input, args.chunk_rows, args.workers)
+        report.append(result)
+        print(f"{mode:>9}  {result['segundos']:8.1f}s  RSS pico={result['rss_pico_mb']:8.1f} MB  "
+              f"acc={result['accuracy']:.4f}  f1={result['f1_macro']:.4f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✔ Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# benchmarks/bench_scaling.py — Pipeline completo sobre datasets sintéticos de 200k, 2M y 20M filas
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from src import config
+from benchmarks.synthetic_data import SIZES, SYNTHETIC_DIR, dataset_path, generate_dataset, parse_size
+
+HISTORY_PATH = os.path.join(config.BASE_DIR, "benchmarks", "results", "scaling_history.json")
+STAGES = ["validacion", "preprocesamiento", "balanceo", "entrenamiento", "evaluacion", "puntuacion"]
+
+
+def _peak_rss_mb():
+    """RSS pico del proceso y de sus hijos (pool de puntuación, figuras, joblib).
+
+    En Linux ru_maxrss sobrevive a exec y el proceso nuevo heredaría el pico del
+    padre; VmHWM se mide sobre el espacio de memoria propio.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+
+def _use_workspace(work_dir, dataset, overrides=None):
+    """Redirige datos y artefactos a work_dir antes de importar las etapas.
+
+    Los módulos calculan sus rutas al importarse desde config, así que basta con
+    cambiarlo primero: el benchmark nunca pisa artifacts/ ni output/ del proyecto.
+    overrides agrega otros ajustes (p. ej. {"COMPACT_FEATURES": True}).
+    """
+    config.apply_overrides({
+        "DATASET_PATH": dataset,
+        "ARTIFACTS_DIR": os.path.join(work_dir, "artifacts"),
+        "OUTPUT_DIR": os.path.join(work_dir, "output"),
+        "DOCS_DIR": os.path.join(work_dir, "docs"),
+        **(overrides or {})
+    })
+    config.ensure_dirs()
+
+
+def _run_stage(stage, dataset):
+    """Ejecuta una etapa y devuelve las filas que procesó."""
+    if stage == "validacion":
+        from src.data_validation import validate_dataset
+        return validate_dataset(dataset)["n_filas"]
+    if stage == "preprocesamiento":
+        from src.preprocessing import preprocess_data
+        return preprocess_data(path=dataset)["filas"]
+    if stage == "balanceo":
+        from src.balancing import balance_features
+        return sum(balance_features()["filas_entrenamiento"].values())
+    if stage == "entrenamiento":
+        from src.feature_store import load_meta
+        from src.model_training import train_models
+        train_models()
+        return load_meta()["shape"][0]
+    if stage == "evaluacion":
+        import numpy as np
+        from src.evaluation import evaluate_models
+        from src.model_training import HOLDOUT_INDEX_PATH
+        evaluate_models()
+        return len(np.load(HOLDOUT_INDEX_PATH, mmap_mode="r"))
+    if stage == "puntuacion":
+        from src.batch_scoring import score_file
+        from src.inference import find_pipeline_path
+        output = os.path.join(config.OUTPUT_DIR, "puntuacion.csv")
+        score_file(dataset, output, find_pipeline_path("XGBoost"))
+        rows = sum(1 for _ in open(output, "rb")) - 1
+        os.remove(output)
+        return rows
+    raise ValueError(f"Etapa desconocida: {stage}")
+
+
+def _worker(stage, dataset, work_dir, results, overrides=None):
+    _use_workspace(work_dir, dataset, overrides)
+    start, cpu = time.perf_counter(), time.process_time()
+    rows = _run_stage(stage, dataset)
+    seconds = time.perf_counter() - start
+    results.put({
+        "etapa": stage,
+        "segundos": round(seconds, 2),
+        "cpu_segundos": round(time.process_time() - cpu, 2),
+        "filas": int(rows),
+        "filas_por_segundo": round(rows / seconds, 1) if seconds > 0 else None,
+        "rss_pico_mb": _peak_rss_mb()
+    })
+
+
+def run_stage(stage, dataset, work_dir, overrides=None):
+    # Un proceso nuevo por etapa: el RSS pico de una etapa no arrastra el de la anterior
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(stage, dataset, work_dir, results, overrides))
+    start = time.perf_counter()
+    proc.start()
+    proc.join()
+    try:
+        return results.get(timeout=5)
+    except queue.Empty:
+        return {"etapa": stage, "segundos": round(time.perf_counter() - start, 2),
+                "error": f"el proceso terminó con código {proc.exitcode}"}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=config.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _previous(history, size, stage):
+    """Última medición exitosa de la misma etapa y tamaño (para ver regresiones)."""
+    for run in reversed(history):
+        if run["tamano"] != size:
+            continue
+        for result in run["etapas"]:
+            if result["etapa"] == stage and "error" not in result:
+                return result
+    return None
+
+
+def _delta(current, previous, key):
+    if previous is None or not previous.get(key):
+        return ""
+    return f" ({(current[key] / previous[key] - 1) * 100:+.0f}%)"
+
+
+def run_size(label, stages, data_dir, history, keep_work=False, seed=42):
+    dataset = dataset_path(label, data_dir)
+    if not os.path.exists(dataset):
+        print(f"Generando {label} en {dataset}...")
+        generate_dataset(parse_size(label), dataset, seed=seed)
+
+    work_dir = tempfile.mkdtemp(prefix=f"scaling_{label}_")
+    results = []
+    try:
+        for stage in stages:
+            result = run_stage(stage, dataset, work_dir)
+            results.append(result)
+            if "error" in result:
+                print(f"{label:>5} {stage:>17}  ✘ {result['error']}; se omiten las etapas siguientes")
+                break
+            prev = _previous(history, label, stage)
+            print(f"{label:>5} {stage:>17}  {result['segundos']:9.1f}s{_delta(result, prev, 'segundos')}  "
+                  f"{result['filas_por_segundo']:>12,.0f} filas/s  "
+                  f"RSS pico={result['rss_pico_mb']:9.1f} MB{_delta(result, prev, 'rss_pico_mb')}")
+    finally:
+        if keep_work:
+            print(f"Espacio de trabajo conservado en {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "tamano": label,
+        "filas": parse_size(label),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "etapas": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el pipeline completo a distintas escalas.")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES),
+                        help="Tamaños (200k, 2M, 20M o número de filas)")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--data-dir", default=SYNTHETIC_DIR)
+    parser.add_argument("--history", default=HISTORY_PATH, help="Historial JSON de corridas")
+    parser.add_argument("--keep-work", action="store_true",
+                        help="Conservar artefactos y salidas de cada tamaño")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    for label in args.sizes:
+        run = run_size(label, args.stages, args.data_dir, history, args.keep_work, args.seed)
+        history.append(run)
+        # Se guarda después de cada tamaño: una corrida larga interrumpida conserva lo medido
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+    print(f"✔ Historial actualizado en {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_tree_inference.py — Predictores nativos vs. motor de árboles aplanados
+import argparse
+import json
+import time
+import numpy as np
+from scipy import sparse
+from src.feature_store import load_features
+from src.inference import find_pipeline_path, load_pipeline
+from src.tree_compiler import compile_pipeline
+
+
+def _rows(X, n):
+    """Primeras n filas del almacén, repitiéndolas si el dataset es más chico."""
+    if X.shape[0] >= n:
+        return X[:n]
+    reps = int(np.ceil(n / X.shape[0]))
+    stacked = sparse.vstack([X] * reps) if sparse.issparse(X) else np.vstack([X] * reps)
+    return stacked[:n]
+
+
+def _timeit(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def bench_model(name, X, sizes, repeats):
+    pipeline = load_pipeline(find_pipeline_path(name))
+    native = pipeline.model
+
+    start = time.perf_counter()
+    compiled = compile_pipeline(pipeline)
+    compile_s = time.perf_counter() - start
+
+    results = []
+    for size in sizes:
+        batch = _rows(X, size)
+        reps = repeats if size <= 1000 else max(1, repeats // 10)
+        if size == 1:
+            fast = lambda: compiled.predict_proba_row(batch)
+        else:
+            fast = lambda: compiled.predict_proba(batch)
+        t_native = _timeit(lambda: native.predict_proba(batch), reps)
+        t_compiled = _timeit(fast, reps)
+        diff = float(np.abs(native.predict_proba(batch) - np.atleast_2d(fast())).max())
+        results.append({
+            "batch": size,
+            "nativo_ms": round(t_native * 1000, 3),
+            "compilado_ms": round(t_compiled * 1000, 3),
+            "nativo_filas_s": round(size / t_native, 1),
+            "compilado_filas_s": round(size / t_compiled, 1),
+            "aceleracion": round(t_native / t_compiled, 2),
+            "max_dif_prob": diff
+        })
+        print(f"{name:>12} batch={size:>6}  nativo={t_native * 1000:9.3f} ms  "
+              f"compilado={t_compiled * 1000:9.3f} ms  x{t_native / t_compiled:6.2f}  dif={diff:.2e}")
+
+    return {
+        "arboles": compiled.n_trees,
+        "nodos": int(len(compiled.feature)),
+        "profundidad_max": compiled.max_depth,
+        "compilacion_s": round(compile_s, 3),
+        "resultados": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de árboles aplanados.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 100000])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--models", nargs="+", default=["RandomForest", "XGBoost"])
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    X, _, _ = load_features()
+    report = {name: bench_model(name, X, args.sizes, args.repeats) for name in args.models}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✔ Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/check_import_time.py — Presupuesto de tiempo de importación de los puntos de entrada
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from src import config
+
+# Dependencias pesadas que ningún punto de entrada debe cargar hasta usarlas
+HEAVY = ["numpy", "pandas", "scipy", "sklearn", "xgboost", "joblib", "matplotlib",
+         "seaborn", "reportlab", "streamlit", "aiohttp", "imblearn"]
+
+# módulo -> (presupuesto en ms, dependencias pesadas permitidas)
+BUDGETS = {
+    "src.config": (30, []),
+    "src.cli": (60, []),
+    "src.pipeline_runner": (80, []),
+    "src.profiling": (80, []),
+    # La puntuación necesita pandas para leer bloques; el modelo se carga en los trabajadores
+    "src.batch_scoring": (1200, ["numpy", "pandas"]),
+    "src.prediction_service": (1500, ["numpy", "pandas", "joblib", "aiohttp"]),
+}
+# Dependencias opcionales: sin ellas el módulo no se puede importar y su medición se omite
+OPTIONAL = {
+    "src.prediction_service": ["aiohttp"],
+}
+# El código se importa desde la raíz del repositorio, aunque BASE_DIR apunte a otros datos
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se importa con makedirs bloqueado y sin salida permitida: importar no debe tocar el disco
+_PROBE = """
+import os, sys, json, time
+def _blocked(*args, **kwargs):
+    raise RuntimeError(f"efecto sobre el disco al importar: makedirs{args}")
+os.makedirs = os.mkdir = _blocked
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+top = sorted({name.split(".")[0] for name in sys.modules})
+json.dump({"ms": elapsed * 1000, "modules": top}, sys.stderr)
+"""
+
+
+def missing_dependencies(module):
+    """Dependencias opcionales de module que no están instaladas."""
+    return [dep for dep in OPTIONAL.get(module, []) if importlib.util.find_spec(dep) is None]
+
+
+def measure(module, repeat=5):
+    """Mediana de `repeat` importaciones en frío (un intérprete nuevo por medición)."""
+    times, modules = [], []
+    env = {k: v for k, v in os.environ.items() if not k.startswith(config.ENV_PREFIX)}
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _PROBE, module], cwd=ROOT_DIR,
+                              capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Falló la importación de {module}:\n{proc.stderr}")
+        if proc.stdout:
+            raise RuntimeError(f"{module} imprime al importarse: {proc.stdout.strip()!r}")
+        result = json.loads(proc.stderr.strip().splitlines()[-1])
+        times.append(result["ms"])
+        modules = result["modules"]
+    times.sort()
+    return times[len(times) // 2], modules
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verifica el presupuesto de importación (sale con código 1 si se excede)."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplica los presupuestos (máquinas más lentas o CI compartido)")
+    args = parser.parse_args()
+
+    failures = []
+    for module, (budget_ms, allowed) in BUDGETS.items():
+        missing = missing_dependencies(module)
+        if missing:
+            print(f"- {module:<22} omitido (falta {', '.join(missing)})")
+            continue
+        ms, modules = measure(module, args.repeat)
+        heavy = [m for m in HEAVY if m in modules and m not in allowed]
+        limit = budget_ms * args.scale
+        ok = ms <= limit and not heavy
+        print(f"{'✔' if ok else '✘'} {module:<22} {ms:8.1f} ms (presupuesto {limit:.0f} ms)"
+              + (f"  carga {', '.join(heavy)}" if heavy else ""))
+        if not ok:
+            failures.append(module)
+
+    if failures:
+        print(f"Presupuesto de importación excedido: {', '.join(failures)}")
+        sys.exit(1)
+    print("✔ Todos los puntos de entrada dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
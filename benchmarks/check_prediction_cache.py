@@ -0,0 +1,81 @@
+# benchmarks/check_prediction_cache.py — La caché de predicciones devuelve lo mismo que el modelo
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from src import config
+from src.inference import find_pipeline_path, load_pipeline
+from src.prediction_cache import PredictionCache
+
+
+def padded_rows(df, cat_cols, seed=42):
+    """Copia de las filas con espacios alrededor de las categorías en la mitad de ellas."""
+    rng = np.random.default_rng(seed)
+    out = df.copy()
+    for col in cat_cols:
+        mask = rng.random(len(out)) < 0.5
+        out[col] = out[col].astype(object)
+        out.loc[mask, col] = " " + out.loc[mask, col].astype(str) + " "
+    return out
+
+
+def retyped_rows(df, cat_cols):
+    """Copia de las filas con las categorías numéricas (p. ej. IMC_Infantil) como texto."""
+    out = df.copy()
+    for col in cat_cols:
+        if pd.api.types.is_numeric_dtype(out[col]):
+            out[col] = out[col].astype(str)
+    return out
+
+
+def check(pipeline, frames):
+    """Compara predict_proba sin caché frente a fallos, aciertos en memoria y aciertos en disco.
+
+    Los bloques pasan uno tras otro por la misma caché: uno no debe recibir las filas de otro.
+    """
+    def through(cache):
+        return np.concatenate([cache.predict_proba(pipeline, df) for df in frames])
+
+    expected = np.concatenate([pipeline.predict_proba(df) for df in frames])
+    with tempfile.TemporaryDirectory() as tmp:
+        disk = os.path.join(tmp, "cache.sqlite")
+        cache = PredictionCache.for_pipeline(pipeline, disk_path=disk)
+        results = {"fallos": through(cache), "memoria": through(cache)}
+        cache.close()
+        reopened = PredictionCache.for_pipeline(pipeline, disk_path=disk)
+        results["disco"] = through(reopened)
+        reopened.close()
+    failures = []
+    for label, proba in results.items():
+        same = proba.dtype == expected.dtype and np.array_equal(proba, expected)
+        print(f"{'✔' if same else '✘'} {label:<8} máx. diferencia {np.abs(proba - expected).max():.2e}")
+        if not same:
+            failures.append(label)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verifica que la caché de predicciones sea idéntica a no usarla (código 1 si difiere)."
+    )
+    parser.add_argument("--model", default="XGBoost", choices=["RandomForest", "XGBoost"])
+    parser.add_argument("--input", default=config.DATASET_PATH, help="CSV crudo de pacientes")
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    pipeline = load_pipeline(find_pipeline_path(args.model))
+    df = pd.read_csv(args.input, encoding="utf-8-sig", nrows=args.rows)
+    # Filas originales, con espacios y con categorías numéricas como texto: cada una con la
+    # predicción del modelo (con one-hot el texto es otra categoría; en modo compacto, la misma)
+    frames = [df, padded_rows(df, pipeline.cat_cols), retyped_rows(df, pipeline.cat_cols)]
+    failures = check(pipeline, frames)
+    if failures:
+        print(f"La caché no coincide con el modelo en: {', '.join(failures)}")
+        sys.exit(1)
+    print("✔ Caché idéntica a predict_proba sin caché")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/load_generator.py — Generador de carga local para serve.py
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+import aiohttp
+
+DEFAULT_RECORD = {
+    "Edad_meses": 24, "Peso_kg": 10.0, "Talla_cm": 80.0, "Hemoglobina_g_dL": 10.5,
+    "Altitud_m": 3200, "Ingreso_Familiar_Soles": 900, "Nro_Hijos": 2,
+    "Sexo": "F", "Area": "Rural"
+}
+
+
+def load_records(path, n):
+    if path is None:
+        return [DEFAULT_RECORD] * n
+    df = pd.read_csv(path, encoding="utf-8-sig", nrows=n).drop(columns=["Anemia"], errors="ignore")
+    # NaN no es JSON válido: se envía como null
+    return json.loads(df.to_json(orient="records"))
+
+
+async def _worker(session, url, queue, latencies, batch_size):
+    while True:
+        try:
+            payload = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        body = payload if batch_size == 1 else {"registros": payload}
+        start = time.perf_counter()
+        async with session.post(url, json=body) as resp:
+            await resp.read()
+            resp.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(base_url, records, concurrency, batch_size):
+    queue = asyncio.Queue()
+    if batch_size == 1:
+        url = f"{base_url}/predict"
+        for record in records:
+            queue.put_nowait(record)
+    else:
+        url = f"{base_url}/predict/batch"
+        for i in range(0, len(records), batch_size):
+            queue.put_nowait(records[i:i + batch_size])
+
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(session, url, queue, latencies, batch_size) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{base_url}/stats") as resp:
+            stats = await resp.json()
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "solicitudes": len(latencies),
+        "filas": len(records),
+        "concurrencia": concurrency,
+        "batch_size": batch_size,
+        "duracion_s": round(elapsed, 3),
+        "filas_por_s": round(len(records) / elapsed, 1),
+        "latencia_ms": {
+            "p50": round(float(np.percentile(lat_ms, 50)), 2),
+            "p95": round(float(np.percentile(lat_ms, 95)), 2),
+            "p99": round(float(np.percentile(lat_ms, 99)), 2),
+            "max": round(float(lat_ms.max()), 2)
+        },
+        "servidor": stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide latencia y throughput de serve.py.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--requests", type=int, default=2000, help="Pacientes a enviar")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="1 = /predict individual; >1 = /predict/batch con ese tamaño")
+    parser.add_argument("--data", default=None, help="CSV con pacientes reales (opcional)")
+    args = parser.parse_args()
+
+    records = load_records(args.data, args.requests)
+    result = asyncio.run(run(args.url.rstrip("/"), records, args.concurrency, args.batch_size))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# benchmarks/synthetic_data.py — Datos sintéticos con el esquema del dataset real, a cualquier escala
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from src import config
+
+REPORT_PATH = os.path.join(config.ARTIFACTS_DIR, "validation_report.json")
+# Modelo heredado versionado en la raíz: sus columnas one-hot traen los valores reales de cada categoría
+VOCABULARY_MODEL_PATH = os.path.join(config.BASE_DIR, "model_XGBoost.joblib")
+SYNTHETIC_DIR = os.path.join(config.DATA_DIR, "synthetic")
+SIZES = {"200k": 200_000, "2M": 2_000_000, "20M": 20_000_000}
+CHUNK_ROWS = 500_000
+
+# Columnas que se derivan de otras (no se sortean desde el vocabulario)
+DERIVED = {"Departamento", "Provincia", "Estado_Nutricional", "Bajo_Peso", "Talla_Baja", "Anemia"}
+# Rangos de hemoglobina ajustada por clase (g/dL, niños de 6 a 59 meses)
+HB_RANGES = {"No": (11.0, 14.5), "Leve": (10.0, 10.9), "Moderada": (7.0, 9.9), "Severa": (4.5, 6.9)}
+
+
+def load_schema(report_path=REPORT_PATH):
+    """Columnas, tipos y distribución de Anemia (%) del último reporte de validación."""
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    return report["columnas"], report["tipos"], report["distribucion_anemia"]
+
+
+def load_vocabulary(columns, types, model_path=VOCABULARY_MODEL_PATH):
+    """Valores de cada columna categórica a partir de los nombres one-hot del modelo heredado.
+
+    Un nombre "Columna_valor" se asigna a la columna más larga que sea su prefijo, así
+    "Programa_Juntos_Sí" no se confunde con otra columna que empiece igual.
+    """
+    import joblib
+    names = joblib.load(model_path).feature_names_in_
+    categorical = sorted((c for c in columns if types[c] == "object" and c != "Anemia"),
+                         key=len, reverse=True)
+    vocabulary = {c: set() for c in categorical}
+    for name in names:
+        for col in categorical:
+            if name.startswith(col + "_"):
+                vocabulary[col].add(name[len(col) + 1:])
+                break
+    return {c: sorted(v) for c, v in vocabulary.items()}
+
+
+def geography(vocabulary, seed=0):
+    """Jerarquía Distrito -> Provincia -> Departamento y altitud base de cada distrito.
+
+    El vocabulario no trae la jerarquía real, así que se reparte en orden (cada
+    departamento recibe provincias contiguas y cada provincia distritos contiguos).
+    Los pesos de los distritos siguen una Dirichlet: unos pocos concentran más casos.
+    """
+    rng = np.random.default_rng(seed)
+    deps, provs, dists = (np.array(vocabulary[c], dtype=object)
+                          for c in ["Departamento", "Provincia", "Distrito"])
+    prov_dep = deps[np.arange(len(provs)) * len(deps) // len(provs)]
+    dist_prov = np.arange(len(dists)) * len(provs) // len(dists)
+    return {
+        "distritos": dists,
+        "provincia": provs[dist_prov],
+        "departamento": prov_dep[dist_prov],
+        "peso": rng.dirichlet(np.full(len(dists), 2.0)),
+        "altitud": rng.integers(0, 4300, size=len(dists)),
+        "rural": rng.uniform(0.2, 0.8, size=len(dists))
+    }
+
+
+def _altitude_correction(altitude_m):
+    """Ajuste de hemoglobina por altitud (OMS): se resta a la medida para obtener la ajustada."""
+    feet = np.maximum(altitude_m, 0) * 3.2808 / 1000
+    return np.maximum(-0.032 * feet + 0.022 * feet ** 2, 0)
+
+
+def _yes_no(rng, p):
+    return np.where(rng.random(len(p)) < p, "Sí", "No")
+
+
+def generate_chunk(rng, start_id, n, vocabulary, geo, anemia_dist):
+    """n filas con identificadores desde start_id (columnas en cualquier orden)."""
+    classes = np.array(list(anemia_dist), dtype=object)
+    probs = np.array(list(anemia_dist.values()), dtype=np.float64)
+    anemia = classes[rng.choice(len(classes), size=n, p=probs / probs.sum())]
+
+    d = rng.choice(len(geo["distritos"]), size=n, p=geo["peso"])
+    altitude = np.clip(geo["altitud"][d] + rng.normal(0, 150, n), 0, 4800).astype(np.int64)
+    rural = rng.random(n) < geo["rural"][d]
+    age = rng.integers(6, 60, n)
+    height = (65 + 0.55 * age + rng.normal(0, 3.5, n)).round(1)
+    weight = (7 + 0.17 * age + rng.normal(0, 1.3, n)).clip(4.5).round(1)
+    bmi = (weight / (height / 100) ** 2).round(2)
+
+    hb_adj = np.empty(n)
+    for cls, (lo, hi) in HB_RANGES.items():
+        mask = anemia == cls
+        if cls == "No":
+            hb_adj[mask] = np.clip(rng.normal(12.2, 0.7, mask.sum()), lo, hi)
+        else:
+            hb_adj[mask] = rng.uniform(lo, hi, mask.sum())
+    hb_adj = np.floor(hb_adj * 10) / 10
+    hb = (hb_adj + _altitude_correction(altitude)).round(1)
+    anemic = anemia != "No"
+
+    df = pd.DataFrame({
+        "ID": np.arange(start_id, start_id + n, dtype=np.int64),
+        "Departamento": geo["departamento"][d],
+        "Provincia": geo["provincia"][d],
+        "Distrito": geo["distritos"][d],
+        "Altitud_m": altitude,
+        "Edad_meses": age,
+        "Area": np.where(rural, "Rural", "Urbana"),
+        "Ingreso_Familiar_Soles": np.where(rural, rng.integers(300, 2500, n),
+                                           rng.integers(700, 6000, n)).astype(np.int64),
+        "Nro_Hijos": rng.integers(1, 7, n),
+        "Peso_kg": weight,
+        "Talla_cm": height,
+        "IMC_Infantil": bmi,
+        "Estado_Nutricional": np.where(bmi < 14, "Desnutrido", np.where(bmi > 18, "Sobrepeso", "Normal")),
+        "Bajo_Peso": np.where(weight < 6 + 0.17 * age, "Sí", "No"),
+        "Talla_Baja": np.where(height < 60 + 0.55 * age, "Sí", "No"),
+        "Hemoglobina_g_dL": hb,
+        "Hemoglobina_Ajustada": hb_adj,
+        "Anemia": anemia
+    })
+    # Programas y suplemento algo más frecuentes en zona rural; el hierro, menos entre anémicos
+    df["Programa_Juntos"] = _yes_no(rng, np.where(rural, 0.45, 0.15))
+    df["Programa_QaliWarma"] = _yes_no(rng, np.where(rural, 0.55, 0.35))
+    df["Programa_VasoLeche"] = _yes_no(rng, np.where(rural, 0.40, 0.30))
+    df["Suplemento_Hierro"] = _yes_no(rng, np.where(anemic, 0.35, 0.55))
+    for col, values in vocabulary.items():
+        if col not in df.columns and col not in DERIVED:
+            df[col] = np.array(values, dtype=object)[rng.integers(0, len(values), n)]
+    return df
+
+
+def generate_dataset(n_rows, path, chunk_rows=CHUNK_ROWS, seed=42, report_path=REPORT_PATH):
+    """Escribe un CSV sintético de n_rows filas por bloques (memoria acotada por chunk_rows).
+
+    Columnas, orden y tipos salen del reporte de validación; la distribución de
+    Anemia es la del reporte. Con la misma semilla el archivo es idéntico.
+    """
+    columns, types, anemia_dist = load_schema(report_path)
+    vocabulary = load_vocabulary(columns, types)
+    geo = geography(vocabulary, seed)
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_rows // chunk_rows))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        n = min(chunk_rows, n_rows - start)
+        df = generate_chunk(np.random.default_rng(seeds[i]), start + 1, n, vocabulary, geo, anemia_dist)
+        df = df[columns]
+        wrong = [c for c in columns if str(df[c].dtype) != types[c]]
+        if wrong:
+            raise ValueError(f"Tipos distintos del reporte de validación: {wrong}")
+        df.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False,
+                  encoding="utf-8-sig" if i == 0 else "utf-8")
+    # Renombrar al final: un archivo a medio escribir nunca queda con el nombre definitivo
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(label, data_dir=SYNTHETIC_DIR):
+    return os.path.join(data_dir, f"anemia_sintetico_{label}.csv")
+
+
+def parse_size(label):
+    """'200k', '2M', '20M' o un número de filas."""
+    if label in SIZES:
+        return SIZES[label]
+    return int(float(label.lower().replace("k", "e3").replace("m", "e6")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos con el esquema del dataset real.")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES),
+                        help="Tamaños (200k, 2M, 20M o número de filas)")
+    parser.add_argument("--data-dir", default=SYNTHETIC_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="Regenerar aunque el archivo exista")
+    args = parser.parse_args()
+
+    for label in args.sizes:
+        path = dataset_path(label, args.data_dir)
+        if os.path.exists(path) and not args.force:
+            print(f"{label:>5}: ya existe {path}")
+            continue
+        start = time.perf_counter()
+        generate_dataset(parse_size(label), path, args.chunk_rows, args.seed)
+        print(f"{label:>5}: {parse_size(label):,} filas en {time.perf_counter() - start:.1f}s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
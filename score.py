@@ -0,0 +1,22 @@
+# score.py — Puntuación por lotes de archivos CSV/Parquet de pacientes (equivale a `main.py score`)
+import argparse
+from src.cli import add_configuration_arguments, add_score_arguments, apply_configuration, cmd_score
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Puntúa un archivo CSV o Parquet por bloques con el pipeline de inferencia."
+    )
+    add_configuration_arguments(parser)
+    add_score_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    apply_configuration(args.config, args.set)
+    cmd_score(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# serve.py — Servicio HTTP local de predicción con micro-batching
+import argparse
+from aiohttp import web
+from src.inference import find_pipeline_path
+from src.prediction_service import create_app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de predicción de anemia.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="XGBoost", choices=["RandomForest", "XGBoost", "XGBoostExterno"])
+    parser.add_argument("--max-batch-size", type=int, default=64,
+                        help="Máximo de solicitudes agrupadas por lote (default: 64)")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Espera máxima para completar un lote, en ms (default: 5)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(
+        find_pipeline_path(args.model),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+    print(f"✔ Modelo {args.model} cargado en {app['startup_s']}s")
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# src/balancing.py
+import os
+import json
+import joblib
+import numpy as np
+from scipy import sparse
+from src import config
+from src.feature_store import load_features, load_meta, save_features
+from src.preprocessing import NUM_COLS, PREPROCESSOR_PATH
+from src.profiling import profiled, set_rows
+
+# Almacén con SOLO las filas sintéticas (el dataset original no se copia)
+SYNTHETIC_STORE = "synthetic"
+BALANCE_REPORT_PATH = os.path.join(config.ARTIFACTS_DIR, "balance_report.json")
+# Filas por bloque en la búsqueda de vecinos (acota la matriz de distancias bloque x pool)
+NEIGHBOR_BLOCK = 512
+
+
+def class_sample_weights(y, max_weight=config.CLASS_WEIGHT_MAX):
+    """Pesos por fila inversamente proporcionales a la frecuencia de su clase ("balanced"), con tope."""
+    classes, inverse, counts = np.unique(y, return_inverse=True, return_counts=True)
+    weights = len(y) / (len(classes) * counts)
+    return np.minimum(weights, max_weight)[inverse]
+
+
+def _nearest_neighbors(Xc, pool, k, pool_pos=None):
+    """k vecinos más cercanos (euclídeos) de cada fila de Xc dentro de pool, por bloques.
+
+    Xc y pool son CSR de la misma clase; el producto disperso evita densificar el one-hot.
+    pool_pos[i] es la posición de la fila i de Xc dentro de pool (-1 si no está): esa
+    candidata se excluye, aunque haya duplicados o empates a distancia cero.
+    """
+    pool_sq = np.asarray(pool.multiply(pool).sum(axis=1)).ravel()
+    k = min(k, pool.shape[0] - 1)
+    out = np.empty((Xc.shape[0], k), dtype=np.int64)
+    for start in range(0, Xc.shape[0], NEIGHBOR_BLOCK):
+        block = Xc[start:start + NEIGHBOR_BLOCK]
+        block_sq = np.asarray(block.multiply(block).sum(axis=1)).ravel()
+        d2 = block_sq[:, None] + pool_sq[None, :] - 2 * (block @ pool.T).toarray()
+        if pool_pos is not None:
+            own = pool_pos[start:start + block.shape[0]]
+            in_pool = np.flatnonzero(own >= 0)
+            d2[in_pool, own[in_pool]] = np.inf
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(d2, nearest, axis=1).argsort(axis=1)
+        out[start:start + block.shape[0]] = np.take_along_axis(nearest, order, axis=1)
+    return out
+
+
+def smote_minority(X, y, n_numeric, target_ratio=config.SMOTE_TARGET_RATIO,
+                   k=config.SMOTE_K, pool_size=config.SMOTE_POOL, seed=42, numeric_neighbors=False):
+    """Filas sintéticas tipo SMOTE solo para las clases minoritarias.
+
+    Cada clase con menos de target_ratio x (clase mayor) filas se completa hasta ese
+    número. Los vecinos se buscan solo dentro de la misma clase (muestra de a lo sumo
+    pool_size filas), así que el costo es lineal en las filas de la minoría y no toca
+    la clase mayor. Las numéricas (primeras n_numeric columnas) se interpolan; el
+    bloque one-hot se copia entero de la fila base o del vecino, sin mezclar categorías.
+    Con numeric_neighbors (modo compacto, donde las categóricas son códigos sin
+    distancia con sentido) los vecinos se buscan solo con las numéricas.
+    Devuelve (X_sintético CSR, y_sintético, {clase: filas generadas}).
+    """
+    rng = np.random.default_rng(seed)
+    classes, counts = np.unique(y, return_counts=True)
+    target = int(target_ratio * counts.max())
+    X = sparse.csr_matrix(X)
+    blocks, labels, generated = [], [], {}
+
+    for cls, count in zip(classes, counts):
+        n_new = target - count
+        if n_new <= 0 or count < 2:
+            continue
+        rows = np.flatnonzero(y == cls)
+        Xc = X[rows]
+        pool_idx = rng.choice(count, size=min(count, pool_size), replace=False)
+        pool_pos = np.full(count, -1, dtype=np.int64)
+        pool_pos[pool_idx] = np.arange(len(pool_idx))
+        Xd = Xc[:, :n_numeric] if numeric_neighbors else Xc
+        neighbors = pool_idx[_nearest_neighbors(Xd, Xd[pool_idx], k, pool_pos)]
+
+        base = rng.integers(0, count, size=n_new)
+        nn = neighbors[base, rng.integers(0, neighbors.shape[1], size=n_new)]
+        gap = rng.random(n_new)
+
+        X_base, X_nn = Xc[base], Xc[nn]
+        numeric = X_base[:, :n_numeric].toarray()
+        numeric += gap[:, None] * (X_nn[:, :n_numeric].toarray() - numeric)
+        categorical = _pick_rows(X_base, X_nn, gap < 0.5)
+        blocks.append(sparse.hstack([sparse.csr_matrix(numeric), categorical[:, n_numeric:]]).tocsr())
+        labels.append(np.full(n_new, cls, dtype=object))
+        generated[str(cls)] = int(n_new)
+
+    if not blocks:
+        return sparse.csr_matrix((0, X.shape[1])), np.empty(0, dtype=object), generated
+    return sparse.vstack(blocks).tocsr(), np.concatenate(labels), generated
+
+
+def _pick_rows(A, B, take_a):
+    """Fila i de A si take_a[i], si no de B (selección vectorizada sobre CSR)."""
+    mask = sparse.diags(take_a.astype(np.float64))
+    return (mask @ A + sparse.diags((~take_a).astype(np.float64)) @ B).tocsr()
+
+
+@profiled("balance")
+def balance_features(mode=config.BALANCING):
+    """Etapa de balanceo: genera el almacén de filas sintéticas desde el split de entrenamiento.
+
+    Solo con mode="smote" hay filas; en los otros modos el almacén queda vacío (los
+    pesos de clase se calculan al entrenar). La partición es la misma que usa
+    train_models(), así que ninguna fila de prueba alimenta a los sintéticos.
+    """
+    from src.model_training import train_test_indices
+
+    print("=== BLOQUE 2C: BALANCEO DE CLASES ===")
+    config.ensure_dirs()
+    X, y, feat_names = load_features()
+    idx_train, _ = train_test_indices(X.shape[0])
+    idx_train = np.sort(idx_train)
+    y_train = y[idx_train]
+    set_rows(len(idx_train))
+
+    if mode == "smote":
+        compact = joblib.load(PREPROCESSOR_PATH).get("compact", False)
+        X_syn, y_syn, generated = smote_minority(X[idx_train], y_train, n_numeric=len(NUM_COLS),
+                                                 numeric_neighbors=compact)
+        if not load_meta()["sparse"]:
+            X_syn = X_syn.toarray().astype(X.dtype)
+    else:
+        X_syn = sparse.csr_matrix((0, X.shape[1])) if load_meta()["sparse"] else np.empty((0, X.shape[1]))
+        y_syn, generated = np.empty(0, dtype=object), {}
+
+    store = save_features(X_syn, y_syn, feat_names, name=SYNTHETIC_STORE, export_csv=False)
+    classes, counts = np.unique(y_train.astype(str), return_counts=True)
+    report = {
+        "modo": mode,
+        "filas_entrenamiento": {str(c): int(n) for c, n in zip(classes, counts)},
+        "filas_sinteticas": generated
+    }
+    if mode == "class_weight":
+        weights = class_sample_weights(y_train)
+        report["pesos_clase"] = {str(c): float(weights[y_train == c][0]) for c in classes}
+    with open(BALANCE_REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"✔ Balanceo '{mode}': {sum(generated.values())} filas sintéticas en {store}")
+    return report
+
+
+def balanced_training_set(X_train, y_train, encoder, mode=config.BALANCING):
+    """(X, y, sample_weight) para ajustar los modelos según el modo de balanceo."""
+    if mode == "class_weight":
+        return X_train, y_train, class_sample_weights(y_train)
+    if mode == "smote":
+        X_syn, y_syn, _ = load_features(SYNTHETIC_STORE)
+        if X_syn.shape[1] != X_train.shape[1]:
+            raise ValueError("El almacén sintético no corresponde a las características actuales; "
+                             "vuelva a ejecutar balance_features()")
+        if len(y_syn):
+            stack = sparse.vstack if sparse.issparse(X_train) else np.vstack
+            X_train = stack([X_train, X_syn])
+            y_train = np.concatenate([y_train, encoder.transform(y_syn)])
+        return X_train, y_train, None
+    return X_train, y_train, None
@@ -0,0 +1,223 @@
+# src/batch_scoring.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src import config
+from src.geo_rollups import MERGE_EVERY, RollupStore, batch_key, merge_partials, rollup_chunk
+
+# Pipeline (con su caché de predicciones y su explicador) cargados una sola vez por proceso trabajador
+_worker_pipeline = None
+_worker_cache = None
+_worker_explainer = None
+_worker_top_k = 0
+_worker_rollups = False
+
+
+def load_scoring_model(path):
+    """Directorio de artefacto compartido (memmap) o archivo pipeline_<modelo>.joblib."""
+    # Diferido: el proceso principal solo lee y escribe bloques, no necesita el modelo
+    from src.inference import load_pipeline
+    from src.model_artifacts import load_shared_model
+    return load_shared_model(path) if os.path.isdir(path) else load_pipeline(path)
+
+
+def load_explainer(pipeline, path):
+    """Explicador TreeSHAP; el artefacto compartido guarda el booster nativo aparte."""
+    from src.explanations import ContributionExplainer
+    booster = None
+    if os.path.isdir(path):
+        from src.model_artifacts import load_native_booster
+        booster = load_native_booster(path)
+    return ContributionExplainer(pipeline, booster)
+
+
+def _init_worker(pipeline_file, use_cache=False, cache_disk=None, top_k=0, rollups=False):
+    global _worker_pipeline, _worker_cache, _worker_explainer, _worker_top_k, _worker_rollups
+    _worker_pipeline = load_scoring_model(pipeline_file)
+    _worker_cache = None
+    if use_cache:
+        from src.prediction_cache import PredictionCache
+        _worker_cache = PredictionCache.for_pipeline(_worker_pipeline, disk_path=cache_disk)
+    _worker_top_k = top_k
+    _worker_explainer = load_explainer(_worker_pipeline, pipeline_file) if top_k else None
+    _worker_rollups = rollups
+
+
+def _model_identity():
+    """(modelo, versión, nombres de clase por código) del pipeline que puntúa."""
+    return _worker_pipeline.model_name, _worker_pipeline.version, list(_worker_pipeline.classes)
+
+
+def _score_chunk(df):
+    """Probabilidades del bloque, (aciertos, fallos) de caché, factores principales y agregados geográficos."""
+    hits, misses = 0, 0
+    if _worker_cache is None:
+        proba = _worker_pipeline.predict_proba(df)
+    else:
+        hits, misses = _worker_cache.hits, _worker_cache.misses
+        proba = _worker_cache.predict_proba(_worker_pipeline, df)
+        hits, misses = _worker_cache.hits - hits, _worker_cache.misses - misses
+    factors = None
+    if _worker_explainer is not None:
+        # Se explica la clase que se informa como predicción
+        factors = _worker_explainer.explain_frame(df, _worker_top_k, target=proba.argmax(axis=1))
+    partial = None
+    if _worker_rollups:
+        # Se agrega en el trabajador: al proceso principal solo vuelve el resumen del bloque
+        partial = rollup_chunk(df, proba)
+    return proba, (hits, misses), factors, partial
+
+
+def _pyarrow():
+    """Módulos pyarrow y pyarrow.parquet; error claro si falta (viene en requirements.txt)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Leer o escribir archivos Parquet requiere pyarrow "
+                          "(pip install -r requirements.txt)") from exc
+    return pa, pq
+
+
+def iter_input_chunks(path, chunk_rows):
+    """Lee CSV o Parquet por bloques de tamaño fijo."""
+    if path.lower().endswith(".parquet"):
+        _, pq = _pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, encoding="utf-8-sig", chunksize=chunk_rows)
+
+
+class ChunkWriter:
+    """Escribe los bloques puntuados de forma incremental (CSV o Parquet)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        # Se comprueba al abrir, no en el primer bloque ya puntuado
+        self._arrow = _pyarrow() if self.parquet else None
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.parquet:
+            pa, pq = self._arrow
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Un bloque puede inferir otro tipo (p. ej. columna vacía); se alinea al primero
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first,
+                      index=False, encoding="utf-8-sig" if self._first else "utf-8")
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def attach_predictions(df, proba, label_names, factors=None):
+    out = df.copy()
+    out["Predicción"] = [label_names[i] for i in proba.argmax(axis=1)]
+    for i, name in enumerate(label_names):
+        out[f"prob_{name}"] = proba[:, i].round(6)
+    if factors is not None:
+        # Columna por columna: un solo ndarray mezclaría factor_i (texto) y aporte_i en
+        # dtype object y los aportes perderían su tipo y redondeo al escribirse
+        for column in factors.columns:
+            out[column] = factors[column]
+    return out
+
+
+def score_file(input_path, output_path, pipeline_file, chunk_rows=50000,
+               workers=None, use_cache=config.PREDICTION_CACHE,
+               cache_disk=config.CACHE_DISK_PATH, top_k=0, rollup_db=None):
+    """Puntúa un archivo por bloques con un pool de procesos y escribe en orden de entrada.
+
+    Como máximo hay 2 bloques en vuelo por trabajador, así que la memoria no
+    depende del tamaño del archivo. Con use_cache cada trabajador consulta la caché
+    de predicciones (en memoria y, si se da cache_disk, en sqlite compartido). Con
+    top_k > 0 (solo XGBoost) agrega factor_i/aporte_i: las columnas que más empujan
+    hacia la clase predicha según sus contribuciones TreeSHAP. Con rollup_db suma el
+    archivo a los agregados por región de ese sqlite (src/geo_rollups.py), una sola
+    vez por archivo y versión del modelo. Los nombres de clase (Predicción, prob_<clase>
+    y agregados) salen del pipeline cargado.
+    """
+    print("=== PUNTUACIÓN POR LOTES ===")
+    workers = workers or os.cpu_count() or 1
+    label_names = None
+    writer = ChunkWriter(output_path)
+    n_rows = 0
+    counts = [0, 0]
+    partials = []
+    rollups = rollup_db is not None
+    start = time.perf_counter()
+
+    def write(chunk, result):
+        proba, (hits, misses), factors, partial = result
+        writer.write(attach_predictions(chunk, proba, label_names, factors))
+        counts[0] += hits
+        counts[1] += misses
+        if partial is not None:
+            partials.append(partial)
+            if len(partials) >= MERGE_EVERY:
+                partials[:] = [merge_partials(partials)]
+        return len(chunk)
+
+    try:
+        if workers == 1:
+            _init_worker(pipeline_file, use_cache, cache_disk, top_k, rollups)
+            identity = _model_identity()
+            label_names = identity[2]
+            for chunk in iter_input_chunks(input_path, chunk_rows):
+                n_rows += write(chunk, _score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(pipeline_file, use_cache, cache_disk, top_k, rollups)) as pool:
+                identity = pool.submit(_model_identity).result()
+                label_names = identity[2]
+                pending = deque()
+                for chunk in iter_input_chunks(input_path, chunk_rows):
+                    pending.append((chunk, pool.submit(_score_chunk, chunk)))
+                    if len(pending) >= 2 * workers:
+                        chunk_done, future = pending.popleft()
+                        n_rows += write(chunk_done, future.result())
+                while pending:
+                    chunk_done, future = pending.popleft()
+                    n_rows += write(chunk_done, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✔ {n_rows} filas puntuadas en {elapsed:.1f}s "
+          f"({n_rows / max(elapsed, 1e-9):,.0f} filas/s) → {output_path}")
+    if use_cache:
+        print(f"Caché de predicciones: {counts[0]} aciertos, {counts[1]} fallos")
+    if rollups:
+        update_rollups(rollup_db, identity, label_names, merge_partials(partials), input_path)
+    return n_rows
+
+
+def update_rollups(path, identity, label_names, partial, input_path):
+    """Suma los agregados del archivo puntuado al almacén por región."""
+    if partial is None:
+        return
+    store = RollupStore(path)
+    try:
+        start = time.perf_counter()
+        added = store.upsert(identity[0], identity[1], label_names, partial,
+                             key=batch_key(input_path, identity[1]), source=os.path.abspath(input_path))
+    finally:
+        store.close()
+    if added:
+        print(f"Agregados por región: {len(partial)} filas de resumen sumadas en "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms → {path}")
+    else:
+        print(f"Agregados por región: {input_path} ya estaba sumado para {identity[0]} "
+              f"v{identity[1]} en {path}; se omite")
@@ -0,0 +1,230 @@
+# src/cli.py — Interfaz de línea de comandos por subcomandos
+import os
+import sys
+import argparse
+from src import config
+
+COMMANDS = ["run", "validate", "preprocess", "train", "update", "evaluate", "score", "report"]
+
+
+# === Comandos (cada uno importa solo los módulos que usa) ===
+
+def cmd_run(args):
+    from src.pipeline_runner import run_pipeline
+    run_pipeline(force=args.force, max_workers=args.workers,
+                 profile_stages=args.profile if args.profile is not None else config.PROFILE_STAGES,
+                 profile_mode=args.profile_mode or config.PROFILE_MODE)
+
+
+def cmd_validate(args):
+    from src.data_validation import validate_dataset, plot_eda
+    path = args.input or config.DATASET_PATH
+    validate_dataset(path)
+    if args.eda:
+        plot_eda(path=path)
+
+
+def cmd_preprocess(args):
+    from src.preprocessing import preprocess_data
+    from src.balancing import balance_features
+    preprocess_data(path=args.input or config.DATASET_PATH)
+    balance_features()
+
+
+def cmd_train(args):
+    from src.model_training import train_models
+    train_models(mode=args.mode or config.TRAINING_MODE)
+
+
+def cmd_update(args):
+    from src.incremental_training import update_models
+    update_models(
+        args.input,
+        extra_trees=args.extra_trees if args.extra_trees is not None else config.UPDATE_EXTRA_TREES,
+        extra_rounds=args.extra_rounds if args.extra_rounds is not None else config.UPDATE_EXTRA_ROUNDS,
+        names=args.models,
+        promote=not args.dry_run
+    )
+
+
+def cmd_evaluate(args):
+    from src.evaluation import evaluate_models
+    evaluate_models()
+
+
+def add_score_arguments(parser):
+    """Argumentos de puntuación por lotes (los comparten `main.py score` y score.py)."""
+    parser.add_argument("input", help="Archivo de entrada (.csv o .parquet)")
+    parser.add_argument("output", help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--model", default="XGBoost", choices=["RandomForest", "XGBoost", "XGBoostExterno"])
+    parser.add_argument("--chunk-rows", type=int, default=50000,
+                        help="Filas por bloque (default: 50000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos trabajadores (default: núcleos disponibles)")
+    parser.add_argument("--shared", action="store_true",
+                        help="Usar el artefacto compartido (memory-mapped) de artifacts/models/")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="No consultar la caché de predicciones (PREDICTION_CACHE)")
+    parser.add_argument("--cache-disk", default=None, metavar="SQLITE",
+                        help="Caché persistente en disco (default: CACHE_DISK_PATH)")
+    # const=None: EXPLAIN_TOP_K se lee en cmd_score, después de --set/--config
+    parser.add_argument("--explain", type=int, nargs="?", const=None, default=0,
+                        metavar="K", help="Agregar los K factores principales de cada predicción "
+                                          "(solo XGBoost; default K: EXPLAIN_TOP_K)")
+    parser.add_argument("--no-rollups", action="store_true",
+                        help="No sumar el archivo a los agregados por región (GEO_ROLLUPS)")
+    parser.add_argument("--rollup-db", default=None, metavar="SQLITE",
+                        help="Almacén de agregados por región (default: artifacts/geo_rollups.sqlite)")
+
+
+def cmd_score(args):
+    top_k = config.EXPLAIN_TOP_K if args.explain is None else args.explain
+    if top_k and not args.model.startswith("XGBoost"):
+        raise SystemExit("--explain usa las contribuciones TreeSHAP de XGBoost: elegir --model XGBoost")
+    from src.batch_scoring import score_file
+    from src.inference import find_pipeline_path
+    from src.model_artifacts import shared_model_dir
+    from src.geo_rollups import ROLLUP_PATH
+    score_file(
+        args.input,
+        args.output,
+        shared_model_dir(args.model) if args.shared else find_pipeline_path(args.model),
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        use_cache=config.PREDICTION_CACHE and not args.no_cache,
+        cache_disk=args.cache_disk or config.CACHE_DISK_PATH,
+        top_k=top_k,
+        rollup_db=None if args.no_rollups or not config.GEO_ROLLUPS else args.rollup_db or ROLLUP_PATH
+    )
+
+
+def cmd_report(args):
+    from src.metrics_visualization import visualize_metrics
+    from src.profiling import load_stage_metrics, PROMETHEUS_PATH
+    visualize_metrics()
+    metrics = load_stage_metrics()
+    if metrics:
+        print("\nÚltima ejecución por etapa:")
+        for data in metrics:
+            last = data["ultima"]
+            rate = f"{last['filas_por_segundo']:>12,.0f} filas/s" if last.get("filas_por_segundo") else " " * 20
+            # Sin /proc, resource ni psutil (Windows sin psutil) no hay RSS pico
+            rss = f"{last['rss_pico_mb']:8.1f} MB" if last.get("rss_pico_mb") is not None else f"{'n/a':>8}"
+            print(f"  {data['etapa']:<20} {last['segundos']:9.2f}s  {rate}  RSS pico={rss}  ({data['fecha']})")
+        print(f"Métricas Prometheus en {PROMETHEUS_PATH}")
+
+
+# === Configuración y parser ===
+
+def add_configuration_arguments(parser):
+    """--config y --set (los comparten main.py, score.py y train_external.py)."""
+    parser.add_argument("--config", default=None, metavar="ARCHIVO",
+                        help="Archivo JSON o TOML con ajustes {\"AJUSTE\": valor}")
+    parser.add_argument("--set", action="append", default=[], metavar="AJUSTE=VALOR",
+                        help="Sobrescribe un ajuste (se puede repetir)")
+
+
+def apply_configuration(config_file=None, assignments=()):
+    """Aplica --config y --set sobre src.config y los exporta al entorno.
+
+    Precedencia: archivo < variables ANEMIA_<AJUSTE> < --set. src.config ya aplicó
+    las variables al importarse, así que tras el archivo se vuelven a aplicar. Todo
+    se exporta al entorno para que los procesos hijos (pools con spawn, etapas del
+    pipeline) vean la misma configuración al releer ANEMIA_CONFIG y ANEMIA_<AJUSTE>.
+    """
+    if config_file:
+        config.apply_overrides(config.load_file(config_file))
+        config.apply_overrides(config.env_overrides())
+        os.environ[config.CONFIG_FILE_ENV] = os.path.abspath(config_file)
+    values = {}
+    current = config.settings()
+    for item in assignments:
+        key, sep, raw = item.partition("=")
+        if not sep or key not in current:
+            raise SystemExit(f"--set espera AJUSTE=valor con un ajuste de src/config.py: {item!r}")
+        values[key] = config.parse_value(raw, current[key])
+        os.environ[config.ENV_PREFIX + key] = raw
+    config.apply_overrides(values)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Pipeline de predicción temprana de anemia.",
+        epilog="Los ajustes de src/config.py también se fijan con variables ANEMIA_<AJUSTE> "
+               "o con un archivo JSON/TOML en ANEMIA_CONFIG."
+    )
+    add_configuration_arguments(parser)
+    sub = parser.add_subparsers(dest="command", metavar="COMANDO")
+
+    run = sub.add_parser("run", help="Pipeline incremental completo (comando por defecto)")
+    run.add_argument("--force", action="store_true",
+                     help="Volver a ejecutar todas las etapas aunque no haya cambios")
+    run.add_argument("--workers", type=int, default=None,
+                     help="Etapas independientes en paralelo (default: núcleos disponibles)")
+    run.add_argument("--profile", nargs="+", default=None, metavar="ETAPA",
+                     help="Etapas a ejecutar bajo el perfilador (p. ej. preprocess train)")
+    run.add_argument("--profile-mode", default=None, choices=["cprofile", "sampling"],
+                     help="cProfile determinista o muestreo de pilas (default: PROFILE_MODE)")
+    run.set_defaults(func=cmd_run)
+
+    validate = sub.add_parser("validate", help="Valida el esquema del dataset")
+    validate.add_argument("--input", default=None, help="CSV crudo (default: DATASET_PATH)")
+    validate.add_argument("--eda", action="store_true", help="Dibujar además los histogramas del EDA")
+    validate.set_defaults(func=cmd_validate)
+
+    preprocess = sub.add_parser("preprocess", help="Ajusta el preprocesador, genera el almacén y el balanceo")
+    preprocess.add_argument("--input", default=None, help="CSV crudo (default: DATASET_PATH)")
+    preprocess.set_defaults(func=cmd_preprocess)
+
+    train = sub.add_parser("train", help="Entrena RandomForest y XGBoost")
+    train.add_argument("--mode", default=None, choices=["fixed", "search"],
+                       help="Hiperparámetros fijos o búsqueda con presupuesto (default: TRAINING_MODE)")
+    train.set_defaults(func=cmd_train)
+
+    update = sub.add_parser("update", help="Continúa los modelos guardados con un lote nuevo (sin reentrenar)")
+    update.add_argument("input", help="CSV crudo con los registros nuevos (incluye Anemia)")
+    update.add_argument("--extra-trees", type=int, default=None,
+                        help="Árboles que se agregan al RandomForest (default: UPDATE_EXTRA_TREES)")
+    update.add_argument("--extra-rounds", type=int, default=None,
+                        help="Rondas de boosting que se agregan a XGBoost (default: UPDATE_EXTRA_ROUNDS)")
+    update.add_argument("--models", nargs="+", default=["RandomForest", "XGBoost"],
+                        choices=["RandomForest", "XGBoost"])
+    update.add_argument("--dry-run", action="store_true",
+                        help="Solo comparar actual y candidato, sin promover ni guardar artefactos")
+    update.set_defaults(func=cmd_update)
+
+    evaluate = sub.add_parser("evaluate", help="Métricas e IC sobre las filas de prueba")
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    score = sub.add_parser("score", help="Puntúa un CSV o Parquet por bloques")
+    add_score_arguments(score)
+    score.set_defaults(func=cmd_score)
+
+    report = sub.add_parser("report", help="Gráfico comparativo y resumen de métricas por etapa")
+    report.set_defaults(func=cmd_report)
+    return parser
+
+
+def _with_default_command(argv):
+    """Sin subcomando se ejecuta `run` (compatibilidad con `python main.py --force`)."""
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        if token in COMMANDS or token in ("-h", "--help"):
+            return argv
+        if token in ("--config", "--set"):
+            i += 2
+        elif token.startswith(("--config=", "--set=")):
+            i += 1
+        else:
+            break
+    return argv[:i] + ["run"] + argv[i:]
+
+
+def main(argv=None):
+    argv = _with_default_command(list(sys.argv[1:] if argv is None else argv))
+    args = build_parser().parse_args(argv)
+    # Antes de importar cualquier etapa: sus rutas y valores por defecto salen de config
+    apply_configuration(args.config, args.set)
+    args.func(args)
@@ -1,4 +1,5 @@
 import os
+import json
 
 # === Configuración general del proyecto ===
 PROJECT_NAME = "prediccion-temprana-anemia"
@@ -9,14 +10,146 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 ARTIFACTS_DIR = os.path.join(BASE_DIR, "artifacts")
 DOCS_DIR = os.path.join(BASE_DIR, "docs")
 
-# Crear carpetas si no existen
-for path in [OUTPUT_DIR, ARTIFACTS_DIR, DOCS_DIR]:
-    os.makedirs(path, exist_ok=True)
-
 # Rutas de archivos importantes
 DATASET_PATH = os.path.join(DATA_DIR, "dataset_anemia_PERU_2025_UTF8SIG.csv")
 
-print(f"✔ Configuración cargada correctamente:")
-print(f"  DATASET_PATH: {DATASET_PATH}")
-print(f"  OUTPUT_DIR:   {OUTPUT_DIR}")
-print(f"  ARTIFACTS_DIR:{ARTIFACTS_DIR}")
+# Validación
+VALIDATION_CHUNK_ROWS = 100_000  # filas por bloque en la validación por streaming
+DUPLICATE_BUFFER_ROWS = 4_000_000  # hashes de fila en RAM (8 bytes c/u) antes de volcar a disco al contar duplicados
+
+# Preprocesamiento
+SAMPLE_SIZE = None        # None = usar todas las filas del dataset
+SPARSE_FEATURES = True    # matriz one-hot dispersa (CSR) de punta a punta
+COMPACT_FEATURES = False  # numéricos float32 y categóricos como códigos enteros (XGBoost categórico) en vez de one-hot
+EXPORT_FEATURED_CSV = False  # exportar además featured_dataset.csv (solo bajo pedido)
+
+# Balanceo de clases
+BALANCING = "class_weight"  # "none", "class_weight" (pesos por clase) o "smote" (sintéticos de minorías)
+CLASS_WEIGHT_MAX = 50.0     # tope del peso de una clase
+SMOTE_TARGET_RATIO = 0.1    # cada minoría sube hasta esta fracción de la clase mayor
+SMOTE_K = 5                 # vecinos por fila en la interpolación
+SMOTE_POOL = 20_000         # vecinos candidatos por clase (muestra si la clase es mayor)
+
+# Entrenamiento
+TRAINING_MODE = "fixed"     # "fixed" = hiperparámetros fijos, "search" = búsqueda con presupuesto
+N_JOBS = None               # None = todos los núcleos
+SEARCH_TIME_BUDGET_S = 900  # tope de reloj para la búsqueda de hiperparámetros
+SEARCH_CANDIDATES = 12      # candidatos por modelo en el primer escalón
+SEARCH_CV_FOLDS = 3
+SEARCH_ETA = 3              # en cada escalón pasa 1/ETA de los candidatos con ETA veces más filas
+
+# Entrenamiento fuera de memoria (XGBoost por bloques)
+EXTERNAL_CHUNK_ROWS = 200_000  # filas crudas por bloque del iterador
+EXTERNAL_FIT_SAMPLE = 50_000   # filas de muestra para medianas/escalas del preprocesador
+EXTERNAL_DMATRIX = "external"  # "external" (caché en disco) o "quantile" (histograma en RAM)
+
+# Evaluación
+EVAL_BOOTSTRAP = 1000   # réplicas bootstrap para los intervalos de confianza (0 = sin IC)
+EVAL_CI_LEVEL = 0.95
+
+# Gráficos
+PLOT_WORKERS = None         # procesos para dibujar figuras (None = núcleos disponibles)
+PLOT_SAMPLE_ROWS = 200_000  # filas muestreadas para histogramas y KDE del EDA
+
+# Perfilado (métricas por etapa en artifacts/metrics/ siempre; perfilador solo bajo pedido)
+PROFILE_STAGES = []        # etapas a perfilar, p. ej. ["preprocess", "train"]
+PROFILE_MODE = "cprofile"  # "cprofile" (determinista) o "sampling" (muestreo de pilas, menos sobrecarga)
+PROFILE_INTERVAL_S = 0.01  # intervalo del muestreo de pilas
+METRICS_FLUSH_S = 60       # la app acumula sus mediciones en memoria y las escribe como mucho cada tantos segundos
+
+# Caché de predicciones (clave = hash de la fila canónica + modelo y versión)
+PREDICTION_CACHE = True      # usar la caché en la app, el servicio HTTP y la puntuación por lotes
+CACHE_MAX_ENTRIES = 100_000  # filas en memoria por modelo (LRU)
+CACHE_TTL_S = 24 * 3600      # vencimiento de una entrada en segundos (0 = sin vencimiento)
+CACHE_DISK_PATH = None       # sqlite persistente entre reinicios, p. ej. "artifacts/cache/predicciones.sqlite"
+
+# Explicaciones (contribuciones TreeSHAP del booster de XGBoost)
+EXPLAIN_TOP_K = 3            # factores principales por predicción en el informe y en la puntuación
+EXPLAIN_CHUNK_ROWS = 2048    # filas por llamada a pred_contribs (su salida densa es filas x clases x características)
+
+# Agregados de riesgo por región (Departamento/Provincia/Distrito x Area y programas)
+GEO_ROLLUPS = True  # cada puntuación por lotes suma su archivo a artifacts/geo_rollups.sqlite
+
+# Actualización incremental (main.py update: continúa los modelos con un lote nuevo)
+UPDATE_EXTRA_TREES = 50       # árboles que se agregan al RandomForest (warm start)
+UPDATE_EXTRA_ROUNDS = 50      # rondas de boosting que continúan el booster de XGBoost
+UPDATE_MAX_F1_DROP = 0.01     # caída máxima de F1 macro tolerada en cada conjunto de prueba para promover
+UPDATE_HOLDOUT_ROWS = 50_000  # filas de la prueba histórica (holdout_index.npy) usadas en la comparación
+UPDATE_MIN_CLASS_ROWS = 20    # filas mínimas por clase; si el lote trae menos se completan con historia
+
+# === Sobrescrituras (sin efectos sobre el disco al importar) ===
+# Orden: valores de este archivo < archivo de ANEMIA_CONFIG < variables ANEMIA_<AJUSTE>
+ENV_PREFIX = "ANEMIA_"
+CONFIG_FILE_ENV = "ANEMIA_CONFIG"
+_TRUE = {"1", "true", "yes", "si", "sí", "on"}
+
+
+def settings():
+    """Ajustes actuales (nombres en mayúsculas) como dict."""
+    return {k: v for k, v in globals().items()
+            if k.isupper() and k not in ("ENV_PREFIX", "CONFIG_FILE_ENV")}
+
+
+def parse_value(raw, current):
+    """Convierte un texto (variable de entorno o --set) al tipo del valor actual."""
+    if isinstance(current, bool):
+        return raw.strip().lower() in _TRUE
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    if isinstance(current, (list, tuple)) and not raw.lstrip().startswith("["):
+        return [item.strip() for item in raw.split(",") if item.strip()]
+    if isinstance(current, str):
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def apply_overrides(values):
+    """Aplica {AJUSTE: valor}. Las rutas derivadas siguen a su carpeta si no se fijaron aparte."""
+    unknown = sorted(set(values) - set(settings()))
+    if unknown:
+        raise KeyError(f"Ajustes de configuración desconocidos: {', '.join(unknown)}")
+    current = globals()
+    if "BASE_DIR" in values:
+        for key, sub in [("DATA_DIR", "data"), ("OUTPUT_DIR", "output"),
+                         ("ARTIFACTS_DIR", "artifacts"), ("DOCS_DIR", "docs")]:
+            if key not in values:
+                current[key] = os.path.join(values["BASE_DIR"], sub)
+    if ("DATA_DIR" in values or "BASE_DIR" in values) and "DATASET_PATH" not in values:
+        data_dir = values.get("DATA_DIR", current["DATA_DIR"])
+        current["DATASET_PATH"] = os.path.join(data_dir, os.path.basename(current["DATASET_PATH"]))
+    current.update(values)
+
+
+def load_file(path):
+    """Ajustes desde un archivo JSON o TOML ({"AJUSTE": valor})."""
+    with open(path, "rb") as f:
+        if path.lower().endswith(".toml"):
+            import tomllib  # Python >= 3.11
+            return tomllib.load(f)
+        return json.load(f)
+
+
+def env_overrides(environ=os.environ):
+    """Ajustes definidos como ANEMIA_<AJUSTE>=valor, convertidos al tipo del valor por defecto."""
+    known = settings()
+    return {
+        key[len(ENV_PREFIX):]: parse_value(value, known[key[len(ENV_PREFIX):]])
+        for key, value in environ.items()
+        if key.startswith(ENV_PREFIX) and key[len(ENV_PREFIX):] in known
+    }
+
+
+def ensure_dirs():
+    """Crea las carpetas de salida; lo llaman las etapas y comandos que escriben en ellas."""
+    for path in [OUTPUT_DIR, ARTIFACTS_DIR, DOCS_DIR]:
+        os.makedirs(path, exist_ok=True)
+
+
+if os.environ.get(CONFIG_FILE_ENV):
+    apply_overrides(load_file(os.environ[CONFIG_FILE_ENV]))
+apply_overrides(env_overrides())
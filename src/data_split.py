@@ -0,0 +1,15 @@
+# src/data_split.py — Split train/test estable por posición de fila (sin dependencias de modelos)
+import numpy as np
+import pandas as pd
+
+# Fracción de filas reservada para prueba (asignación estable por posición de fila)
+TEST_FRACTION = 0.2
+
+
+def is_test_row(positions, test_fraction=TEST_FRACTION):
+    """Asignación train/test determinista por hash de la posición global de la fila.
+
+    No depende del tamaño del bloque, así que cada pasada del iterador ve el mismo split.
+    """
+    buckets = pd.util.hash_array(np.asarray(positions, dtype=np.int64)) % 1000
+    return buckets < int(test_fraction * 1000)
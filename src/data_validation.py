@@ -1,27 +1,215 @@
 import pandas as pd
+import numpy as np
 import json
 import os
-import seaborn as sns
-import matplotlib.pyplot as plt
+import tempfile
 from src import config
+from src.figures import FigureSpec, hist_kde, render_figures, reservoir_sample
+from src.profiling import profiled, set_rows, step
 
-def validate_dataset(path=config.DATASET_PATH):
+# Esquema declarado: categorías para texto y anchos compactos para los numéricos
+SCHEMA = {
+    "ID": "int32",
+    "Departamento": "category",
+    "Provincia": "category",
+    "Distrito": "category",
+    "Altitud_m": "int16",
+    "Edad_meses": "int16",
+    "Sexo": "category",
+    "Area": "category",
+    "Ingreso_Familiar_Soles": "int32",
+    "Nro_Hijos": "int8",
+    "Nivel_Educacion_Madre": "category",
+    "Actividad_Madre": "category",
+    "Condicion_Vivienda": "category",
+    "Acceso_Informacion": "category",
+    "Programa_QaliWarma": "category",
+    "Programa_Juntos": "category",
+    "Programa_VasoLeche": "category",
+    "Suplemento_Hierro": "category",
+    "Lugar_Atencion": "category",
+    "Peso_kg": "float32",
+    "Talla_cm": "float32",
+    "IMC_Infantil": "float32",
+    "Estado_Nutricional": "category",
+    "Bajo_Peso": "category",
+    "Talla_Baja": "category",
+    "Hemoglobina_g_dL": "float32",
+    "Hemoglobina_Ajustada": "float32",
+    "Anemia": "category"
+}
+
+
+def _report_dtype(declared, has_nulls, fractional, unparseable):
+    """Nombre de tipo que pandas habría inferido leyendo el archivo completo."""
+    if declared == "category" or unparseable:
+        return "object"
+    if declared.startswith("int") and not (has_nulls or fractional):
+        return "int64"
+    return "float64"
+
+
+def iter_typed_chunks(path, chunksize=config.VALIDATION_CHUNK_ROWS, columns=None):
+    """Lee el CSV por bloques aplicando el esquema declarado.
+
+    Devuelve (bloque, info). info["nulos"] son los nulos del archivo antes de
+    convertir; info["no_conformes"] cuenta por columna los valores no numéricos o
+    fuera del rango del tipo declarado (quedan como NaN en el bloque);
+    info["no_numericas"] y info["fraccionarias"] marcan las columnas con texto o
+    con decimales donde se esperaban números o enteros.
+    """
+    header = pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns.tolist()
+    cat_dtypes = {c: "category" for c in header if SCHEMA.get(c) == "category"}
+    reader = pd.read_csv(path, encoding="utf-8-sig", dtype=cat_dtypes,
+                         usecols=columns, chunksize=chunksize)
+    for chunk in reader:
+        info = {"nulos": chunk.isnull().sum(), "no_conformes": {},
+                "no_numericas": set(), "fraccionarias": set()}
+        for col in chunk.columns:
+            declared = SCHEMA.get(col)
+            if declared is None or declared == "category":
+                continue
+            values = chunk[col]
+            n_bad = 0
+            if values.dtype == object:
+                coerced = pd.to_numeric(values, errors="coerce")
+                n_unparsed = int((coerced.isna() & values.notna()).sum())
+                if n_unparsed:
+                    info["no_numericas"].add(col)
+                n_bad += n_unparsed
+                values = coerced
+            if declared.startswith("int"):
+                limits = np.iinfo(declared)
+                out_of_range = (values < limits.min) | (values > limits.max)
+                n_bad += int(out_of_range.sum())
+                values = values.mask(out_of_range)
+                if (values.dropna() % 1 != 0).any():
+                    info["fraccionarias"].add(col)
+                # Enteros con nulos o decimales no caben en un int compacto
+                if col in info["fraccionarias"] or values.isna().any():
+                    declared = "float32"
+            info["no_conformes"][col] = n_bad
+            chunk[col] = values.astype(declared)
+        yield chunk, info
+
+
+class DuplicateCounter:
+    """Cuenta filas repetidas por hash de 64 bits con memoria acotada.
+
+    Los hashes se acumulan hasta buffer_rows; al llenarse, el búfer se ordena sin
+    repetidos y se vuelca a disco como una corrida. Al final el espacio de hashes se
+    recorre en intervalos de igual ancho: como el hash es uniforme, cada intervalo
+    junta unos buffer_rows valores de todas las corridas (searchsorted sobre cada
+    corrida memory-mapped). La RAM queda en O(buffer_rows) y el disco en 8 bytes por
+    fila distinta. Dos filas distintas con el mismo hash cuentan como una repetida
+    (probabilidad ~ n²/2⁶⁵: menos de 3e-4 con 100 millones de filas).
+    """
+
+    def __init__(self, tmp_dir, buffer_rows=config.DUPLICATE_BUFFER_ROWS):
+        self.tmp_dir = tmp_dir
+        self.buffer_rows = buffer_rows
+        self.n_rows = 0
+        self._buffer, self._buffered = [], 0
+        self._runs = []
+
+    def add(self, hashes):
+        self.n_rows += len(hashes)
+        self._buffer.append(hashes)
+        self._buffered += len(hashes)
+        if self._buffered >= self.buffer_rows:
+            run_path = os.path.join(self.tmp_dir, f"hashes_{len(self._runs)}.npy")
+            np.save(run_path, self._drain())
+            self._runs.append(run_path)
+
+    def _drain(self):
+        run = np.unique(np.concatenate(self._buffer)) if self._buffer else np.empty(0, dtype=np.uint64)
+        self._buffer, self._buffered = [], 0
+        return run
+
+    def count(self):
+        runs = [np.load(p, mmap_mode="r") for p in self._runs] + [self._drain()]
+        n_intervals = max(1, -(-sum(len(r) for r in runs) // self.buffer_rows))
+        distinct = 0
+        for i in range(n_intervals):
+            lo = np.uint64((i << 64) // n_intervals)
+            hi = np.uint64(((i + 1) << 64) // n_intervals) if i + 1 < n_intervals else None
+            parts = [r[np.searchsorted(r, lo):len(r) if hi is None else np.searchsorted(r, hi)] for r in runs]
+            distinct += len(np.unique(np.concatenate(parts)))
+        # Soltar los memory maps antes de que se borre el directorio temporal (Windows no borra archivos abiertos)
+        del runs, parts
+        return self.n_rows - distinct
+
+
+@profiled("validate")
+def validate_dataset(path=config.DATASET_PATH, chunksize=config.VALIDATION_CHUNK_ROWS):
+    """Valida el dataset en una pasada por bloques y guarda validation_report.json.
+
+    La memoria la acota el tamaño del bloque, salvo los duplicados: DuplicateCounter
+    guarda 8 bytes por fila, hasta DUPLICATE_BUFFER_ROWS en RAM y el resto en disco.
+    """
     print("=== BLOQUE 1: VALIDACIÓN DE DATOS ===")
-    df = pd.read_csv(path, encoding="utf-8-sig")
-    print(f"Dataset cargado: {df.shape[0]} filas x {df.shape[1]} columnas")
+    config.ensure_dirs()
+    columns = pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns.tolist()
+
+    # Una sola pasada por bloques: memoria acotada por el tamaño del bloque
+    n_rows = 0
+    nulls = pd.Series(0, index=columns, dtype="int64")
+    non_conforming = pd.Series(0, index=columns, dtype="int64")
+    fractional, unparseable = set(), set()
+    observed = {}
+    target_counts = pd.Series(dtype="int64")
+    hash_dir = tempfile.TemporaryDirectory(prefix="duplicados_", dir=config.ARTIFACTS_DIR,
+                                           ignore_cleanup_errors=True)
+    row_hashes = DuplicateCounter(hash_dir.name)
+
+    with hash_dir:
+        with step("lectura_bloques") as frame:
+            for chunk, info in iter_typed_chunks(path, chunksize):
+                n_rows += len(chunk)
+                nulls += info["nulos"]
+                non_conforming += pd.Series(info["no_conformes"], index=columns).fillna(0).astype("int64")
+                fractional |= info["fraccionarias"]
+                unparseable |= info["no_numericas"]
+                for col in chunk.columns:
+                    observed.setdefault(col, str(chunk[col].dtype))
+
+                if "Anemia" in chunk.columns:
+                    target_counts = target_counts.add(
+                        chunk["Anemia"].value_counts().astype("int64"), fill_value=0
+                    )
+
+                # Duplicados por hash de fila (8 bytes por fila en lugar del DataFrame completo);
+                # los numéricos se hashean como float64 para que el hash no dependa del ancho del bloque
+                hashable = chunk.astype({c: "float64" for c in chunk.columns
+                                         if chunk[c].dtype.name != "category"})
+                row_hashes.add(pd.util.hash_pandas_object(hashable, index=False).to_numpy())
+            frame.rows = n_rows
+
+        with step("duplicados", rows=n_rows):
+            duplicates = int(row_hashes.count())
+    set_rows(n_rows)
+    print(f"Dataset validado: {n_rows} filas x {len(columns)} columnas")
 
     report = {
-        "n_filas": df.shape[0],
-        "n_columnas": df.shape[1],
-        "columnas": df.columns.tolist(),
-        "nulos": df.isnull().sum().to_dict(),
-        "tipos": df.dtypes.astype(str).to_dict(),
-        "duplicados": int(df.duplicated().sum())
+        "n_filas": n_rows,
+        "n_columnas": len(columns),
+        "columnas": columns,
+        "nulos": {c: int(nulls[c]) for c in columns},
+        "tipos": {
+            c: _report_dtype(SCHEMA[c], nulls[c] > 0, c in fractional, c in unparseable)
+            if c in SCHEMA else ("object" if observed.get(c) == "category" else observed.get(c))
+            for c in columns
+        },
+        "duplicados": duplicates
     }
+    if non_conforming.sum() > 0:
+        report["no_conformes"] = {c: int(v) for c, v in non_conforming.items() if v > 0}
+        print(f"⚠ Valores que no cumplen el esquema: {report['no_conformes']}")
 
     # Distribución del target
-    if "Anemia" in df.columns:
-        dist = df["Anemia"].value_counts(normalize=True).round(3) * 100
+    if "Anemia" in columns:
+        total = target_counts.sum()
+        dist = (target_counts / total).sort_values(ascending=False).round(3) * 100
         report["distribucion_anemia"] = dist.to_dict()
         print("\nDistribución de anemia (%):")
         print(dist)
@@ -31,20 +219,36 @@ def validate_dataset(path=config.DATASET_PATH):
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
     print(f"Reporte guardado en {out_path}")
-    return df
+    return report
 
-def plot_eda(df):
+@profiled("eda")
+def plot_eda(df=None, path=config.DATASET_PATH, sample_rows=config.PLOT_SAMPLE_ROWS):
     print("=== BLOQUE 1B: ANÁLISIS EXPLORATORIO ===")
+    config.ensure_dirs()
     num_cols = ["Edad_meses", "Peso_kg", "Talla_cm", "Hemoglobina_g_dL"]
+    if df is None:
+        # Solo se leen las columnas graficadas, por bloques y con el tipo compacto del esquema
+        chunks = pd.read_csv(path, encoding="utf-8-sig", usecols=num_cols,
+                             dtype={c: "float32" for c in num_cols},
+                             chunksize=config.VALIDATION_CHUNK_ROWS)
+    else:
+        chunks = [df]
+    # Con más filas que sample_rows, histograma y KDE salen de una muestra uniforme
+    with step("muestreo") as frame:
+        sample, total = reservoir_sample(chunks, num_cols, sample_rows)
+        frame.rows = total
+    set_rows(total)
+    n_sample = len(sample[num_cols[0]])
+    scale = total / n_sample if n_sample else 1.0
     eda_dir = os.path.join(config.OUTPUT_DIR, "eda")
-    os.makedirs(eda_dir, exist_ok=True)
 
+    specs = []
     for col in num_cols:
-        plt.figure(figsize=(6,4))
-        sns.histplot(df[col], bins=30, kde=True, color="skyblue")
-        plt.title(f"Distribución de {col}")
-        plt.tight_layout()
-        path = os.path.join(eda_dir, f"hist_{col}.png")
-        plt.savefig(path)
-        plt.close()
-    print(f"Gráficos guardados en {eda_dir}")
+        data = hist_kde(sample[col], bins=30, scale=scale)
+        suffix = f" (muestra de {n_sample:,})" if n_sample < total else ""
+        data.update({"column": col, "title": f"Distribución de {col}{suffix}"})
+        specs.append(FigureSpec("hist_kde", os.path.join(eda_dir, f"hist_{col}.png"), data))
+    with step("figuras"):
+        done = render_figures(specs)
+    print(f"Gráficos guardados en {eda_dir} ({len(done['dibujadas'])} dibujados, "
+          f"{len(done['omitidas'])} sin cambios)")
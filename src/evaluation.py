@@ -3,124 +3,234 @@ import os
 import json
 import joblib
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import (
-    confusion_matrix,
-    roc_auc_score,
-    roc_curve,
-    f1_score,
-    accuracy_score,
-    cohen_kappa_score
-)
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.metrics import roc_curve
 from src import config
-
-
+from src.feature_store import load_features
+from src.figures import FigureSpec, render_figures
+from src.model_search import resolve_n_jobs
+from src.model_training import HOLDOUT_INDEX_PATH
+from src.profiling import profiled, set_rows, step
+
+# Bins de probabilidad para el AUC de cada réplica bootstrap (el AUC puntual es exacto)
+AUC_BINS = 1000
+# Tope de índices remuestreados por lote (réplicas x filas) para acotar la memoria
+BOOTSTRAP_BLOCK = 20_000_000
+
+
+def _metrics_from_cm(cm):
+    """accuracy, F1 macro y kappa para una pila de matrices de confusión (b, k, k)."""
+    cm = cm.astype(np.float64)
+    n = cm.sum(axis=(1, 2))
+    tp = np.diagonal(cm, axis1=1, axis2=2)
+    true_tot, pred_tot = cm.sum(axis=2), cm.sum(axis=1)
+    acc = tp.sum(axis=1) / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        f1 = np.where(true_tot + pred_tot > 0, 2 * tp / (true_tot + pred_tot), 0.0)
+        expected = (true_tot * pred_tot).sum(axis=1) / n ** 2
+        kappa = np.where(expected < 1, (acc - expected) / (1 - expected), 0.0)
+    # Como sklearn: el F1 macro promedia solo las clases presentes en y_true o en y_pred
+    present = (true_tot + pred_tot) > 0
+    f1_macro = (f1 * present).sum(axis=1) / present.sum(axis=1)
+    return {"accuracy": acc, "f1_macro": f1_macro, "kappa": kappa}
+
+
+def _auc_exact(y_true, proba):
+    """AUC uno-contra-resto por clase con la fórmula de rangos (Mann-Whitney)."""
+    aucs = np.full(proba.shape[1], np.nan)
+    for c in range(proba.shape[1]):
+        pos = y_true == c
+        n_pos, n_neg = pos.sum(), (~pos).sum()
+        if n_pos and n_neg:
+            ranks = rankdata(proba[:, c])
+            aucs[c] = (ranks[pos].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+    return aucs
+
+
+def _auc_from_hist(neg, pos):
+    """AUC desde histogramas de puntajes (b, bins) de negativos y positivos; empates a la mitad."""
+    below = np.cumsum(neg, axis=1) - neg
+    num = (pos * (below + 0.5 * neg)).sum(axis=1)
+    den = pos.sum(axis=1) * neg.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def _bootstrap_batch(cell, pos_bins, n_classes, n_reps, seed):
+    """Métricas de n_reps réplicas: un solo bincount por matriz de confusión y por clase."""
+    rng = np.random.default_rng(seed)
+    n = len(cell)
+    idx = rng.integers(0, n, size=(n_reps, n))
+    rep = np.arange(n_reps)[:, None]
+
+    k2 = n_classes * n_classes
+    cm = np.bincount((rep * k2 + cell[idx]).ravel(), minlength=n_reps * k2)
+    out = _metrics_from_cm(cm.reshape(n_reps, n_classes, n_classes))
+
+    aucs = []
+    for c in range(n_classes):
+        hist = np.bincount((rep * 2 * AUC_BINS + pos_bins[c][idx]).ravel(),
+                           minlength=n_reps * 2 * AUC_BINS).reshape(n_reps, 2, AUC_BINS)
+        aucs.append(_auc_from_hist(hist[:, 0], hist[:, 1]))
+    with np.errstate(invalid="ignore"):
+        out["auc"] = np.nanmean(np.stack(aucs, axis=1), axis=1)
+    return out
+
+
+def bootstrap_ci(y_true, proba, n_boot=config.EVAL_BOOTSTRAP, level=config.EVAL_CI_LEVEL,
+                 n_jobs=None, seed=42):
+    """Intervalos percentil bootstrap de accuracy, F1 macro, kappa, AUC y Gini.
+
+    Las réplicas se reparten en lotes independientes (cada uno con su semilla) que
+    corren en paralelo; dentro de un lote todo es vectorizado sobre las réplicas.
+    """
+    n_classes = proba.shape[1]
+    y_pred = proba.argmax(axis=1)
+    cell = y_true * n_classes + y_pred
+    bins = np.minimum((proba * AUC_BINS).astype(np.int64), AUC_BINS - 1)
+    pos_bins = [(y_true == c) * AUC_BINS + bins[:, c] for c in range(n_classes)]
+
+    per_batch = max(1, min(n_boot, BOOTSTRAP_BLOCK // max(len(y_true), 1)))
+    sizes = [min(per_batch, n_boot - start) for start in range(0, n_boot, per_batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    batches = Parallel(n_jobs=min(resolve_n_jobs(n_jobs), len(sizes)))(
+        delayed(_bootstrap_batch)(cell, pos_bins, n_classes, size, s)
+        for size, s in zip(sizes, seeds)
+    )
+
+    reps = {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+    reps["gini"] = 2 * reps["auc"] - 1
+    tail = (1 - level) / 2 * 100
+    return {
+        key: [round(float(np.nanpercentile(values, tail)), 4),
+              round(float(np.nanpercentile(values, 100 - tail)), 4)]
+        for key, values in reps.items()
+    }
+
+
+def evaluate_predictions(y_true, proba, n_boot=config.EVAL_BOOTSTRAP, n_jobs=None):
+    """Todas las métricas a partir de una única matriz de probabilidades.
+
+    Devuelve métricas puntuales, matriz de confusión, AUC y curva ROC por clase e
+    intervalos bootstrap. No vuelve a llamar al modelo.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    n_classes = proba.shape[1]
+    y_pred = proba.argmax(axis=1)
+    cm = np.bincount(y_true * n_classes + y_pred, minlength=n_classes ** 2).reshape(n_classes, n_classes)
+    point = {key: float(value[0]) for key, value in _metrics_from_cm(cm[None]).items()}
+
+    auc_per_class = _auc_exact(y_true, proba)
+    auc = float(np.nanmean(auc_per_class)) if not np.isnan(auc_per_class).all() else np.nan
+    roc = {}
+    for c in range(n_classes):
+        if not np.isnan(auc_per_class[c]):
+            fpr, tpr, _ = roc_curve(y_true == c, proba[:, c])
+            roc[c] = (fpr, tpr)
+
+    return {
+        **point,
+        "auc": auc,
+        "gini": 2 * auc - 1 if not np.isnan(auc) else np.nan,
+        "auc_por_clase": auc_per_class,
+        "confusion": cm,
+        "roc": roc,
+        "ic": bootstrap_ci(y_true, proba, n_boot=n_boot, n_jobs=n_jobs) if n_boot else {}
+    }
+
+
+def _round(value):
+    return round(float(value), 4) if not np.isnan(value) else None
+
+
+@profiled("evaluate")
 def evaluate_models():
     print("=== BLOQUE 5: EVALUACIÓN DE MODELOS ===")
+    config.ensure_dirs()
 
     # Rutas
     rf_path = os.path.join(config.ARTIFACTS_DIR, "model_RandomForest.joblib")
     xgb_path = os.path.join(config.ARTIFACTS_DIR, "model_XGBoost.joblib")
-    data_path = os.path.join(config.OUTPUT_DIR, "featured_dataset.csv")
     map_path = os.path.join(config.ARTIFACTS_DIR, "label_mapping.json")
 
     # Verificar existencia
-    for path in [rf_path, xgb_path, data_path, map_path]:
+    for path in [rf_path, xgb_path, map_path, HOLDOUT_INDEX_PATH]:
         if not os.path.exists(path):
             raise FileNotFoundError(f"No se encontró: {path}")
 
-    # Cargar dataset y mapeo de etiquetas
-    df = pd.read_csv(data_path)
-    X = df.drop(columns=["Anemia"])
-    y_true = df["Anemia"]
+    # Cargar dataset (disperso o denso), mapeo de etiquetas y filas de prueba del entrenamiento
+    with step("carga_features"):
+        X, y_true, _ = load_features()
 
     with open(map_path, "r", encoding="utf-8") as f:
         label_map = json.load(f)
 
+    holdout = np.load(HOLDOUT_INDEX_PATH)
+    X_test = X[holdout]
     # Convertir etiquetas de texto a números según el mapeo
-    y_true = y_true.map(label_map)
+    y_test = np.array([label_map[label] for label in y_true[holdout]], dtype=np.int64)
     class_labels = list(label_map.keys())
+    set_rows(len(holdout))
+    print(f"Evaluando sobre {len(holdout)} filas de prueba")
 
-    # Cargar modelos entrenados
-    rf_model = joblib.load(rf_path)
-    xgb_model = joblib.load(xgb_path)
+    results, details, figures = {}, {}, []
 
-    results = {}
-
-    for name, model in [("RandomForest", rf_model), ("XGBoost", xgb_model)]:
+    for name, path in [("RandomForest", rf_path), ("XGBoost", xgb_path)]:
         print(f"\n📊 Evaluando modelo: {name}")
-
-        # Predicciones
-        y_pred = model.predict(X)
-
-        # Métricas principales
-        acc = accuracy_score(y_true, y_pred)
-        f1 = f1_score(y_true, y_pred, average="macro")
-        kappa = cohen_kappa_score(y_true, y_pred)
-
-        # ROC / AUC
-        try:
-            y_prob = model.predict_proba(X)
-            auc = roc_auc_score(
-                pd.get_dummies(y_true),
-                y_prob,
-                average="macro",
-                multi_class="ovr"
-            )
-        except Exception:
-            auc = np.nan
-
-        gini = (2 * auc - 1) if not np.isnan(auc) else np.nan
-
-        # === Matriz de Confusión ===
-        cm = confusion_matrix(y_true, y_pred, labels=range(len(class_labels)))
-        plt.figure(figsize=(6, 5))
-        sns.heatmap(
-            cm,
-            annot=True,
-            fmt="d",
-            cmap="Blues",
-            xticklabels=class_labels,
-            yticklabels=class_labels
-        )
-        plt.title(f"Matriz de Confusión — {name}")
-        plt.ylabel("Real")
-        plt.xlabel("Predicho")
-
-        cm_path = os.path.join(config.OUTPUT_DIR, f"cm_{name}.png")
-        plt.savefig(cm_path, bbox_inches="tight")
-        plt.close()
-
-        # === Curva ROC (solo si aplica) ===
-        if not np.isnan(auc):
-            plt.figure(figsize=(6, 5))
-            fpr, tpr, _ = roc_curve(pd.get_dummies(y_true).values.ravel(),
-                                    y_prob.ravel())
-            plt.plot(fpr, tpr, label=f"{name} (AUC={auc:.3f})")
-            plt.plot([0, 1], [0, 1], "k--")
-            plt.xlabel("Tasa de Falsos Positivos")
-            plt.ylabel("Tasa de Verdaderos Positivos")
-            plt.title(f"Curva ROC — {name}")
-            plt.legend()
-            roc_path = os.path.join(config.OUTPUT_DIR, f"roc_{name}.png")
-            plt.savefig(roc_path, bbox_inches="tight")
-            plt.close()
+        model = joblib.load(path)
+
+        # Una sola inferencia por modelo; el resto se deriva de estas probabilidades
+        with step(f"inferencia_{name}", rows=len(holdout)):
+            proba = model.predict_proba(X_test)
+        with step(f"metricas_{name}", rows=len(holdout)):
+            ev = evaluate_predictions(y_test, proba)
+
+        # === Matriz de Confusión y curvas ROC por clase (se dibujan todas juntas al final) ===
+        figures.append(FigureSpec("confusion", os.path.join(config.OUTPUT_DIR, f"cm_{name}.png"), {
+            "matrix": ev["confusion"],
+            "labels": class_labels,
+            "title": f"Matriz de Confusión — {name}"
+        }))
+        if ev["roc"]:
+            figures.append(FigureSpec("roc", os.path.join(config.OUTPUT_DIR, f"roc_{name}.png"), {
+                "curves": [
+                    {"label": class_labels[c], "fpr": fpr, "tpr": tpr, "auc": float(ev["auc_por_clase"][c])}
+                    for c, (fpr, tpr) in ev["roc"].items()
+                ],
+                "title": f"Curva ROC — {name} (AUC macro={ev['auc']:.3f})"
+            }))
 
         # === Guardar métricas ===
         results[name] = {
-            "accuracy": round(acc, 4),
-            "f1_macro": round(f1, 4),
-            "kappa": round(kappa, 4),
-            "auc": round(auc, 4) if not np.isnan(auc) else None,
-            "gini": round(gini, 4) if not np.isnan(gini) else None
+            "accuracy": round(ev["accuracy"], 4),
+            "f1_macro": round(ev["f1_macro"], 4),
+            "kappa": round(ev["kappa"], 4),
+            "auc": _round(ev["auc"]),
+            "gini": _round(ev["gini"])
         }
+        details[name] = {
+            "filas": int(len(y_test)),
+            "ic": ev["ic"],
+            "auc_por_clase": {class_labels[c]: _round(v) for c, v in enumerate(ev["auc_por_clase"])},
+            "matriz_confusion": ev["confusion"].tolist()
+        }
+        print(f"  {results[name]}")
+        print(f"  IC {config.EVAL_CI_LEVEL:.0%}: {ev['ic']}")
+
+    with step("figuras"):
+        done = render_figures(figures)
+    print(f"\nGráficos: {len(done['dibujadas'])} dibujados, {len(done['omitidas'])} sin cambios")
 
     # Guardar reporte JSON
     report_path = os.path.join(config.ARTIFACTS_DIR, "metrics_report.json")
     with open(report_path, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=4, ensure_ascii=False)
 
-    print(f"\n✔ Reporte de métricas guardado en: {report_path}")
+    details_path = os.path.join(config.ARTIFACTS_DIR, "metrics_details.json")
+    with open(details_path, "w", encoding="utf-8") as f:
+        json.dump({"nivel_ic": config.EVAL_CI_LEVEL, "bootstrap": config.EVAL_BOOTSTRAP,
+                   "modelos": details}, f, indent=4, ensure_ascii=False)
+
+    print(f"\n✔ Reporte de métricas guardado en: {report_path} (detalle e IC en {details_path})")
     return results
@@ -0,0 +1,218 @@
+# src/external_training.py
+import os
+import time
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.metrics import accuracy_score, f1_score, cohen_kappa_score
+from sklearn.preprocessing import FunctionTransformer
+from src import config
+from src.data_split import is_test_row
+from src.inference import InferencePipeline, save_pipeline
+from src.model_artifacts import export_shared_model
+from src.prediction_cache import invalidate_disk_cache
+from src.model_search import DEFAULT_PARAMS
+from src.preprocessing import NUM_COLS, build_preprocessor, get_feature_names, to_text
+
+# Nombre propio de los artefactos: este modelo no comparte el almacén de características,
+# holdout_index.npy, COMPACT_FEATURES ni el balanceo de train_models(), así que no
+# reemplaza al XGBoost del pipeline principal
+EXTERNAL_MODEL_NAME = "XGBoostExterno"
+
+
+def iter_raw_chunks(path, chunk_rows):
+    # Categóricos tal como están en el CSV: si no, un bloque con vacíos lee 101.0 y otro 101
+    columns = pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns
+    dtype = {c: str for c in columns if c not in NUM_COLS + ["ID"]}
+    return pd.read_csv(path, encoding="utf-8-sig", chunksize=chunk_rows, dtype=dtype)
+
+
+def _typed(df, num_cols, cat_cols):
+    # Los mismos tipos que InferencePipeline.transform
+    X = df.reindex(columns=num_cols + cat_cols)
+    X[num_cols] = X[num_cols].apply(pd.to_numeric, errors="coerce")
+    X[cat_cols] = X[cat_cols].astype(object)
+    return X
+
+
+def fit_preprocessor_streaming(path=config.DATASET_PATH, chunk_rows=config.EXTERNAL_CHUNK_ROWS,
+                               sample_rows=config.EXTERNAL_FIT_SAMPLE, seed=42):
+    """Ajusta el preprocesador en una pasada por bloques con memoria acotada.
+
+    Las categorías del one-hot se reúnen completas de todos los bloques; medianas y
+    escalas se ajustan sobre una muestra uniforme de sample_rows filas (bottom-k por
+    clave aleatoria). Devuelve el mismo dict que guarda preprocess_data, más las
+    clases de Anemia y el total de filas.
+    """
+    rng = np.random.default_rng(seed)
+    num_cols = list(NUM_COLS)
+    cat_cols, categories, labels = None, {}, set()
+    sample, n_rows = None, 0
+
+    for chunk in iter_raw_chunks(path, chunk_rows):
+        if cat_cols is None:
+            cat_cols = [c for c in chunk.columns if c not in num_cols + ["Anemia", "ID"]]
+            categories = {c: set() for c in cat_cols}
+        for c in cat_cols:
+            # Como texto: un bloque puede leer números y otro texto en la misma columna
+            categories[c].update(chunk[c].dropna().astype(str).unique().tolist())
+        labels.update(chunk["Anemia"].dropna().astype(str).unique().tolist())
+
+        chunk = chunk[num_cols + cat_cols].assign(_clave=rng.random(len(chunk)))
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if len(sample) > sample_rows:
+            sample = sample.nsmallest(sample_rows, "_clave")
+        n_rows += len(chunk)
+
+    if cat_cols is None:
+        raise ValueError(f"El archivo {path} no tiene filas")
+
+    preprocessor = build_preprocessor(num_cols, cat_cols, sparse_output=True)
+    # Las filas llegan al one-hot como texto, igual que las categorías reunidas
+    cat_pipeline = dict((name, steps) for name, steps, _ in preprocessor.transformers)["cat"]
+    cat_pipeline.steps.insert(0, ("text", FunctionTransformer(to_text, feature_names_out="one-to-one")))
+    preprocessor.set_params(cat__encoder__categories=[sorted(categories[c]) for c in cat_cols])
+    preprocessor.fit(_typed(sample, num_cols, cat_cols))
+    return {
+        "preprocessor": preprocessor,
+        "num_cols": num_cols,
+        "cat_cols": cat_cols,
+        "feature_names": get_feature_names(preprocessor, num_cols, cat_cols),
+        "label_classes": sorted(labels),
+        "n_rows": n_rows
+    }
+
+
+class FeatureChunkIter(xgboost.DataIter):
+    """Iterador de XGBoost que lee el CSV crudo por bloques y entrega CSR ya transformado.
+
+    subset elige las filas de entrenamiento ("train") o de prueba ("test"). XGBoost
+    llama a reset() al inicio de cada pasada; nunca hay más de un bloque en memoria.
+    """
+
+    def __init__(self, path, prep, label_index, chunk_rows, subset="train", cache_prefix=None):
+        self.path = path
+        self.prep = prep
+        self.label_index = label_index
+        self.chunk_rows = chunk_rows
+        self.subset = subset
+        self._chunks = None
+        self._offset = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._chunks = iter_raw_chunks(self.path, self.chunk_rows)
+        self._offset = 0
+
+    def next_block(self):
+        """(X CSR, y) del siguiente bloque del subconjunto, o None al terminar."""
+        if self._chunks is None:
+            self.reset()
+        for chunk in self._chunks:
+            positions = np.arange(self._offset, self._offset + len(chunk))
+            self._offset += len(chunk)
+            mask = is_test_row(positions) == (self.subset == "test")
+            chunk = chunk[mask & chunk["Anemia"].notna().values]
+            if len(chunk):
+                X = self.prep["preprocessor"].transform(
+                    _typed(chunk, self.prep["num_cols"], self.prep["cat_cols"]))
+                y = chunk["Anemia"].astype(str).map(self.label_index).to_numpy(dtype=np.float32)
+                return X, y
+        return None
+
+    def next(self, input_data):
+        block = self.next_block()
+        if block is None:
+            return 0
+        input_data(data=block[0], label=block[1])
+        return 1
+
+
+def _booster_params(n_classes, n_jobs):
+    params = dict(DEFAULT_PARAMS["XGBoost"])
+    rounds = params.pop("n_estimators")
+    params.update({
+        "objective": "multi:softprob",
+        "num_class": n_classes,
+        "tree_method": "hist",
+        "eta": params.pop("learning_rate"),
+        "nthread": n_jobs or (os.cpu_count() or 1),
+        "seed": 42
+    })
+    return params, rounds
+
+
+def evaluate_streaming(booster, path, prep, label_index, chunk_rows):
+    """Métricas sobre las filas de prueba, prediciendo bloque a bloque."""
+    it = FeatureChunkIter(path, prep, label_index, chunk_rows, subset="test")
+    y_true, y_pred = [], []
+    while True:
+        block = it.next_block()
+        if block is None:
+            break
+        y_true.append(block[1].astype(np.int64))
+        y_pred.append(booster.predict(xgboost.DMatrix(block[0])).argmax(axis=1))
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "f1_macro": f1_score(y_true, y_pred, average="macro"),
+        "kappa": cohen_kappa_score(y_true, y_pred),
+        "filas_prueba": int(len(y_true))
+    }
+
+
+def train_xgboost_external(path=config.DATASET_PATH, chunk_rows=config.EXTERNAL_CHUNK_ROWS,
+                           dmatrix=config.EXTERNAL_DMATRIX, n_jobs=config.N_JOBS, save=True):
+    """Entrena XGBoost sin cargar el dataset completo en memoria.
+
+    dmatrix="external": DMatrix de memoria externa (páginas en caché de disco).
+    dmatrix="quantile": QuantileDMatrix, que guarda en RAM solo el histograma cuantizado.
+    Con save=True guarda model_XGBoostExterno / pipeline_XGBoostExterno /
+    artifacts/models/XGBoostExterno, aparte de los artefactos de train_models(): su
+    preprocesador (one-hot completo, split por hash de fila y sin balanceo) no es el
+    del almacén de características ni el de holdout_index.npy.
+    """
+    print("=== BLOQUE 4B: ENTRENAMIENTO XGBOOST FUERA DE MEMORIA ===")
+    config.ensure_dirs()
+    start = time.perf_counter()
+    prep = fit_preprocessor_streaming(path, chunk_rows)
+    classes = prep.pop("label_classes")
+    n_rows = prep.pop("n_rows")
+    label_index = {cls: i for i, cls in enumerate(classes)}
+    print(f"Preprocesador ajustado por bloques ({n_rows} filas, {len(prep['feature_names'])} columnas)")
+
+    params, rounds = _booster_params(len(classes), n_jobs)
+    with tempfile.TemporaryDirectory(prefix="xgb_cache_", dir=config.ARTIFACTS_DIR) as cache_dir:
+        if dmatrix == "external":
+            it = FeatureChunkIter(path, prep, label_index, chunk_rows,
+                                  cache_prefix=os.path.join(cache_dir, "train"))
+            dtrain = xgboost.DMatrix(it, missing=np.nan)
+        elif dmatrix == "quantile":
+            it = FeatureChunkIter(path, prep, label_index, chunk_rows)
+            dtrain = xgboost.QuantileDMatrix(it, missing=np.nan)
+        else:
+            raise ValueError(f"Tipo de DMatrix desconocido: {dmatrix}")
+        booster = xgboost.train(params, dtrain, num_boost_round=rounds)
+        del dtrain
+
+    metrics = evaluate_streaming(booster, path, prep, label_index, chunk_rows)
+    metrics["segundos"] = round(time.perf_counter() - start, 2)
+    print(f"XGBoost ({dmatrix}): {metrics}")
+
+    if save:
+        # Envoltorio sklearn para que inferencia, scoring y app lo usen igual que al modelo en memoria
+        model = xgboost.XGBClassifier()
+        model.load_model(booster.save_raw(raw_format="ubj"))
+        model_path = os.path.join(config.ARTIFACTS_DIR, f"model_{EXTERNAL_MODEL_NAME}.joblib")
+        joblib.dump(model, model_path)
+        pipeline = InferencePipeline(
+            prep["preprocessor"], model, prep["num_cols"], prep["cat_cols"],
+            prep["feature_names"], label_index, EXTERNAL_MODEL_NAME
+        )
+        pipeline_file = save_pipeline(pipeline)
+        shared_dir = export_shared_model(pipeline)
+        print(f"Modelo guardado en {model_path}, {pipeline_file} y {shared_dir}")
+        invalidate_disk_cache(config.CACHE_DISK_PATH, model_name=EXTERNAL_MODEL_NAME)
+    return booster, metrics
@@ -0,0 +1,111 @@
+# src/feature_store.py
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from scipy import sparse
+from src import config
+
+STORE_DIR = os.path.join(config.OUTPUT_DIR, "feature_store")
+STORE_FORMAT_VERSION = 1
+
+
+def store_path(name="featured"):
+    return os.path.join(STORE_DIR, name)
+
+
+def save_features(X, y, feat_names, name="featured", export_csv=config.EXPORT_FEATURED_CSV):
+    """Guarda la matriz (densa o CSR) y las etiquetas como .npy tipados + meta.json.
+
+    Cada arreglo se escribe por separado para poder abrirlo con memory mapping.
+    """
+    final_dir = store_path(name)
+    tmp_dir = final_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    is_sparse = sparse.issparse(X)
+    if is_sparse:
+        X = X.tocsr()
+        np.save(os.path.join(tmp_dir, "data.npy"), X.data)
+        np.save(os.path.join(tmp_dir, "indices.npy"), X.indices)
+        np.save(os.path.join(tmp_dir, "indptr.npy"), X.indptr)
+        dtype = X.dtype
+    else:
+        X = np.ascontiguousarray(X)
+        np.save(os.path.join(tmp_dir, "X.npy"), X)
+        dtype = X.dtype
+
+    # Etiquetas como códigos enteros; las clases van en el sidecar
+    classes, codes = np.unique(np.asarray(y).astype(str), return_inverse=True)
+    np.save(os.path.join(tmp_dir, "labels.npy"), codes.astype(np.uint8))
+
+    meta = {
+        "format_version": STORE_FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sparse": is_sparse,
+        "shape": [int(X.shape[0]), int(X.shape[1])],
+        "dtype": str(dtype),
+        "feature_names": list(feat_names),
+        "label_classes": classes.tolist()
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    # Reemplazo atómico del directorio para no dejar un almacén a medio escribir
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir)
+    os.rename(tmp_dir, final_dir)
+
+    if export_csv:
+        export_features_csv(name)
+    return final_dir
+
+
+def load_meta(name="featured"):
+    meta_path = os.path.join(store_path(name), "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No se encontró el almacén de características: {meta_path}")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != STORE_FORMAT_VERSION:
+        raise ValueError(f"Formato de almacén incompatible en {store_path(name)}")
+    return meta
+
+
+def load_features(name="featured", mmap=True):
+    """Devuelve (X, y, feat_names). Con mmap=True los arreglos se leen sin copiarlos a RAM."""
+    meta = load_meta(name)
+    base = store_path(name)
+    mmap_mode = "r" if mmap else None
+
+    if meta["sparse"]:
+        data = np.load(os.path.join(base, "data.npy"), mmap_mode=mmap_mode)
+        indices = np.load(os.path.join(base, "indices.npy"), mmap_mode=mmap_mode)
+        indptr = np.load(os.path.join(base, "indptr.npy"), mmap_mode=mmap_mode)
+        X = sparse.csr_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+    else:
+        X = np.load(os.path.join(base, "X.npy"), mmap_mode=mmap_mode)
+
+    codes = np.load(os.path.join(base, "labels.npy"), mmap_mode=mmap_mode)
+    y = np.asarray(meta["label_classes"], dtype=object)[codes]
+    return X, y, meta["feature_names"]
+
+
+def export_features_csv(name="featured", path=None, chunk_rows=50000):
+    """Exportación explícita a CSV (por bloques, para no densificar toda la matriz)."""
+    X, y, feat_names = load_features(name)
+    path = path or os.path.join(config.OUTPUT_DIR, f"{name}_dataset.csv")
+    for start in range(0, X.shape[0], chunk_rows):
+        block = X[start:start + chunk_rows]
+        if sparse.issparse(block):
+            block = block.toarray()
+        df = pd.DataFrame(block, columns=feat_names)
+        df["Anemia"] = y[start:start + chunk_rows]
+        df.to_csv(path, mode="w" if start == 0 else "a", header=start == 0,
+                  index=False, encoding="utf-8-sig" if start == 0 else "utf-8")
+    print(f"✔ Exportación CSV guardada en {path}")
+    return path
@@ -0,0 +1,212 @@
+# src/figures.py
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src import config
+
+# Huella de los datos de cada figura ya dibujada (un archivo por figura: sin carreras entre etapas)
+HASH_DIR = os.path.join(config.ARTIFACTS_DIR, "figure_hashes")
+
+
+class FigureSpec:
+    """Figura a dibujar: renderizador (kind), archivo de salida y datos ya calculados.
+
+    data solo lleva lo que el gráfico necesita (conteos, curvas, matrices), así
+    que su hash identifica el contenido de la figura.
+    """
+
+    def __init__(self, kind, path, data):
+        self.kind = kind
+        self.path = path
+        self.data = data
+
+    def digest(self):
+        h = hashlib.sha256(self.kind.encode("utf-8"))
+        _update_hash(h, self.data)
+        return h.hexdigest()
+
+
+def _update_hash(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(f"nd{value.dtype.str}{value.shape}".encode("ascii"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            h.update(f"k{key}".encode("utf-8"))
+            _update_hash(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f"l{len(value)}".encode("ascii"))
+        for item in value:
+            _update_hash(h, item)
+    else:
+        h.update(json.dumps(value, default=float).encode("utf-8"))
+
+
+# === Cálculo vectorizado ===
+
+def reservoir_sample(chunks, columns, size, seed=42):
+    """Muestra uniforme de `size` filas de un iterable de DataFrames (bottom-k por clave aleatoria).
+
+    Devuelve (dict columna -> arreglo muestreado, filas totales).
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.empty(0)
+    values = {c: np.empty(0, dtype=np.float64) for c in columns}
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        for c in columns:
+            values[c] = np.concatenate([values[c], chunk[c].to_numpy(dtype=np.float64)])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size)[:size]
+            keys = keys[keep]
+            values = {c: v[keep] for c, v in values.items()}
+    return values, total
+
+
+def hist_kde(values, bins=30, grid_points=200, scale=1.0):
+    """Histograma y KDE gaussiana (regla de Scott) con NumPy.
+
+    La KDE se evalúa sobre un histograma fino convolucionado con el núcleo, así que
+    el costo es lineal en las filas. scale lleva los conteos de una muestra al total.
+    """
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    out = {"counts": counts * scale, "edges": edges, "n": int(len(values) * scale)}
+    std = values.std() if len(values) > 1 else 0.0
+    if std == 0:
+        return out
+
+    bandwidth = std * len(values) ** (-1 / 5)
+    lo, hi = edges[0] - 3 * bandwidth, edges[-1] + 3 * bandwidth
+    fine, fine_edges = np.histogram(values, bins=grid_points * 4, range=(lo, hi))
+    step = fine_edges[1] - fine_edges[0]
+    half = min(int(4 * bandwidth / step) + 1, (len(fine) - 1) // 2)
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(fine, kernel, mode="same") / len(values)
+    centers = (fine_edges[:-1] + fine_edges[1:]) / 2
+    grid = np.linspace(edges[0], edges[-1], grid_points)
+    # Misma escala que seaborn: densidad x filas x ancho de barra
+    out["kde_x"] = grid
+    out["kde_y"] = np.interp(grid, centers, density) * out["n"] * (edges[1] - edges[0])
+    return out
+
+
+# === Renderizadores (solo API orientada a objetos: sin estado global de pyplot) ===
+
+def _new_figure(figsize):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    return fig, fig.add_subplot()
+
+
+def _render_hist_kde(path, data):
+    fig, ax = _new_figure((6, 4))
+    ax.stairs(data["counts"], data["edges"], fill=True, color="skyblue", alpha=0.6)
+    ax.stairs(data["counts"], data["edges"], color="steelblue", linewidth=0.6)
+    if "kde_x" in data:
+        ax.plot(data["kde_x"], data["kde_y"], color="skyblue", linewidth=2)
+    ax.set_title(data["title"])
+    ax.set_xlabel(data["column"])
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _render_confusion(path, data):
+    import seaborn as sns
+    fig, ax = _new_figure((6, 5))
+    sns.heatmap(np.asarray(data["matrix"]), annot=True, fmt="d", cmap="Blues",
+                xticklabels=data["labels"], yticklabels=data["labels"], ax=ax)
+    ax.set_title(data["title"])
+    ax.set_ylabel("Real")
+    ax.set_xlabel("Predicho")
+    fig.savefig(path, bbox_inches="tight")
+
+
+def _render_roc(path, data):
+    fig, ax = _new_figure((6, 5))
+    for curve in data["curves"]:
+        ax.plot(curve["fpr"], curve["tpr"], label=f"{curve['label']} (AUC={curve['auc']:.3f})")
+    ax.plot([0, 1], [0, 1], "k--")
+    ax.set_xlabel("Tasa de Falsos Positivos")
+    ax.set_ylabel("Tasa de Verdaderos Positivos")
+    ax.set_title(data["title"])
+    ax.legend()
+    fig.savefig(path, bbox_inches="tight")
+
+
+def _render_bars(path, data):
+    import pandas as pd
+    import seaborn as sns
+    fig, ax = _new_figure((9, 5))
+    melted = pd.DataFrame(data["rows"])
+    sns.barplot(data=melted, x="Valor", y="Métrica", hue="Modelo", palette="viridis", ax=ax)
+    ax.set_title(data["title"])
+    ax.set_xlabel("Valor")
+    ax.set_ylabel("Métrica")
+    ax.legend(title="Modelo", loc="lower right")
+    fig.tight_layout()
+    fig.savefig(path, bbox_inches="tight")
+
+
+RENDERERS = {
+    "hist_kde": _render_hist_kde,
+    "confusion": _render_confusion,
+    "roc": _render_roc,
+    "bars": _render_bars
+}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render(kind, path, data):
+    RENDERERS[kind](path, data)
+    return path
+
+
+def _hash_path(path):
+    rel = os.path.relpath(path, config.BASE_DIR).replace(os.sep, "__")
+    return os.path.join(HASH_DIR, rel + ".sha256")
+
+
+def render_figures(specs, max_workers=config.PLOT_WORKERS, force=False):
+    """Dibuja las figuras cuyo contenido cambió, en paralelo con backend Agg.
+
+    Una figura se omite si su archivo existe y el hash de sus datos coincide con el
+    de la última vez. Devuelve {"dibujadas": [...], "omitidas": [...]}.
+    """
+    os.makedirs(HASH_DIR, exist_ok=True)
+    pending, skipped = [], []
+    for spec in specs:
+        digest = spec.digest()
+        hash_file = _hash_path(spec.path)
+        if not force and os.path.exists(spec.path) and os.path.exists(hash_file):
+            with open(hash_file, "r", encoding="ascii") as f:
+                if f.read().strip() == digest:
+                    skipped.append(spec.path)
+                    continue
+        os.makedirs(os.path.dirname(spec.path), exist_ok=True)
+        pending.append((spec, digest, hash_file))
+
+    workers = min(max_workers or (os.cpu_count() or 1), len(pending))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            list(pool.map(_render, *zip(*[(s.kind, s.path, s.data) for s, _, _ in pending])))
+    else:
+        # Figure.savefig usa Agg para PNG sin tocar el backend del proceso
+        for spec, _, _ in pending:
+            _render(spec.kind, spec.path, spec.data)
+
+    # La huella se escribe solo después de que la imagen quedó en disco
+    for _, digest, hash_file in pending:
+        with open(hash_file, "w", encoding="ascii") as f:
+            f.write(digest)
+    return {"dibujadas": [s.path for s, _, _ in pending], "omitidas": skipped}
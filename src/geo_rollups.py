@@ -0,0 +1,243 @@
+# src/geo_rollups.py
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from src import config
+
+ROLLUP_PATH = os.path.join(config.ARTIFACTS_DIR, "geo_rollups.sqlite")
+GEO_LEVELS = ["Departamento", "Provincia", "Distrito"]
+LEVELS = ["Nacional"] + GEO_LEVELS
+SEGMENTS = ["Area", "Programa_Juntos", "Programa_QaliWarma", "Programa_VasoLeche"]
+# Clave de una fila de resumen; en los niveles superiores las columnas geográficas más finas quedan en ""
+KEY_COLUMNS = ["nivel", "departamento", "provincia", "distrito", "segmento", "valor"]
+MISSING = "(sin dato)"
+# Fusionar los parciales cada tantos bloques acota la memoria en archivos muy grandes
+MERGE_EVERY = 32
+# PRAGMA user_version del sqlite: los agregados sin versión de modelo (formato 1) no se mezclan
+ROLLUP_FORMAT_VERSION = 2
+
+
+def _text(df, col):
+    if col not in df:
+        return np.full(len(df), MISSING, dtype=object)
+    return df[col].astype("string").str.strip().fillna(MISSING).replace("", MISSING).to_numpy(dtype=object)
+
+
+def rollup_chunk(df, proba):
+    """Agregados parciales de un bloque puntuado.
+
+    Una fila por nivel (Nacional, Departamento, Provincia, Distrito), región y
+    segmento (total, o cada valor de Area y de los Programa_*), con el número de
+    filas, las predicciones por clase (pred_i) y la suma de probabilidades (suma_i).
+    Solo se agrupan las filas crudas a nivel de distrito; los niveles superiores se
+    suman desde ese resultado, que es mucho más chico.
+    """
+    proba = np.asarray(proba)
+    k = proba.shape[1]
+    geo = {col.lower(): _text(df, col) for col in GEO_LEVELS}
+    values = pd.DataFrame(np.eye(k, dtype=np.int64)[proba.argmax(axis=1)],
+                          columns=[f"pred_{i}" for i in range(k)])
+    values.insert(0, "filas", 1)
+    for i in range(k):
+        values[f"suma_{i}"] = proba[:, i].astype(np.float64)
+
+    parts = []
+    geo_keys = [col.lower() for col in GEO_LEVELS]
+    for segment in [""] + SEGMENTS:
+        frame = values.assign(**geo, valor=_text(df, segment) if segment else "")
+        by_district = frame.groupby(geo_keys + ["valor"], sort=False).sum()
+        for depth, level in enumerate(LEVELS):
+            keep = geo_keys[:depth]
+            grouped = by_district.groupby(keep + ["valor"], sort=False).sum().reset_index()
+            for col in geo_keys[depth:]:
+                grouped[col] = ""
+            parts.append(grouped.assign(nivel=level, segmento=segment))
+    return merge_partials(parts)
+
+
+def merge_partials(parts):
+    """Suma parciales con la misma clave (bloques distintos de una misma corrida)."""
+    parts = [p for p in parts if p is not None and len(p)]
+    if not parts:
+        return None
+    merged = pd.concat(parts, ignore_index=True).groupby(KEY_COLUMNS, sort=False).sum().reset_index()
+    return merged[KEY_COLUMNS + [c for c in merged.columns if c not in KEY_COLUMNS]]
+
+
+def batch_key(path, version):
+    """Identidad de un archivo puntuado (ruta, tamaño y fecha) con una versión del modelo.
+
+    Cada lote se suma una sola vez por versión; tras un reentrenamiento el mismo
+    archivo vuelve a puntuarse y se suma a los agregados de la versión nueva.
+    """
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}:{version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class RollupStore:
+    """Resúmenes de riesgo por región en sqlite, indexados para consultas de detalle.
+
+    La tabla agregados guarda sumas (filas, predicciones y probabilidades por clase),
+    así que un lote nuevo se incorpora con un upsert que suma sobre las filas
+    existentes; las medias y porcentajes se calculan al consultar. Cada versión del
+    modelo tiene sus propios agregados: nunca se suman predicciones de un modelo
+    reentrenado a las del anterior. La clave primaria (modelo, version, nivel,
+    departamento, provincia, distrito, segmento, valor) sirve las bajadas
+    Departamento → Provincia → Distrito sin recorrer la tabla.
+    """
+
+    def __init__(self, path=ROLLUP_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # Una conexión compartida entre hilos (sesiones de la app): cada operación toma el candado
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        tables = self._db.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        stored_format = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if tables and stored_format != ROLLUP_FORMAT_VERSION:
+            self._db.close()
+            raise ValueError(f"{path} tiene agregados en un formato anterior ({stored_format}); "
+                             f"bórrelo y vuelva a puntuar los lotes")
+        self._db.execute(f"PRAGMA user_version = {ROLLUP_FORMAT_VERSION}")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS modelos (
+                                modelo TEXT PRIMARY KEY, clases TEXT NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS lotes (
+                                modelo TEXT NOT NULL, version TEXT NOT NULL, clave TEXT NOT NULL, archivo TEXT,
+                                filas INTEGER NOT NULL, fecha TEXT NOT NULL, PRIMARY KEY (modelo, version, clave))""")
+        self._db.commit()
+
+    # === Esquema ===
+
+    def _n_classes(self):
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(agregados)")]
+        return sum(c.startswith("pred_") for c in columns) or None
+
+    def _ensure_table(self, n_classes):
+        current = self._n_classes()
+        if current is None:
+            counts = ", ".join(f"pred_{i} INTEGER NOT NULL" for i in range(n_classes))
+            sums = ", ".join(f"suma_{i} REAL NOT NULL" for i in range(n_classes))
+            self._db.execute(f"""CREATE TABLE agregados (
+                                     modelo TEXT NOT NULL, version TEXT NOT NULL, nivel TEXT NOT NULL,
+                                     departamento TEXT NOT NULL, provincia TEXT NOT NULL, distrito TEXT NOT NULL,
+                                     segmento TEXT NOT NULL, valor TEXT NOT NULL, filas INTEGER NOT NULL,
+                                     {counts}, {sums},
+                                     PRIMARY KEY (modelo, version, nivel, departamento, provincia, distrito,
+                                                  segmento, valor))
+                                 WITHOUT ROWID""")
+            # Para listar un segmento (p. ej. Area = Rural) en todas las regiones de un nivel
+            self._db.execute("CREATE INDEX idx_agregados_segmento ON agregados (modelo, version, nivel, segmento, valor)")
+        elif current != n_classes:
+            raise ValueError(f"{self.path} guarda {current} clases y el modelo tiene {n_classes}")
+
+    # === Escritura ===
+
+    def upsert(self, model_name, version, class_names, partial, key=None, source=None):
+        """Suma un lote a los agregados de esa versión (una transacción). False si ya estaba sumado."""
+        if partial is None or not len(partial):
+            return False
+        version = str(version)
+        value_cols = [c for c in partial.columns if c not in KEY_COLUMNS]
+        with self._lock, self._db:
+            if key is not None and self._db.execute(
+                    "SELECT 1 FROM lotes WHERE modelo = ? AND version = ? AND clave = ?",
+                    (model_name, version, key)).fetchone():
+                return False
+            self._ensure_table(len(class_names))
+            stored = self._db.execute("SELECT clases FROM modelos WHERE modelo = ?", (model_name,)).fetchone()
+            if stored and json.loads(stored[0]) != list(class_names):
+                raise ValueError(f"Las clases de {model_name} cambiaron: {json.loads(stored[0])} → {list(class_names)}")
+            self._db.execute("INSERT OR IGNORE INTO modelos VALUES (?, ?)",
+                             (model_name, json.dumps(list(class_names), ensure_ascii=False)))
+            columns = ["modelo", "version"] + KEY_COLUMNS + value_cols
+            updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in value_cols)
+            rows = partial[KEY_COLUMNS + value_cols].astype(object).to_numpy().tolist()
+            self._db.executemany(
+                f"INSERT INTO agregados ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (modelo, version, {', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}",
+                [[model_name, version] + row for row in rows])
+            total = partial.loc[(partial["nivel"] == "Nacional") & (partial["segmento"] == ""), "filas"].sum()
+            self._db.execute("INSERT INTO lotes VALUES (?, ?, ?, ?, ?, ?)",
+                             (model_name, version, key or datetime.now().strftime("%Y%m%d%H%M%S%f"),
+                              source, int(total), datetime.now().isoformat(timespec="seconds")))
+        return True
+
+    def clear(self, model_name):
+        with self._lock, self._db:
+            if self._n_classes() is not None:
+                self._db.execute("DELETE FROM agregados WHERE modelo = ?", (model_name,))
+            self._db.execute("DELETE FROM lotes WHERE modelo = ?", (model_name,))
+            self._db.execute("DELETE FROM modelos WHERE modelo = ?", (model_name,))
+
+    # === Consultas ===
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=params)
+
+    def models(self):
+        return self._read("SELECT modelo FROM modelos ORDER BY modelo")["modelo"].tolist()
+
+    def versions(self, model_name):
+        """Versiones del modelo con agregados, de la más reciente a la más antigua."""
+        return self._read("SELECT version FROM lotes WHERE modelo = ? GROUP BY version "
+                          "ORDER BY max(fecha) DESC, version DESC", (model_name,))["version"].tolist()
+
+    def _version(self, model_name, version):
+        if version is not None:
+            return str(version)
+        versions = self.versions(model_name)
+        return versions[0] if versions else None
+
+    def classes(self, model_name):
+        rows = self._read("SELECT clases FROM modelos WHERE modelo = ?", (model_name,))
+        return json.loads(rows["clases"].iloc[0]) if len(rows) else []
+
+    def batches(self, model_name, version=None):
+        return self._read("SELECT archivo, version, filas, fecha FROM lotes WHERE modelo = ? AND version = ? "
+                          "ORDER BY fecha", (model_name, self._version(model_name, version)))
+
+    def segment_values(self, model_name, segment, version=None):
+        """Valores de un segmento (p. ej. Urbana/Rural para Area) presentes en los agregados."""
+        return self._read("SELECT DISTINCT valor FROM agregados WHERE modelo = ? AND version = ? "
+                          "AND nivel = 'Nacional' AND segmento = ? ORDER BY valor",
+                          (model_name, self._version(model_name, version), segment))["valor"].tolist()
+
+    def query(self, model_name, level, departamento=None, provincia=None, segment="", value="", version=None):
+        """Regiones de `level` (dentro de departamento/provincia si se dan) para un segmento.
+
+        version=None usa la versión del modelo con agregados más recientes. Devuelve una
+        fila por región con filas, % de cada clase predicha (pct_<clase>) y probabilidad
+        media de cada clase (prob_<clase>), ordenadas por región.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Nivel desconocido: {level} (opciones: {LEVELS})")
+        class_names = self.classes(model_name)
+        version = self._version(model_name, version)
+        if not class_names or version is None:
+            return pd.DataFrame()
+        region = level.lower() if level != "Nacional" else "nivel"
+        where = ["modelo = ?", "version = ?", "nivel = ?", "segmento = ?", "valor = ?"]
+        params = [model_name, version, level, segment, value]
+        for col, filter_value in [("departamento", departamento), ("provincia", provincia)]:
+            if filter_value is not None:
+                where.append(f"{col} = ?")
+                params.append(filter_value)
+        select = [f"{region} AS region", "filas"]
+        for i, name in enumerate(class_names):
+            select.append(f'100.0 * pred_{i} / filas AS "pct_{name}"')
+            select.append(f'suma_{i} / filas AS "prob_{name}"')
+        return self._read(f"SELECT {', '.join(select)} FROM agregados WHERE {' AND '.join(where)} ORDER BY region",
+                          params)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,316 @@
+# src/incremental_training.py
+import os
+import copy
+import json
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from contextlib import nullcontext
+from datetime import datetime
+from scipy import sparse
+from src import config
+from src.balancing import class_sample_weights
+from src.evaluation import evaluate_predictions
+from src.data_split import is_test_row
+from src.feature_store import load_features
+from src.inference import InferencePipeline, find_pipeline_path, load_pipeline, save_pipeline
+from src.model_artifacts import export_shared_model
+from src.model_search import resolve_n_jobs
+from src.model_training import HOLDOUT_INDEX_PATH
+from src.pipeline_runner import adopt_outputs
+from src.prediction_cache import invalidate_disk_cache
+from src.preprocessing import PREPROCESSOR_PATH, VOCABULARY_PATH, feature_types, is_compact, save_vocabulary
+from src.profiling import profiled, set_rows, step
+
+UPDATE_REPORT_PATH = os.path.join(config.ARTIFACTS_DIR, "update_report.json")
+MODEL_NAMES = ["RandomForest", "XGBoost"]
+
+
+def read_batch(path, label_map):
+    """Lote nuevo de registros crudos y sus etiquetas codificadas con el mapeo del modelo."""
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    df = df[df["Anemia"].notna()].reset_index(drop=True)
+    labels = df["Anemia"].astype(str)
+    unknown = sorted(set(labels) - set(label_map))
+    if unknown:
+        raise ValueError(f"Clases de Anemia desconocidas en {path}: {unknown}; se requiere reentrenar desde cero")
+    return df, labels.map(label_map).to_numpy(dtype=np.int64)
+
+
+def unseen_categories(preprocessor, df, cat_cols):
+    """{columna: [categorías]} del lote que el preprocesador no conoce (p. ej. distritos nuevos)."""
+    encoder = preprocessor.named_transformers_["cat"].named_steps["encoder"]
+    known = encoder.vocabulary_ if is_compact(preprocessor) else encoder.categories_
+    out = {}
+    for col, vocabulary in zip(cat_cols, known):
+        seen = pd.unique(df[col].dropna().astype(str)) if col in df else []
+        new = sorted(set(seen) - set(map(str, vocabulary)))
+        if new:
+            out[col] = new
+    return out
+
+
+def _encoder(preprocessor):
+    return preprocessor.named_transformers_["cat"].named_steps["encoder"]
+
+
+def extend_persisted_vocabulary(prep, df):
+    """Copia del dict de preprocessor.joblib con el vocabulario extendido al lote (solo modo compacto).
+
+    Las categorías nuevas se agregan al final: los códigos existentes no cambian y el
+    almacén y los modelos actuales siguen siendo válidos. Se extiende una sola vez por
+    lote, así ambos modelos reciben los mismos códigos nuevos. Devuelve (prep, nuevas).
+    """
+    unseen = unseen_categories(prep["preprocessor"], df, prep["cat_cols"])
+    if not unseen or not is_compact(prep["preprocessor"]):
+        return prep, unseen
+    prep = dict(prep, preprocessor=copy.deepcopy(prep["preprocessor"]))
+    _encoder(prep["preprocessor"]).extend(df.reindex(columns=prep["cat_cols"]).astype(object).to_numpy())
+    return prep, unseen
+
+
+def extended_preprocessor(pipeline, df, prep=None):
+    """Copia del preprocesador del pipeline con el vocabulario del lote nuevo.
+
+    En modo compacto toma el vocabulario persistido ya extendido (prep); el del
+    pipeline debe ser un prefijo suyo para que sus códigos sigan valiendo. Con one-hot
+    agregar columnas movería las posiciones de todas las siguientes, así que las
+    categorías nuevas se siguen codificando como desconocidas (todo cero) hasta el
+    próximo preprocess_data() completo.
+    """
+    preprocessor = copy.deepcopy(pipeline.preprocessor)
+    unseen = unseen_categories(preprocessor, df, pipeline.cat_cols)
+    if unseen and is_compact(preprocessor):
+        encoder = _encoder(preprocessor)
+        if prep is None or not is_compact(prep["preprocessor"]) or prep["cat_cols"] != pipeline.cat_cols:
+            raise ValueError(f"{PREPROCESSOR_PATH} no corresponde al pipeline {pipeline.model_name}: "
+                             f"vuelva a ejecutar preprocess y train")
+        vocabulary = _encoder(prep["preprocessor"]).vocabulary_
+        if any(full[:len(own)] != own for own, full in zip(encoder.vocabulary_, vocabulary)):
+            raise ValueError(f"El vocabulario de {pipeline.model_name} no es un prefijo del de "
+                             f"{PREPROCESSOR_PATH}: vuelva a ejecutar preprocess y train")
+        encoder.vocabulary_ = copy.deepcopy(vocabulary)
+    return preprocessor, unseen
+
+
+def save_extended_preprocessor(prep, path=PREPROCESSOR_PATH, vocabulary_path=VOCABULARY_PATH):
+    """Persiste preprocessor.joblib y category_vocabulary.json (temporal + reemplazo atómico)."""
+    joblib.dump(prep, path + ".tmp")
+    save_vocabulary(prep["preprocessor"], prep["cat_cols"], vocabulary_path + ".tmp")
+    os.replace(path + ".tmp", path)
+    os.replace(vocabulary_path + ".tmp", vocabulary_path)
+
+
+def _stack(blocks):
+    if any(sparse.issparse(b) for b in blocks):
+        return sparse.vstack([sparse.csr_matrix(b) for b in blocks]).tocsr()
+    return np.vstack(blocks)
+
+
+def replay_indices(y_new, y_store, train_idx, n_classes, min_rows=config.UPDATE_MIN_CLASS_ROWS, seed=42):
+    """Filas del split de entrenamiento histórico para las clases con menos de min_rows en el lote.
+
+    RandomForest con warm start recalcula classes_ a partir de las etiquetas del
+    ajuste, así que cada clase debe aparecer; se completan solo las que faltan y el
+    costo sigue dependiendo del lote, no de la historia.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(y_new, minlength=n_classes)
+    parts = []
+    for cls in np.flatnonzero(counts < min_rows):
+        pool = train_idx[y_store[train_idx] == cls]
+        take = min(len(pool), min_rows - counts[cls])
+        if take:
+            parts.append(rng.choice(pool, size=take, replace=False))
+    return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+
+def continue_xgboost(model, X, y, sample_weight, rounds, types=None, n_jobs=1):
+    """Copia del XGBClassifier con `rounds` árboles más, ajustados sobre (X, y).
+
+    Se usa xgboost.train(xgb_model=...) sobre el booster actual: los árboles previos
+    no se tocan y el API nativo admite lotes en los que falta alguna clase.
+    """
+    import xgboost
+    params = model.get_xgb_params()
+    params["n_jobs"] = n_jobs
+    dtrain = xgboost.DMatrix(X, label=y, weight=sample_weight, feature_types=types,
+                             enable_categorical=types is not None)
+    booster = xgboost.train(params, dtrain, num_boost_round=rounds, xgb_model=model.get_booster())
+    candidate = copy.deepcopy(model)
+    candidate.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    candidate.set_params(n_estimators=booster.num_boosted_rounds())
+    return candidate
+
+
+def grow_forest(model, X, y, sample_weight, extra_trees, n_jobs=1):
+    """Copia del RandomForest con extra_trees árboles más (warm_start), ajustados sobre (X, y)."""
+    candidate = copy.deepcopy(model)
+    candidate.set_params(warm_start=True, n_estimators=len(model.estimators_) + extra_trees, n_jobs=n_jobs)
+    candidate.fit(X, y, sample_weight=sample_weight)
+    candidate.set_params(warm_start=False, n_jobs=model.n_jobs)
+    return candidate
+
+
+def _metrics(model, X, y):
+    result = evaluate_predictions(y, model.predict_proba(X), n_boot=0)
+    return {key: round(result[key], 4) for key in ("accuracy", "f1_macro", "kappa")}
+
+
+def _sample(idx, n_rows, seed=42):
+    if len(idx) <= n_rows:
+        return idx
+    return np.sort(np.random.default_rng(seed).choice(idx, size=n_rows, replace=False))
+
+
+def _append_report(entry, path=UPDATE_REPORT_PATH):
+    history = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    history.append(entry)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=4, ensure_ascii=False)
+
+
+@profiled("update")
+def update_models(path, extra_trees=config.UPDATE_EXTRA_TREES, extra_rounds=config.UPDATE_EXTRA_ROUNDS,
+                  max_f1_drop=config.UPDATE_MAX_F1_DROP, names=MODEL_NAMES, promote=True):
+    """Continúa los modelos guardados con un lote nuevo de registros, sin reentrenar desde cero.
+
+    XGBoost suma extra_rounds rondas de boosting sobre su booster y RandomForest
+    extra_trees árboles (warm start), ajustados solo con el lote (más unas pocas filas
+    históricas para clases ausentes). El candidato se promueve si su F1 macro no cae
+    más de max_f1_drop respecto al modelo actual ni en la prueba histórica
+    (holdout_index.npy) ni en el 20 % de prueba del lote. Con promote=False solo compara.
+    """
+    print("=== BLOQUE 4C: ACTUALIZACIÓN INCREMENTAL ===")
+    config.ensure_dirs()
+    n_jobs = resolve_n_jobs(config.N_JOBS)
+    entry = {"fecha": datetime.now().isoformat(timespec="seconds"), "lote": os.path.abspath(path),
+             "modelos": {}}
+
+    with open(os.path.join(config.ARTIFACTS_DIR, "label_mapping.json"), "r", encoding="utf-8") as f:
+        label_map = json.load(f)
+    with step("lectura_lote"):
+        df, y = read_batch(path, label_map)
+    test = is_test_row(np.arange(len(df)))
+    set_rows(len(df))
+    entry.update(filas=int(len(df)), filas_entrenamiento=int((~test).sum()))
+    print(f"Lote {path}: {len(df)} filas ({int((~test).sum())} de entrenamiento, {int(test.sum())} de prueba)")
+
+    # Almacén histórico (memory-mapped): solo se leen las filas de prueba y de repetición
+    try:
+        X_store, y_store, store_names = load_features()
+        y_store = pd.Series(y_store).map(label_map).to_numpy(dtype=np.int64)
+        holdout = np.load(HOLDOUT_INDEX_PATH)
+        train_idx = np.setdiff1d(np.arange(len(y_store)), holdout)
+    except FileNotFoundError:
+        X_store = None
+        print("Sin almacén de características o índice de prueba: se compara solo sobre la prueba del lote")
+
+    # Vocabulario persistido: se extiende en memoria y se guarda solo si se promueve algún modelo
+    prep, persist_prep = None, False
+    if os.path.exists(PREPROCESSOR_PATH):
+        prep, unseen = extend_persisted_vocabulary(joblib.load(PREPROCESSOR_PATH), df)
+        persist_prep = bool(unseen) and is_compact(prep["preprocessor"])
+
+    # Lo promovido reemplaza salidas de preprocess y train: el runner las registra como suyas
+    # para que el siguiente main.py no reentrene desde cero (evaluate sí se repite)
+    with adopt_outputs("preprocess", "balance", "train") if promote else nullcontext():
+        for name in names:
+            pipeline_file = find_pipeline_path(name)
+            current = load_pipeline(pipeline_file)
+            n_classes = len(current.classes)
+            # El almacén sirve solo si sus columnas son las del pipeline (p. ej. tras cambiar COMPACT_FEATURES)
+            history = X_store is not None and store_names == current.feature_names
+            start = time.perf_counter()
+
+            with step(f"vocabulario_{name}"):
+                preprocessor, unseen = extended_preprocessor(current, df, prep)
+            if unseen:
+                detail = ", ".join(f"{col}: {len(values)}" for col, values in unseen.items())
+                action = ("agregadas al vocabulario" if is_compact(preprocessor)
+                          else "codificadas como desconocidas (one-hot)")
+                print(f"  {name}: categorías nuevas {action} — {detail}")
+            candidate = InferencePipeline(preprocessor, current.model, current.num_cols, current.cat_cols,
+                                          current.feature_names, current.label_map, name)
+            if candidate.version == current.version:
+                # La versión es la hora al segundo; la caché y los agregados se separan por versión
+                candidate.version = f"{current.version}.1"
+
+            with step(f"transformacion_{name}", rows=int((~test).sum())):
+                X_new = candidate.transform(df[~test])
+                y_new = y[~test]
+                if history:
+                    replay = replay_indices(y_new, y_store, train_idx, n_classes)
+                    if len(replay):
+                        X_new = _stack([X_new, X_store[replay]])
+                        y_new = np.concatenate([y_new, y_store[replay]])
+                        print(f"  {name}: {len(replay)} filas históricas para clases con pocos casos en el lote")
+            # Mismo esquema que balanced_training_set: pesos solo con class_weight (smote entrena sin pesos)
+            weights = class_sample_weights(y_new) if config.BALANCING == "class_weight" else None
+
+            with step(f"ajuste_{name}", rows=X_new.shape[0]):
+                if name == "XGBoost":
+                    types = feature_types(preprocessor, current.num_cols, current.cat_cols)
+                    candidate.model = continue_xgboost(current.model, X_new, y_new, weights, extra_rounds,
+                                                       types=types, n_jobs=n_jobs)
+                else:
+                    if len(np.unique(y_new)) < n_classes:
+                        print(f"  {name}: el lote no tiene todas las clases y no hay historia para "
+                              f"completarlas; se omite")
+                        entry["modelos"][name] = {"promovido": False, "motivo": "clases ausentes"}
+                        continue
+                    candidate.model = grow_forest(current.model, X_new, y_new, weights, extra_trees, n_jobs=n_jobs)
+            fit_s = time.perf_counter() - start
+
+            # Compuerta: prueba histórica (mismas filas para ambos) y prueba del lote (cada uno con su preprocesador)
+            comparison = {}
+            with step(f"comparacion_{name}"):
+                if history:
+                    idx = _sample(holdout, config.UPDATE_HOLDOUT_ROWS)
+                    X_hold, y_hold = X_store[idx], y_store[idx]
+                    comparison["historico"] = {"filas": int(len(idx)),
+                                               "actual": _metrics(current.model, X_hold, y_hold),
+                                               "candidato": _metrics(candidate.model, X_hold, y_hold)}
+                if test.any():
+                    comparison["lote"] = {"filas": int(test.sum()),
+                                          "actual": _metrics(current.model, current.transform(df[test]), y[test]),
+                                          "candidato": _metrics(candidate.model, candidate.transform(df[test]),
+                                                                y[test])}
+            accepted = bool(comparison) and all(
+                c["candidato"]["f1_macro"] >= c["actual"]["f1_macro"] - max_f1_drop for c in comparison.values())
+            for label, c in comparison.items():
+                print(f"  {name} [{label}, {c['filas']} filas]: F1 macro {c['actual']['f1_macro']:.4f} → "
+                      f"{c['candidato']['f1_macro']:.4f}")
+
+            result = {"segundos_ajuste": round(fit_s, 2), "filas_ajuste": int(X_new.shape[0]),
+                      "categorias_nuevas": unseen, "comparacion": comparison,
+                      "version_anterior": current.version, "promovido": accepted and promote}
+            if not accepted:
+                print(f"✘ {name}: el candidato pierde más de {max_f1_drop} de F1 macro; "
+                      f"se conserva v{current.version}")
+            elif not promote:
+                print(f"✔ {name}: el candidato pasaría la compuerta (sin guardar: simulación)")
+            else:
+                with step(f"artefactos_{name}"):
+                    if persist_prep:
+                        # Antes que el modelo: un vocabulario más largo sigue siendo válido para los no promovidos
+                        save_extended_preprocessor(prep)
+                        persist_prep = False
+                        print(f"Vocabulario extendido guardado en {PREPROCESSOR_PATH} y {VOCABULARY_PATH}")
+                    model_path = os.path.join(config.ARTIFACTS_DIR, f"model_{name}.joblib")
+                    joblib.dump(candidate.model, model_path)
+                    save_pipeline(candidate, pipeline_file)
+                    export_shared_model(candidate)
+                    invalidate_disk_cache(config.CACHE_DISK_PATH, model_name=name)
+                result["version"] = candidate.version
+                print(f"✔ {name}: promovido v{current.version} → v{candidate.version} "
+                      f"({fit_s:.1f}s de ajuste sobre {X_new.shape[0]} filas)")
+            entry["modelos"][name] = result
+
+    _append_report(entry)
+    print(f"Reporte de actualización agregado a {UPDATE_REPORT_PATH}")
+    return entry
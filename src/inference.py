@@ -0,0 +1,75 @@
+# src/inference.py
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from src import config
+
+# Versión del formato del artefacto de inferencia (cambiar si cambia su estructura)
+PIPELINE_FORMAT_VERSION = 1
+
+
+class InferencePipeline:
+    """Preprocesador ajustado + modelo entrenado, listos para puntuar filas crudas."""
+
+    def __init__(self, preprocessor, model, num_cols, cat_cols, feature_names,
+                 label_map, model_name, version=None):
+        self.preprocessor = preprocessor
+        self.model = model
+        self.num_cols = list(num_cols)
+        self.cat_cols = list(cat_cols)
+        self.feature_names = list(feature_names)
+        self.label_map = dict(label_map)
+        self.model_name = model_name
+        self.version = version or datetime.now().strftime("%Y%m%d%H%M%S")
+        self.format_version = PIPELINE_FORMAT_VERSION
+
+        inv = {v: k for k, v in self.label_map.items()}
+        self.classes = np.array([inv[i] for i in range(len(inv))], dtype=object)
+
+    @property
+    def raw_columns(self):
+        return self.num_cols + self.cat_cols
+
+    def transform(self, df):
+        # Columnas faltantes quedan como NaN y las completan los imputadores ajustados
+        X = df.reindex(columns=self.raw_columns)
+        X[self.num_cols] = X[self.num_cols].apply(pd.to_numeric, errors="coerce")
+        X[self.cat_cols] = X[self.cat_cols].astype(object)
+        return self.preprocessor.transform(X)
+
+    def predict_proba(self, df):
+        return self.model.predict_proba(self.transform(df))
+
+    def predict(self, df):
+        return self.predict_proba(df).argmax(axis=1)
+
+    def predict_labels(self, df):
+        return self.classes[self.predict(df)]
+
+
+def pipeline_path(name, base_dir=config.ARTIFACTS_DIR):
+    return os.path.join(base_dir, f"pipeline_{name}.joblib")
+
+
+def find_pipeline_path(name):
+    """Prioriza la raíz del proyecto (despliegue en la nube) y luego artifacts/."""
+    root_path = pipeline_path(name, os.getcwd())
+    return root_path if os.path.exists(root_path) else pipeline_path(name)
+
+
+def save_pipeline(pipeline, path=None):
+    path = path or pipeline_path(pipeline.model_name)
+    joblib.dump(pipeline, path)
+    return path
+
+
+def load_pipeline(path):
+    pipeline = joblib.load(path)
+    if getattr(pipeline, "format_version", None) != PIPELINE_FORMAT_VERSION:
+        raise ValueError(
+            f"Artefacto de inferencia incompatible en {path}: "
+            f"se esperaba formato {PIPELINE_FORMAT_VERSION}"
+        )
+    return pipeline
@@ -2,10 +2,11 @@
 import os
 import json
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from src import config
+from src.figures import FigureSpec, render_figures
+from src.profiling import profiled
 
+@profiled("visualize")
 def visualize_metrics():
     print("=== BLOQUE 6: COMPARATIVA VISUAL DE MÉTRICAS ===")
 
@@ -24,26 +25,14 @@ def visualize_metrics():
     print("\n📊 Resultados comparativos:")
     print(df_metrics)
 
-    # Gráfico de barras comparativo
-    plt.figure(figsize=(9, 5))
+    # Gráfico de barras comparativo (se omite si las métricas no cambiaron)
     melted = df_metrics.melt(id_vars="Modelo", var_name="Métrica", value_name="Valor")
-
-    sns.barplot(
-        data=melted,
-        x="Valor",
-        y="Métrica",
-        hue="Modelo",
-        palette="viridis"
-    )
-    plt.title("Comparativa de Métricas entre Modelos")
-    plt.xlabel("Valor")
-    plt.ylabel("Métrica")
-    plt.legend(title="Modelo", loc="lower right")
-
     output_path = os.path.join(config.OUTPUT_DIR, "metrics_summary.png")
-    plt.tight_layout()
-    plt.savefig(output_path, bbox_inches="tight")
-    plt.close()
+    done = render_figures([FigureSpec("bars", output_path, {
+        "rows": melted.to_dict(orient="records"),
+        "title": "Comparativa de Métricas entre Modelos"
+    })])
 
-    print(f"\n✔ Gráfico comparativo guardado en: {output_path}")
+    estado = "guardado" if done["dibujadas"] else "sin cambios"
+    print(f"\n✔ Gráfico comparativo {estado} en: {output_path}")
     return df_metrics
@@ -0,0 +1,116 @@
+# src/model_artifacts.py
+import os
+import json
+import shutil
+import joblib
+import numpy as np
+from datetime import datetime
+from src import config
+from src.inference import InferencePipeline
+from src.tree_compiler import CompiledForest, compile_pipeline
+
+SHARED_MODELS_DIR = os.path.join(config.ARTIFACTS_DIR, "models")
+SHARED_FORMAT_VERSION = 1
+
+
+def shared_model_dir(name, base_dir=SHARED_MODELS_DIR):
+    return os.path.join(base_dir, name)
+
+
+def export_shared_model(pipeline, out_dir=None):
+    """Exporta un InferencePipeline a un directorio de artefactos compartibles.
+
+    Los arreglos de nodos van como .npy sueltos (se abren con memory mapping y el
+    sistema operativo comparte sus páginas entre procesos). El booster de XGBoost
+    se guarda aparte en formato UBJSON. El preprocesador, pequeño, va en joblib.
+    manifest.json registra versión, columnas, mapeo de etiquetas y arreglos.
+    """
+    out_dir = out_dir or shared_model_dir(pipeline.model_name)
+    tmp_dir = out_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    compiled = compile_pipeline(pipeline)
+    arrays = {}
+    for name, arr in compiled.arrays().items():
+        arr = np.ascontiguousarray(arr)
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), arr)
+        arrays[name] = {"file": f"{name}.npy", "dtype": str(arr.dtype), "shape": list(arr.shape)}
+
+    booster_file = None
+    if hasattr(pipeline.model, "get_booster"):
+        booster_file = "booster.ubj"
+        pipeline.model.get_booster().save_model(os.path.join(tmp_dir, booster_file))
+
+    joblib.dump(pipeline.preprocessor, os.path.join(tmp_dir, "preprocessor.joblib"))
+
+    manifest = {
+        "format_version": SHARED_FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model_name": pipeline.model_name,
+        "model_version": pipeline.version,
+        "forest": compiled.params(),
+        "num_cols": pipeline.num_cols,
+        "cat_cols": pipeline.cat_cols,
+        "feature_names": pipeline.feature_names,
+        "label_map": pipeline.label_map,
+        "arrays": arrays,
+        "booster": booster_file,
+        "preprocessor": "preprocessor.joblib"
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.rename(tmp_dir, out_dir)
+    return out_dir
+
+
+def load_manifest(model_dir):
+    path = os.path.join(model_dir, "manifest.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró el manifiesto del modelo: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SHARED_FORMAT_VERSION:
+        raise ValueError(f"Formato de artefacto compartido incompatible en {model_dir}")
+    return manifest
+
+
+def load_shared_forest(model_dir, manifest=None):
+    """CompiledForest cuyos arreglos son memmaps de solo lectura (páginas compartidas)."""
+    manifest = manifest or load_manifest(model_dir)
+    arrays = {
+        name: np.load(os.path.join(model_dir, spec["file"]), mmap_mode="r")
+        for name, spec in manifest["arrays"].items()
+    }
+    return CompiledForest(**manifest["forest"], **arrays)
+
+
+def load_shared_model(model_dir):
+    """Pipeline de inferencia listo para puntuar filas crudas, respaldado por memmaps."""
+    manifest = load_manifest(model_dir)
+    preprocessor = joblib.load(os.path.join(model_dir, manifest["preprocessor"]))
+    return InferencePipeline(
+        preprocessor,
+        load_shared_forest(model_dir, manifest),
+        manifest["num_cols"],
+        manifest["cat_cols"],
+        manifest["feature_names"],
+        manifest["label_map"],
+        manifest["model_name"],
+        version=manifest["model_version"]
+    )
+
+
+def load_native_booster(model_dir):
+    """Booster nativo de XGBoost desde su archivo separado (copia privada por proceso)."""
+    import xgboost
+    manifest = load_manifest(model_dir)
+    if not manifest.get("booster"):
+        raise ValueError(f"El modelo en {model_dir} no tiene booster de XGBoost")
+    booster = xgboost.Booster()
+    booster.load_model(os.path.join(model_dir, manifest["booster"]))
+    return booster
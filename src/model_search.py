@@ -0,0 +1,187 @@
+# src/model_search.py
+import math
+import os
+import time
+from itertools import zip_longest
+import numpy as np
+from joblib import Parallel, delayed
+
+# Configuración fija (la de siempre); es también el respaldo si la búsqueda no termina un escalón
+DEFAULT_PARAMS = {
+    "RandomForest": {"n_estimators": 200},
+    "XGBoost": {
+        "n_estimators": 200,
+        "learning_rate": 0.1,
+        "max_depth": 6,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8
+    }
+}
+
+SEARCH_SPACES = {
+    "RandomForest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [None, 12, 20],
+        "min_samples_leaf": [1, 2, 5],
+        "max_features": ["sqrt", 0.3]
+    },
+    "XGBoost": {
+        "learning_rate": [0.05, 0.1, 0.2],
+        "max_depth": [4, 6, 8],
+        "min_child_weight": [1, 3, 5],
+        "subsample": [0.7, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0]
+    }
+}
+
+# En la búsqueda XGBoost crece hasta este tope y se detiene con early stopping
+XGB_MAX_ROUNDS = 600
+XGB_EARLY_STOPPING_ROUNDS = 30
+MIN_RUNG_ROWS = 2000
+
+
+def resolve_n_jobs(n_jobs=None):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def make_model(name, params, n_classes, n_jobs=1, random_state=42, early_stopping=False,
+               feature_types=None):
+    """Instancia el estimador de la familia `name` con los hiperparámetros dados.
+
+    feature_types (modo compacto) marca las columnas de códigos como categóricas para
+    XGBoost; RandomForest las usa como enteros ordinales.
+    """
+    # Importaciones diferidas: quien solo usa DEFAULT_PARAMS o resolve_n_jobs no carga sklearn ni xgboost
+    from sklearn.ensemble import RandomForestClassifier
+    from xgboost import XGBClassifier
+    if name == "RandomForest":
+        return RandomForestClassifier(**params, n_jobs=n_jobs, random_state=random_state)
+    if name == "XGBoost":
+        extra = {"early_stopping_rounds": XGB_EARLY_STOPPING_ROUNDS} if early_stopping else {}
+        if feature_types is not None:
+            extra.update(enable_categorical=True, feature_types=list(feature_types))
+        return XGBClassifier(
+            **params,
+            tree_method="hist",
+            objective="multi:softprob",
+            num_class=n_classes,
+            n_jobs=n_jobs,
+            random_state=random_state,
+            **extra
+        )
+    raise ValueError(f"Modelo desconocido: {name}")
+
+
+def _stratified_subset(y, n_rows, min_per_class, rng):
+    """Índices de una submuestra con las proporciones de clase de y (cada clase con un mínimo)."""
+    if n_rows >= len(y):
+        return np.arange(len(y))
+    parts = []
+    for cls in np.unique(y):
+        idx = np.flatnonzero(y == cls)
+        take = min(len(idx), max(min_per_class, int(round(n_rows * len(idx) / len(y)))))
+        parts.append(rng.choice(idx, size=take, replace=False))
+    return np.sort(np.concatenate(parts))
+
+
+def _rung_sizes(n_rows, n_candidates, eta):
+    """Filas por escalón: el último usa todo el entrenamiento y cada anterior 1/eta del siguiente."""
+    n_rungs = max(1, math.ceil(math.log(max(n_candidates, 1), eta)))
+    sizes = [max(MIN_RUNG_ROWS, int(n_rows / eta ** (n_rungs - 1 - r))) for r in range(n_rungs)]
+    return sorted({min(s, n_rows) for s in sizes})
+
+
+def _fit_and_score(name, params, n_classes, X, y, train_idx, val_idx, deadline, sample_weight=None,
+                   feature_types=None):
+    """Ajusta un candidato en un pliegue; None si ya se agotó el presupuesto de tiempo."""
+    from sklearn.metrics import f1_score
+    if time.time() >= deadline:
+        return None
+    start = time.time()
+    weights = sample_weight[train_idx] if sample_weight is not None else None
+    if name == "XGBoost":
+        model = make_model(name, {**params, "n_estimators": XGB_MAX_ROUNDS}, n_classes,
+                           early_stopping=True, feature_types=feature_types)
+        model.fit(X[train_idx], y[train_idx], sample_weight=weights,
+                  eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+        rounds = int(model.best_iteration) + 1
+    else:
+        model = make_model(name, params, n_classes)
+        model.fit(X[train_idx], y[train_idx], sample_weight=weights)
+        rounds = None
+    score = f1_score(y[val_idx], model.predict(X[val_idx]), average="macro")
+    return {"score": float(score), "rounds": rounds, "segundos": time.time() - start}
+
+
+def successive_halving(X, y, families, n_classes, budget_s, n_candidates=12, cv=3, eta=3,
+                       n_jobs=None, random_state=42, sample_weight=None, feature_types=None):
+    """Búsqueda de hiperparámetros por halving sucesivo con presupuesto de reloj.
+
+    Cada escalón evalúa con CV estratificada a los candidatos vivos de todas las
+    familias a la vez (un solo pool de procesos), sobre una submuestra que crece
+    eta veces por escalón; pasa 1/eta de cada familia. Las tareas que arrancan
+    después del plazo se descartan. Devuelve los mejores parámetros por familia
+    y el historial de escalones. sample_weight (pesos de clase) se aplica en cada ajuste.
+    """
+    from sklearn.model_selection import ParameterSampler, StratifiedKFold
+    n_jobs = resolve_n_jobs(n_jobs)
+    deadline = time.time() + budget_s
+    rng = np.random.default_rng(random_state)
+    # La configuración fija entra primero, así compite aunque el plazo corte el escalón
+    survivors = {
+        name: [dict(DEFAULT_PARAMS[name])] + list(ParameterSampler(
+            SEARCH_SPACES[name], n_iter=max(n_candidates - 1, 0), random_state=random_state))
+        for name in families
+    }
+    best = {name: None for name in families}
+    history = []
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for rung, n_rows in enumerate(_rung_sizes(len(y), n_candidates, eta)):
+            if time.time() >= deadline:
+                print(f"  Presupuesto agotado antes del escalón {rung}")
+                break
+            idx = _stratified_subset(y, n_rows, cv, rng)
+            folds = list(StratifiedKFold(cv, shuffle=True, random_state=random_state).split(idx, y[idx]))
+            # Tareas intercaladas entre familias para que el plazo no deje a una sin evaluar
+            per_family = [
+                [(name, i, params, tr, va) for i, params in enumerate(cands) for tr, va in folds]
+                for name, cands in survivors.items()
+            ]
+            tasks = [t for group in zip_longest(*per_family) for t in group if t is not None]
+            start = time.time()
+            results = parallel(
+                delayed(_fit_and_score)(name, params, n_classes, X, y, idx[tr], idx[va], deadline,
+                                        sample_weight, feature_types)
+                for name, _, params, tr, va in tasks
+            )
+
+            # Un candidato cuenta en el escalón solo si completó todos sus pliegues
+            by_candidate = {}
+            for (name, i, _, _, _), res in zip(tasks, results):
+                by_candidate.setdefault((name, i), []).append(res)
+            rung_info = {"escalon": rung, "filas": int(len(idx)), "familias": {}}
+            for name, cands in survivors.items():
+                scored = []
+                for i, params in enumerate(cands):
+                    res = by_candidate[(name, i)]
+                    if any(r is None for r in res):
+                        continue
+                    rounds = [r["rounds"] for r in res if r["rounds"] is not None]
+                    if rounds:
+                        params = {**params, "n_estimators": int(np.mean(rounds))}
+                    scored.append((float(np.mean([r["score"] for r in res])), params))
+                scored.sort(key=lambda item: item[0], reverse=True)
+                rung_info["familias"][name] = [{"f1_macro": s, "params": p} for s, p in scored]
+                if not scored:
+                    continue
+                best[name] = {"f1_macro_cv": scored[0][0], "params": scored[0][1], "escalon": rung}
+                keep = max(1, math.ceil(len(scored) / eta))
+                survivors[name] = [p for _, p in scored[:keep]]
+            rung_info["segundos"] = round(time.time() - start, 2)
+            history.append(rung_info)
+            print(f"  Escalón {rung}: {len(idx)} filas, {len(tasks)} ajustes, {rung_info['segundos']:.1f}s")
+
+    return best, history
@@ -3,22 +3,45 @@ import joblib
 import pandas as pd
 import numpy as np
 import json
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from xgboost import XGBClassifier
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, f1_score, cohen_kappa_score  # ✅ agrega esto
+from sklearn.metrics import accuracy_score, f1_score, cohen_kappa_score
 from src import config
-
-
-
-def train_models():
-    df = pd.read_csv(os.path.join(config.OUTPUT_DIR, "featured_dataset.csv"))
-    X = df.drop(columns=["Anemia"])
-    y = df["Anemia"]
+from src.inference import InferencePipeline, save_pipeline
+from src.model_artifacts import export_shared_model
+from src.prediction_cache import invalidate_disk_cache
+from src.preprocessing import PREPROCESSOR_PATH
+from src.feature_store import load_features
+from src.balancing import balanced_training_set
+from src.model_search import DEFAULT_PARAMS, make_model, resolve_n_jobs, successive_halving
+from src.profiling import profiled, set_rows, step
+
+HOLDOUT_INDEX_PATH = os.path.join(config.ARTIFACTS_DIR, "holdout_index.npy")
+
+
+def train_test_indices(n_rows):
+    """Partición 80/20 fija del almacén de características (la comparten balanceo y evaluación)."""
+    return train_test_split(np.arange(n_rows), test_size=0.2, random_state=42)
+
+
+@profiled("train")
+def train_models(mode=config.TRAINING_MODE):
+    """Entrena RandomForest y XGBoost.
+
+    mode="fixed" usa la configuración fija; mode="search" la elige antes con
+    halving sucesivo y validación cruzada bajo SEARCH_TIME_BUDGET_S segundos.
+    """
+    config.ensure_dirs()
+    # Matriz CSR dispersa o DataFrame denso, según el modo de preprocesamiento
+    with step("carga_features"):
+        X, y, feat_names = load_features()
+    set_rows(X.shape[0])
+    prep = joblib.load(PREPROCESSOR_PATH)
+    # Modo compacto: float32 con códigos de categoría; ambos modelos lo reciben sin copias a float64
+    types = prep.get("feature_types")
 
     # Codificación de etiquetas para modelos (0,1,2,3)
-    from sklearn.preprocessing import LabelEncoder
     le = LabelEncoder()
     y_encoded = le.fit_transform(y)
 
@@ -33,46 +56,100 @@ def train_models():
 
 
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y_encoded, test_size=0.2, random_state=42)
+    # Partición por índices (la misma que antes): el índice de prueba se persiste para la evaluación
+    idx_train, idx_test = train_test_indices(X.shape[0])
+    np.save(HOLDOUT_INDEX_PATH, np.sort(idx_test))
+    print(f"Índice de prueba ({len(idx_test)} filas) guardado en {HOLDOUT_INDEX_PATH}")
+    X_train, X_test = X[idx_train], X[idx_test]
+    y_train, y_test = y_encoded[idx_train], y_encoded[idx_test]
+
+    # Balanceo: pesos por clase o filas sintéticas de las minorías (solo en entrenamiento)
+    with step("balanceo") as frame:
+        X_train, y_train, sample_weight = balanced_training_set(X_train, y_train, le, mode=config.BALANCING)
+        frame.rows = X_train.shape[0]
+    print(f"Balanceo '{config.BALANCING}': {X_train.shape[0]} filas de entrenamiento")
 
 
     # === BLOQUE 4: ENTRENAMIENTO DE MODELOS ===
     print("=== BLOQUE 4: ENTRENAMIENTO DE MODELOS ===")
 
-    rf = RandomForestClassifier(n_estimators=200, random_state=42)
-    xgb = XGBClassifier(
-        n_estimators=200,
-        learning_rate=0.1,
-        max_depth=6,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        objective="multi:softprob",
-        num_class=len(np.unique(y_train)),
-        random_state=42
-    )
-
-    models = {"RandomForest": rf, "XGBoost": xgb}
+    names = ["RandomForest", "XGBoost"]
+    n_classes = len(le.classes_)
+    n_jobs = resolve_n_jobs(config.N_JOBS)
+    params = {name: dict(DEFAULT_PARAMS[name]) for name in names}
+
+    if mode == "search":
+        print(f"Búsqueda de hiperparámetros (presupuesto {config.SEARCH_TIME_BUDGET_S}s, {n_jobs} núcleos)...")
+        with step("busqueda", rows=X_train.shape[0]):
+            best, history = successive_halving(
+                X_train, y_train, names, n_classes,
+                budget_s=config.SEARCH_TIME_BUDGET_S,
+                n_candidates=config.SEARCH_CANDIDATES,
+                cv=config.SEARCH_CV_FOLDS,
+                eta=config.SEARCH_ETA,
+                n_jobs=n_jobs,
+                sample_weight=sample_weight,
+                feature_types=types
+            )
+        for name in names:
+            if best[name] is not None:
+                params[name] = best[name]["params"]
+            else:
+                print(f"  {name}: sin escalones completos, se usa la configuración fija")
+        search_path = os.path.join(config.ARTIFACTS_DIR, "search_report.json")
+        with open(search_path, "w", encoding="utf-8") as f:
+            json.dump({"mejores": best, "escalones": history}, f, indent=4, ensure_ascii=False)
+        print(f"Reporte de búsqueda guardado en {search_path}")
+
+    # Los modelos finales se ajustan a la vez, repartiendo los núcleos entre ellos
+    jobs_per_model = max(1, n_jobs // len(names))
+    models = {name: make_model(name, params[name], n_classes, n_jobs=jobs_per_model, feature_types=types)
+              for name in names}
+
+    def fit(name):
+        print(f"Entrenando {name} ({jobs_per_model} hilos)...")
+        return models[name].fit(X_train, y_train, sample_weight=sample_weight)
+
+    with step("ajuste_modelos", rows=X_train.shape[0]):
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            list(pool.map(fit, names))
+
     metrics = {}
 
     for name, model in models.items():
-        print(f"Entrenando {name}...")
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-
-        # Invertimos las etiquetas para obtener los nombres originales
-        y_pred_labels = le.inverse_transform(y_pred)
-        y_test_labels = le.inverse_transform(y_test)
+        # Una sola predicción por modelo; todas las métricas salen de ella
+        with step(f"prediccion_{name}", rows=X_test.shape[0]):
+            y_pred = model.predict(X_test)
 
         acc = accuracy_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred, average="macro")
         kappa = cohen_kappa_score(y_test, y_pred)
 
-        metrics[name] = {"accuracy": acc, "f1_macro": f1, "kappa": kappa}
+        metrics[name] = {"accuracy": acc, "f1_macro": f1, "kappa": kappa, "params": params[name]}
+
+        with step(f"artefactos_{name}"):
+            # Guardar modelo
+            model_path = os.path.join(config.ARTIFACTS_DIR, f"model_{name}.joblib")
+            joblib.dump(model, model_path)
+            print(f"Modelo {name} guardado en {model_path}")
+
+            # Guardar preprocesador + modelo como un único artefacto de inferencia
+            pipeline = InferencePipeline(
+                prep["preprocessor"], model,
+                prep["num_cols"], prep["cat_cols"], prep["feature_names"],
+                label_map, name
+            )
+            pipeline_file = save_pipeline(pipeline)
+            print(f"Pipeline de inferencia {name} (v{pipeline.version}) guardado en {pipeline_file}")
+
+            # Artefacto compartible: arreglos de nodos .npy (memory-mapped) + manifiesto
+            shared_dir = export_shared_model(pipeline)
+            print(f"Artefacto compartido {name} guardado en {shared_dir}")
 
-        # Guardar modelo
-        model_path = os.path.join(config.ARTIFACTS_DIR, f"model_{name}.joblib")
-        joblib.dump(model, model_path)
-        print(f"Modelo {name} guardado en {model_path}")
+            # Las predicciones en caché del modelo anterior ya no valen
+            removed = invalidate_disk_cache(config.CACHE_DISK_PATH, model_name=name)
+            if removed:
+                print(f"Caché de predicciones de {name} invalidada ({removed} filas)")
 
     # Exportar métricas iniciales
     metrics_path = os.path.join(config.ARTIFACTS_DIR, "training_metrics.json")
@@ -80,24 +157,15 @@ def train_models():
         json.dump(metrics, f, indent=4, ensure_ascii=False)
     print(f"Métricas de entrenamiento guardadas en {metrics_path}")
 
-    rf_pred = rf.predict(X_test)
-    xgb_pred = xgb.predict(X_test)
-
-    metrics = {
-        "rf": {
-            "accuracy": accuracy_score(y_test, rf_pred),
-            "f1_macro": f1_score(y_test, rf_pred, average="macro"),
-            "cohen_kappa": cohen_kappa_score(y_test, rf_pred)
-        },
-        "xgb": {
-            "accuracy": accuracy_score(y_test, xgb_pred),
-            "f1_macro": f1_score(y_test, xgb_pred, average="macro"),
-            "cohen_kappa": cohen_kappa_score(y_test, xgb_pred)
+    summary = {
+        short: {
+            "accuracy": metrics[name]["accuracy"],
+            "f1_macro": metrics[name]["f1_macro"],
+            "cohen_kappa": metrics[name]["kappa"]
         }
+        for short, name in [("rf", "RandomForest"), ("xgb", "XGBoost")]
     }
 
-    joblib.dump(rf, os.path.join(config.ARTIFACTS_DIR, "model_rf.joblib"))
-    joblib.dump(xgb, os.path.join(config.ARTIFACTS_DIR, "model_xgb.joblib"))
     print("Modelos entrenados y guardados en artifacts/")
-    print(metrics)
-    return metrics
+    print(summary)
+    return summary
@@ -0,0 +1,315 @@
+# src/pipeline_runner.py
+import os
+import ast
+import glob
+import json
+import time
+import hashlib
+import importlib
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src import config
+
+STATE_PATH = os.path.join(config.ARTIFACTS_DIR, "pipeline_state.json")
+RUN_REPORT_PATH = os.path.join(config.ARTIFACTS_DIR, "pipeline_run.json")
+
+
+class Stage:
+    """Etapa del pipeline con sus entradas y salidas declaradas.
+
+    func: "modulo:funcion" (se importa en el proceso que ejecuta la etapa).
+    inputs: archivos de datos que lee; code: archivos de código extra (los módulos
+    de src/ que importa func, directa o indirectamente, se suman solos);
+    settings: nombres de variables de src.config que afectan su resultado;
+    deps: etapas previas cuyas salidas consume; outputs: archivos, globs o
+    directorios que produce.
+    """
+
+    def __init__(self, name, func, inputs=(), code=(), settings=(), deps=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.code = list(code)
+        self.settings = list(settings)
+        self.deps = list(deps)
+        self.outputs = list(outputs)
+
+
+# El código de las etapas vive junto a este módulo, aunque BASE_DIR apunte a otros datos
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _src(*names):
+    return [os.path.join(SRC_DIR, n) for n in names]
+
+
+def module_sources(module):
+    """Archivos de src/ que el módulo importa, directa o indirectamente (incluido él mismo).
+
+    Se leen los import del código (también los diferidos dentro de funciones), así
+    que la huella de una etapa sigue a sus dependencias sin listarlas a mano.
+    """
+    seen, pending = set(), [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(SRC_DIR, *name.split(".")[1:]) + ".py"
+        if path in seen or not os.path.isfile(path):
+            continue
+        seen.add(path)
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == "src":
+                pending.extend(f"src.{alias.name}" for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and (node.module or "").startswith("src."):
+                pending.append(node.module)
+            elif isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names if alias.name.startswith("src."))
+    return sorted(seen)
+
+
+def _artifact(*names):
+    return [os.path.join(config.ARTIFACTS_DIR, n) for n in names]
+
+
+def _output(*names):
+    return [os.path.join(config.OUTPUT_DIR, n) for n in names]
+
+
+# Modelos que escribe train_models(); otros comandos (train_external.py) usan nombres propios
+TRAINED_MODELS = ["RandomForest", "XGBoost"]
+
+
+STAGES = [
+    Stage("validate", "src.data_validation:validate_dataset",
+          inputs=[config.DATASET_PATH],
+          settings=["VALIDATION_CHUNK_ROWS"],
+          outputs=_artifact("validation_report.json")),
+    Stage("eda", "src.data_validation:plot_eda",
+          inputs=[config.DATASET_PATH],
+          settings=["PLOT_SAMPLE_ROWS"],
+          outputs=_output("eda/hist_*.png")),
+    Stage("preprocess", "src.preprocessing:preprocess_data",
+          inputs=[config.DATASET_PATH],
+          settings=["SAMPLE_SIZE", "SPARSE_FEATURES", "COMPACT_FEATURES", "EXPORT_FEATURED_CSV"],
+          outputs=_artifact("preprocessor.joblib") + _output("feature_store/featured")),
+    Stage("balance", "src.balancing:balance_features",
+          # COMPACT_FEATURES cambia cómo SMOTE interpola los códigos de categoría
+          settings=["BALANCING", "COMPACT_FEATURES", "CLASS_WEIGHT_MAX", "SMOTE_TARGET_RATIO", "SMOTE_K",
+                    "SMOTE_POOL"],
+          deps=["preprocess"],
+          outputs=_artifact("balance_report.json") + _output("feature_store/synthetic")),
+    Stage("train", "src.model_training:train_models",
+          settings=["TRAINING_MODE", "COMPACT_FEATURES", "N_JOBS", "BALANCING", "CLASS_WEIGHT_MAX",
+                    "SEARCH_TIME_BUDGET_S", "SEARCH_CANDIDATES", "SEARCH_CV_FOLDS", "SEARCH_ETA"],
+          deps=["preprocess", "balance"],
+          # Archivos exactos: un glob incluiría los artefactos de train_external.py
+          outputs=_artifact(*[f"model_{m}.joblib" for m in TRAINED_MODELS],
+                            *[f"pipeline_{m}.joblib" for m in TRAINED_MODELS],
+                            *[os.path.join("models", m) for m in TRAINED_MODELS],
+                            "label_mapping.json", "training_metrics.json", "holdout_index.npy")),
+    Stage("evaluate", "src.evaluation:evaluate_models",
+          settings=["EVAL_BOOTSTRAP", "EVAL_CI_LEVEL"],
+          deps=["train"],
+          outputs=_artifact("metrics_report.json", "metrics_details.json") + _output("cm_*.png", "roc_*.png")),
+    Stage("visualize", "src.metrics_visualization:visualize_metrics",
+          deps=["evaluate"],
+          outputs=_output("metrics_summary.png")),
+]
+
+
+class FileHasher:
+    """sha256 de archivos con caché por (tamaño, mtime) para no releer datasets sin cambios."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+
+    def file(self, path):
+        st = os.stat(path)
+        cached = self.cache.get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        self.cache[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def paths(self, patterns):
+        """Hash combinado de archivos, globs y directorios; None si falta alguno."""
+        h = hashlib.sha256()
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                return None
+            for match in matches:
+                files = [match] if os.path.isfile(match) else sorted(
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(match) for name in names
+                )
+                for path in files:
+                    h.update(os.path.relpath(path, config.BASE_DIR).encode("utf-8"))
+                    h.update(self.file(path).encode("ascii"))
+        return h.hexdigest()
+
+
+def _fingerprint(stage, hasher, upstream_outputs):
+    h = hashlib.sha256(stage.name.encode("utf-8"))
+    code = sorted(set(module_sources(stage.func.split(":")[0]) + stage.code + _src("config.py")))
+    for label, patterns in [("code", code), ("inputs", stage.inputs)]:
+        digest = hasher.paths(patterns) if patterns else ""
+        if digest is None:
+            raise FileNotFoundError(f"Faltan {label} de la etapa {stage.name}: {patterns}")
+        h.update(f"{label}:{digest}".encode("utf-8"))
+    for key in stage.settings:
+        h.update(f"{key}={getattr(config, key)!r}".encode("utf-8"))
+    for dep in stage.deps:
+        if dep not in upstream_outputs:
+            # Etapa previa fuera de esta corrida: cuentan sus salidas tal como están en disco
+            known = {s.name: s for s in STAGES}
+            if dep not in known:
+                raise ValueError(f"La etapa {stage.name} depende de {dep}, que no es una etapa conocida")
+            upstream_outputs[dep] = hasher.paths(known[dep].outputs)
+        h.update(f"{dep}:{upstream_outputs[dep]}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _up_to_date(stage, state, fingerprint, current_outputs):
+    previous = state["stages"].get(stage.name, {})
+    return (previous.get("fingerprint") == fingerprint
+            and current_outputs is not None
+            and previous.get("outputs") == current_outputs)
+
+
+@contextmanager
+def adopt_outputs(*names):
+    """Registra en el estado las salidas que otro comando reescribe (p. ej. main.py update).
+
+    Las etapas names que estaban al día antes de la escritura quedan al día con sus
+    salidas nuevas, así la siguiente corrida no las repite ni deshace el cambio. Las
+    etapas que las consumen y no están en names (evaluate...) sí ven el cambio.
+    """
+    state = _load_state()
+    hasher = FileHasher(state.get("files"))
+    fresh = []
+    for stage in STAGES:
+        if stage.name not in names:
+            continue
+        try:
+            fingerprint = _fingerprint(stage, hasher, {})
+        except FileNotFoundError:
+            continue
+        if _up_to_date(stage, state, fingerprint, hasher.paths(stage.outputs)):
+            fresh.append(stage)
+    yield
+    if not fresh:
+        return
+    upstream = {}
+    for stage in fresh:
+        # En orden de STAGES: la huella de cada una toma las salidas nuevas de las previas
+        outputs = hasher.paths(stage.outputs)
+        state["stages"][stage.name] = {"fingerprint": _fingerprint(stage, hasher, upstream), "outputs": outputs}
+        upstream[stage.name] = outputs
+    state["files"] = hasher.cache
+    _save_state(state)
+
+
+def _run_stage(func_path, profile_stages=None, profile_mode=None):
+    # Se configura en el proceso de la etapa: las funciones de etapa se miden a sí mismas.
+    # El trabajador es del runner, así que puede reiniciar el pico de RSS en cada paso
+    from src import profiling
+    profiling.configure(profile_stages, profile_mode, reset_peak=True)
+    module_name, func_name = func_path.split(":")
+    start = time.perf_counter()
+    getattr(importlib.import_module(module_name), func_name)()
+    return time.perf_counter() - start
+
+
+def _load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+
+def _save_state(state):
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+
+def run_pipeline(stages=STAGES, force=False, max_workers=None,
+                 profile_stages=config.PROFILE_STAGES, profile_mode=config.PROFILE_MODE):
+    """Ejecuta el grafo de etapas reutilizando las salidas cuyas entradas no cambiaron.
+
+    Las etapas sin dependencias pendientes corren en paralelo en procesos separados
+    (cada una con su propio estado de matplotlib). Las etapas de profile_stages se
+    ejecutan bajo el perfilador profile_mode. Devuelve el reporte por etapa.
+    """
+    print("=== PIPELINE INCREMENTAL ===")
+    config.ensure_dirs()
+    state = _load_state()
+    hasher = FileHasher(state.get("files"))
+    by_name = {s.name: s for s in stages}
+    pending = {s.name for s in stages}
+    outputs_hash, report = {}, {}
+    running = {}
+    max_workers = max_workers or min(len(stages), os.cpu_count() or 1)
+    start_all = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                stage = by_name[name]
+                running_names = {n for n, _ in running.values()}
+                if any(d in pending or d in running_names for d in stage.deps):
+                    continue
+                pending.discard(name)
+                if any(report.get(d, {}).get("estado") in ("error", "omitida") for d in stage.deps):
+                    report[name] = {"estado": "omitida"}
+                    continue
+
+                fingerprint = _fingerprint(stage, hasher, outputs_hash)
+                current_outputs = hasher.paths(stage.outputs)
+                if not force and _up_to_date(stage, state, fingerprint, current_outputs):
+                    outputs_hash[name] = current_outputs
+                    report[name] = {"estado": "hit", "segundos": 0.0}
+                    continue
+                running[pool.submit(_run_stage, stage.func, profile_stages, profile_mode)] = (name, fingerprint)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as exc:
+                    report[name] = {"estado": "error", "error": repr(exc)}
+                    state["stages"].pop(name, None)
+                    continue
+                outputs_hash[name] = hasher.paths(by_name[name].outputs)
+                state["stages"][name] = {"fingerprint": fingerprint, "outputs": outputs_hash[name]}
+                report[name] = {"estado": "miss", "segundos": round(elapsed, 2)}
+
+    state["files"] = hasher.cache
+    _save_state(state)
+    total = time.perf_counter() - start_all
+    with open(RUN_REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump({"total_s": round(total, 2), "etapas": report}, f, indent=2, ensure_ascii=False)
+    # Etapas en paralelo pueden haber regenerado el archivo a la vez; se reescribe con todas
+    from src.profiling import export_prometheus
+    prom_path = export_prometheus()
+
+    print("\nResumen del pipeline:")
+    for stage in stages:
+        info = report.get(stage.name, {})
+        detail = f"{info['segundos']:.2f}s" if "segundos" in info else info.get("error", "")
+        print(f"  {stage.name:<11} {info.get('estado', '-').upper():<8} {detail}")
+    print(f"✔ Total: {total:.1f}s — reporte en {RUN_REPORT_PATH} (métricas por etapa en {prom_path})")
+
+    failed = [n for n, info in report.items() if info["estado"] == "error"]
+    if failed:
+        raise RuntimeError(f"Fallaron las etapas: {', '.join(failed)}")
+    return report
@@ -0,0 +1,276 @@
+# src/prediction_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src import config
+
+# Parámetros por consulta IN (...) de sqlite (el límite clásico es 999)
+SQLITE_BATCH = 900
+
+
+# Tipos que infer_dtype reconoce como solo números: OneHotEncoder compara por igualdad (17 == 17.0)
+NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "decimal", "boolean"}
+
+
+def _category_keys(values):
+    """Texto de cada categoría con su tipo delante ("s:" texto, "n:" número).
+
+    OneHotEncoder compara valores de Python: 17.41 y "17.41" son categorías
+    distintas, así que en la clave también lo son. Faltantes como nulo.
+    """
+    values = values.astype(object)
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in ("string", "empty"):
+        return ("s:" + values.astype("string")).to_numpy()
+    if kind in NUMERIC_KINDS:
+        return ("n:" + pd.to_numeric(values).astype("float64").astype("string")).to_numpy()
+    return pd.array([pd.NA if v is None or v is pd.NA or (isinstance(v, float) and v != v)
+                     else f"s:{v}" if isinstance(v, str)
+                     else f"n:{float(v)!r}" if isinstance(v, (int, float, np.number))
+                     else f"{type(v).__name__}:{v}" for v in values], dtype="string").to_numpy()
+
+
+def _category_text_keys(values):
+    """Texto de cada categoría tal como la compara CategoryCodeEncoder (modo compacto).
+
+    Ese codificador busca str(valor) en su vocabulario: "17" y 17 reciben el mismo
+    código, 17 y 17.0 no ("17" frente a "17.0"), así que la clave sigue esa identidad
+    en lugar de la numérica del one-hot. Faltantes como nulo.
+    """
+    values = values.astype(object)
+    missing = values.isna().to_numpy()
+    keys = ("s:" + values.astype(str)).astype("string").to_numpy()
+    keys[missing] = pd.NA
+    return keys
+
+
+def canonical_rows(df, num_cols, cat_cols, compact=False):
+    """Filas crudas en forma canónica para el hash.
+
+    Mismo orden de columnas que el pipeline; numéricos como float64 ("12" y 12.0
+    coinciden, igual que en InferencePipeline.transform); categóricos como texto con
+    su tipo, tal cual llegan: el codificador no recorta espacios ni convierte tipos,
+    así que " Rural " y "Rural", o 17.41 y "17.41", son filas distintas para el
+    modelo y también para la caché. Con compact=True los categóricos se comparan
+    como los compara CategoryCodeEncoder (por su texto). Las columnas que el modelo
+    no usa no cambian la clave.
+    """
+    X = df.reindex(columns=list(num_cols) + list(cat_cols))
+    out = {}
+    for c in num_cols:
+        out[c] = pd.to_numeric(X[c], errors="coerce").astype("float64").to_numpy()
+    for c in cat_cols:
+        out[c] = _category_text_keys(X[c]) if compact else _category_keys(X[c])
+    return pd.DataFrame(out)
+
+
+def model_hash_key(model_name, version):
+    """Clave de 16 caracteres del hash de filas: dos versiones nunca comparten entradas."""
+    return hashlib.sha256(f"{model_name}:{version}".encode("utf-8")).hexdigest()[:16]
+
+
+class PredictionCache:
+    """Caché de probabilidades por fila para un modelo y versión.
+
+    La clave es el hash de la fila canónica (pd.util.hash_pandas_object) con una
+    semilla derivada de nombre y versión del modelo: un modelo reentrenado tiene otra
+    versión y sus filas nunca coinciden con las anteriores. Memoria: LRU de a lo
+    sumo max_entries filas con vencimiento ttl_s (0 = sin vencimiento). Disco opcional (sqlite en
+    disk_path): persiste entre reinicios y lo comparten procesos; al abrirse borra
+    las filas de otras versiones del mismo modelo.
+    """
+
+    def __init__(self, model_name, version, max_entries=config.CACHE_MAX_ENTRIES,
+                 ttl_s=config.CACHE_TTL_S, disk_path=config.CACHE_DISK_PATH):
+        self.model_name = model_name
+        self.version = str(version)
+        self.hash_key = model_hash_key(model_name, self.version)
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Tipo de las probabilidades del modelo (float32 en XGBoost): la caché devuelve el mismo
+        self.dtype = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = self._open_disk(disk_path) if disk_path else None
+
+    @classmethod
+    def for_pipeline(cls, pipeline, **kwargs):
+        return cls(pipeline.model_name, pipeline.version, **kwargs)
+
+    # === Claves ===
+
+    def row_keys(self, df, pipeline):
+        # Diferido: el pipeline ya cargó sklearn; importarlo arriba pesaría en el arranque del servicio
+        from src.preprocessing import is_compact
+        canon = canonical_rows(df, pipeline.num_cols, pipeline.cat_cols,
+                               compact=is_compact(pipeline.preprocessor))
+        return pd.util.hash_pandas_object(canon, index=False, hash_key=self.hash_key).to_numpy()
+
+    # === Memoria ===
+
+    def _expired(self, created, now):
+        return bool(self.ttl_s) and now - created > self.ttl_s
+
+    def _get_memory(self, keys, out, found, now):
+        with self._lock:
+            for i, key in enumerate(keys.tolist()):
+                entry = self._memory.get(key)
+                if entry is None:
+                    continue
+                if self._expired(entry[0], now):
+                    del self._memory[key]
+                    continue
+                self._memory.move_to_end(key)
+                out[i] = entry[1]
+                found[i] = True
+                if self.dtype is None:
+                    self.dtype = entry[1].dtype
+
+    def _put_memory(self, keys, proba, created):
+        with self._lock:
+            # Copia por fila: una vista mantendría vivo el lote completo hasta desalojar todas sus filas
+            for key, row, ts in zip(keys.tolist(), np.asarray(proba, dtype=self.dtype), created):
+                self._memory[key] = (ts, row.copy())
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # === Disco (sqlite) ===
+
+    def _open_disk(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""CREATE TABLE IF NOT EXISTS predicciones (
+                          modelo TEXT NOT NULL, clave INTEGER NOT NULL, version TEXT NOT NULL,
+                          creado REAL NOT NULL, tipo TEXT NOT NULL, proba BLOB NOT NULL,
+                          PRIMARY KEY (modelo, clave))""")
+        db.execute("DELETE FROM predicciones WHERE modelo = ? AND version != ?",
+                   (self.model_name, self.version))
+        db.commit()
+        return db
+
+    def _get_disk(self, keys, out, found, now):
+        pending = np.flatnonzero(~found)
+        if self._db is None or not len(pending):
+            return []
+        # sqlite guarda enteros con signo: la clave uint64 se reinterpreta como int64
+        signed = keys[pending].view(np.int64).tolist()
+        position = dict(zip(signed, pending.tolist()))
+        promoted = []
+        with self._lock:
+            for start in range(0, len(signed), SQLITE_BATCH):
+                batch = signed[start:start + SQLITE_BATCH]
+                rows = self._db.execute(
+                    f"SELECT clave, creado, tipo, proba FROM predicciones WHERE modelo = ? AND version = ? "
+                    f"AND clave IN ({','.join('?' * len(batch))})",
+                    [self.model_name, self.version, *batch]).fetchall()
+                for key, created, dtype, blob in rows:
+                    if self._expired(created, now):
+                        continue
+                    i = position[key]
+                    out[i] = np.frombuffer(blob, dtype=dtype)
+                    if self.dtype is None:
+                        self.dtype = np.dtype(dtype)
+                    found[i] = True
+                    promoted.append((i, created))
+        return promoted
+
+    def _put_disk(self, keys, proba, now):
+        if self._db is None:
+            return
+        proba = np.ascontiguousarray(proba)
+        rows = [(self.model_name, int(k), self.version, now, proba.dtype.str, p.tobytes())
+                for k, p in zip(keys.view(np.int64), proba)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO predicciones VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    # === API ===
+
+    def predict_proba(self, pipeline, df):
+        """pipeline.predict_proba(df) consultando antes la caché; solo las filas nuevas van al modelo.
+
+        Filas repetidas dentro del mismo lote se puntúan una sola vez.
+        """
+        if len(df) == 0:
+            return pipeline.predict_proba(df)
+        now = time.time()
+        keys = self.row_keys(df, pipeline)
+        out = np.empty((len(df), len(pipeline.classes)), dtype=np.float64)
+        found = np.zeros(len(df), dtype=bool)
+
+        self._get_memory(keys, out, found, now)
+        n_memory = int(found.sum())
+        promoted = self._get_disk(keys, out, found, now)
+        if promoted:
+            idx = np.array([i for i, _ in promoted])
+            self._put_memory(keys[idx], out[idx], [created for _, created in promoted])
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            unique, first, inverse = np.unique(keys[missing], return_index=True, return_inverse=True)
+            proba = pipeline.predict_proba(df.iloc[missing[first]])
+            self.dtype = proba.dtype
+            out[missing] = proba[inverse]
+            self._put_memory(unique, proba, [now] * len(unique))
+            self._put_disk(unique, proba, now)
+
+        with self._lock:
+            self.hits += n_memory + len(promoted)
+            self.disk_hits += len(promoted)
+            self.misses += len(missing)
+        # Ida y vuelta float32 -> float64 -> float32 exacta: igual a no usar la caché
+        return out.astype(self.dtype, copy=False)
+
+    def predict_labels(self, pipeline, df):
+        return pipeline.classes[self.predict_proba(pipeline, df).argmax(axis=1)]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "modelo": self.model_name,
+            "version": self.version,
+            "aciertos": self.hits,
+            "aciertos_disco": self.disk_hits,
+            "fallos": self.misses,
+            "tasa_aciertos": round(self.hits / total, 4) if total else 0.0,
+            "entradas_memoria": len(self._memory),
+            "disco": self._db is not None
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predicciones WHERE modelo = ?", (self.model_name,))
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def invalidate_disk_cache(path=config.CACHE_DISK_PATH, model_name=None):
+    """Borra la caché en disco (toda, o solo la de model_name). La llama train_models() al guardar."""
+    if not path or not os.path.exists(path):
+        return 0
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        if model_name is None:
+            removed = db.execute("DELETE FROM predicciones").rowcount
+        else:
+            removed = db.execute("DELETE FROM predicciones WHERE modelo = ?", (model_name,)).rowcount
+        db.commit()
+    finally:
+        db.close()
+    return removed
@@ -0,0 +1,232 @@
+# src/prediction_service.py
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from aiohttp import web
+from src.inference import load_pipeline
+from src.prediction_cache import PredictionCache
+from src import config
+
+
+# Tipos JSON admitidos como valor de una columna (un objeto o lista anidada no es un dato de paciente)
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def validate_record(record):
+    """Error legible si el registro no es un objeto JSON plano; None si es válido."""
+    if not isinstance(record, dict):
+        return "Se esperaba un objeto JSON por paciente"
+    nested = [col for col, value in record.items() if not isinstance(value, SCALAR_TYPES)]
+    if nested:
+        return f"Valores no escalares en: {', '.join(map(str, nested))}"
+    return None
+
+
+class MicroBatcher:
+    """Agrupa solicitudes individuales concurrentes en un solo predict_proba vectorizado.
+
+    Un lote se cierra al llegar a max_batch_size filas o cuando pasan max_wait_ms
+    desde que entró su primera solicitud. Si el lote falla, se puntúa registro por
+    registro: el error queda solo en las solicitudes que lo causan.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.n_batches = 0
+        self.n_rows = 0
+        self.n_fallbacks = 0
+        self._queue = None
+        self._task = None
+        # Un solo hilo de inferencia: los lotes no compiten entre sí por los núcleos
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def predict_batch(self, df):
+        """Puntúa un lote ya armado en el mismo hilo de inferencia."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.predict_fn, df)
+
+    async def submit(self, record):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict_each(self, records):
+        """Puntúa uno por uno; cada posición trae su fila de probabilidades o su excepción."""
+        results = []
+        for record in records:
+            try:
+                results.append(self.predict_fn(pd.DataFrame.from_records([record]))[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            records = [record for record, _ in batch]
+            try:
+                results = await self.predict_batch(pd.DataFrame.from_records(records))
+            except Exception:
+                self.n_fallbacks += 1
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self._executor, self._predict_each, records)
+            self.n_batches += 1
+            self.n_rows += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "lotes": self.n_batches,
+            "filas": self.n_rows,
+            "tamano_medio_lote": round(self.n_rows / self.n_batches, 2) if self.n_batches else 0.0,
+            "lotes_uno_por_uno": self.n_fallbacks,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
+
+
+def _format_prediction(row, label_names):
+    return {
+        "prediccion": label_names[int(row.argmax())],
+        "probabilidades": {name: round(float(p), 6) for name, p in zip(label_names, row)}
+    }
+
+
+async def _health(request):
+    pipeline = request.app["pipeline"]
+    return web.json_response({
+        "estado": "ok",
+        "modelo": pipeline.model_name,
+        "version": pipeline.version,
+        "inicio_s": request.app["startup_s"]
+    })
+
+
+async def _predict(request):
+    try:
+        record = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="El cuerpo debe ser un objeto JSON con los datos del paciente")
+    error = validate_record(record)
+    if error:
+        raise web.HTTPBadRequest(text=error)
+    try:
+        row = await request.app["batcher"].submit(record)
+    except (ValueError, TypeError) as exc:
+        raise web.HTTPBadRequest(text=f"No se pudo puntuar el registro: {exc}")
+    return web.json_response(_format_prediction(row, request.app["label_names"]),
+                             dumps=_dumps)
+
+
+async def _predict_batch(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="El cuerpo debe ser JSON")
+    records = payload.get("registros") if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not records:
+        raise web.HTTPBadRequest(text='Se esperaba una lista de pacientes o {"registros": [...]}')
+    for i, record in enumerate(records):
+        error = validate_record(record)
+        if error:
+            raise web.HTTPBadRequest(text=f"Registro {i}: {error}")
+
+    # Un lote explícito ya viene vectorizado: se puntúa directo, sin pasar por el micro-batcher
+    try:
+        proba = await request.app["batcher"].predict_batch(pd.DataFrame.from_records(records))
+    except (ValueError, TypeError) as exc:
+        raise web.HTTPBadRequest(text=f"No se pudo puntuar el lote: {exc}")
+    label_names = request.app["label_names"]
+    return web.json_response(
+        {"resultados": [_format_prediction(row, label_names) for row in proba]},
+        dumps=_dumps
+    )
+
+
+async def _stats(request):
+    stats = request.app["batcher"].stats()
+    cache = request.app["cache"]
+    if cache is not None:
+        stats["cache"] = cache.stats()
+    return web.json_response(stats)
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def create_app(pipeline_file, max_batch_size=64, max_wait_ms=5.0,
+               use_cache=config.PREDICTION_CACHE, cache_disk=config.CACHE_DISK_PATH):
+    """Carga el pipeline una sola vez y arma la aplicación aiohttp.
+
+    Los nombres de clase salen del propio pipeline, así que siempre corresponden al modelo cargado.
+    """
+    start = time.perf_counter()
+    pipeline = load_pipeline(pipeline_file)
+    label_names = list(pipeline.classes)
+
+    # Calentamiento: la primera llamada paga la inicialización perezosa del modelo
+    pipeline.predict_proba(pd.DataFrame([{}]))
+
+    # La caché solo se toca desde el hilo de inferencia del micro-batcher
+    cache = PredictionCache.for_pipeline(pipeline, disk_path=cache_disk) if use_cache else None
+    predict_fn = pipeline.predict_proba if cache is None \
+        else (lambda df: cache.predict_proba(pipeline, df))
+
+    app = web.Application()
+    app["pipeline"] = pipeline
+    app["label_names"] = label_names
+    app["cache"] = cache
+    app["batcher"] = MicroBatcher(predict_fn, max_batch_size, max_wait_ms)
+    app["startup_s"] = round(time.perf_counter() - start, 3)
+
+    async def on_startup(app):
+        await app["batcher"].start()
+
+    async def on_cleanup(app):
+        await app["batcher"].stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_get("/health", _health)
+    app.router.add_get("/stats", _stats)
+    app.router.add_post("/predict", _predict)
+    app.router.add_post("/predict/batch", _predict_batch)
+    return app
@@ -1,60 +1,185 @@
 import os
+import json
+import joblib
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import RobustScaler, OneHotEncoder
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import RobustScaler, OneHotEncoder, FunctionTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from imblearn.combine import SMOTETomek
 from src import config
+from src.feature_store import save_features
+from src.profiling import profiled, set_rows, step
 
-def preprocess_data():
-    print("=== BLOQUE 2: PREPROCESAMIENTO ===")
-    df = pd.read_csv(config.DATASET_PATH, encoding="utf-8-sig")
-    df = df.sample(n=20000, random_state=42)  # usar una muestra de 20k filas
+NUM_COLS = ["Edad_meses", "Altitud_m", "Ingreso_Familiar_Soles",
+            "Nro_Hijos", "Peso_kg", "Talla_cm",
+            "Hemoglobina_g_dL", "Hemoglobina_Ajustada"]
+PREPROCESSOR_PATH = os.path.join(config.ARTIFACTS_DIR, "preprocessor.joblib")
+VOCABULARY_PATH = os.path.join(config.ARTIFACTS_DIR, "category_vocabulary.json")
 
-    num_cols = ["Edad_meses", "Altitud_m", "Ingreso_Familiar_Soles",
-                "Nro_Hijos", "Peso_kg", "Talla_cm",
-                "Hemoglobina_g_dL", "Hemoglobina_Ajustada"]
-    cat_cols = [c for c in df.columns if c not in num_cols + ["Anemia", "ID"]]
 
-    num_pipeline = Pipeline([
+class CategoryCodeEncoder(TransformerMixin, BaseEstimator):
+    """Codifica cada columna categórica como un entero: su posición en el vocabulario.
+
+    vocabulary_ guarda, por columna, las categorías vistas al ajustar (ordenadas).
+    Una categoría desconocida recibe -1; XGBoost la envía por la rama izquierda
+    de sus divisiones categóricas, igual que a una categoría fuera del conjunto.
+    La salida es float32 (los códigos son exactos hasta 2^24) para concatenarse
+    con los numéricos sin promover la matriz a float64.
+    """
+
+    def __init__(self, dtype=np.float32):
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        self.vocabulary_ = [sorted(pd.unique(pd.Series(X[:, j]).dropna().astype(str)))
+                            for j in range(X.shape[1])]
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=object)
+        out = np.empty(X.shape, dtype=self.dtype)
+        for j, vocabulary in enumerate(self.vocabulary_):
+            out[:, j] = pd.Index(vocabulary).get_indexer(pd.Series(X[:, j]).astype(str))
+        return out
+
+    def extend(self, X):
+        """Agrega al final del vocabulario las categorías no vistas en X.
+
+        Los códigos existentes no cambian, así que un modelo ya entrenado y el
+        almacén de características siguen siendo válidos. Devuelve {posición: nuevas}.
+        """
+        X = np.asarray(X, dtype=object)
+        added = {}
+        for j, vocabulary in enumerate(self.vocabulary_):
+            seen = pd.unique(pd.Series(X[:, j]).dropna().astype(str))
+            new = sorted(set(seen) - set(vocabulary))
+            if new:
+                vocabulary.extend(new)
+                added[j] = new
+        return added
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(input_features, dtype=object)
+
+
+def to_float32(X):
+    return np.asarray(X, dtype=np.float32)
+
+
+def to_text(X):
+    """Categóricos como texto, igual que CategoryCodeEncoder; los faltantes siguen como NaN.
+
+    Un CSV leído por bloques puede traer la misma columna como números en un bloque
+    y como texto en otro (códigos de distrito, por ejemplo).
+    """
+    X = pd.DataFrame(X).astype(object)
+    return X.astype(str).where(X.notna(), np.nan).to_numpy()
+
+
+def build_preprocessor(num_cols, cat_cols, sparse_output=False, compact=False):
+    """compact=True: numéricos float32 y categóricos como códigos enteros (una columna cada uno)."""
+    num_steps = [
         ("imputer", SimpleImputer(strategy="median")),
         ("scaler", RobustScaler())
-    ])
+    ]
+    if compact:
+        num_steps.append(("float32", FunctionTransformer(to_float32, feature_names_out="one-to-one")))
+        encoder = CategoryCodeEncoder()
+    else:
+        encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=sparse_output)
     cat_pipeline = Pipeline([
         ("imputer", SimpleImputer(strategy="most_frequent")),
-        ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+        ("encoder", encoder)
     ])
 
-    preprocessor = ColumnTransformer([
-        ("num", num_pipeline, num_cols),
+    # sparse_threshold=1 fuerza salida CSR; 0 mantiene la salida densa original
+    return ColumnTransformer([
+        ("num", Pipeline(num_steps), num_cols),
         ("cat", cat_pipeline, cat_cols)
-    ])
+    ], sparse_threshold=1.0 if sparse_output and not compact else 0.0)
+
+
+def is_compact(preprocessor):
+    """True si el preprocesador ajustado produce códigos enteros en lugar de one-hot."""
+    encoder = preprocessor.named_transformers_["cat"].named_steps["encoder"]
+    return isinstance(encoder, CategoryCodeEncoder)
+
+
+def feature_types(preprocessor, num_cols, cat_cols):
+    """Tipos de característica para XGBoost ("q" numérica, "c" categórica); None con one-hot."""
+    if not is_compact(preprocessor):
+        return None
+    return ["q"] * len(num_cols) + ["c"] * len(cat_cols)
 
-    data = preprocessor.fit_transform(df)
-    feat_names = (
+
+def save_vocabulary(preprocessor, cat_cols, path=VOCABULARY_PATH):
+    """Vocabulario de cada categórico ({columna: [categorías]}; el código es la posición)."""
+    encoder = preprocessor.named_transformers_["cat"].named_steps["encoder"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(zip(cat_cols, encoder.vocabulary_)), f, indent=2, ensure_ascii=False)
+    return path
+
+
+def get_feature_names(preprocessor, num_cols, cat_cols):
+    return (
         list(preprocessor.named_transformers_["num"].get_feature_names_out(num_cols)) +
         list(preprocessor.named_transformers_["cat"].get_feature_names_out(cat_cols))
     )
 
-    df_clean = pd.DataFrame(data, columns=feat_names)
-    df_clean["Anemia"] = df["Anemia"].values
-
-    clean_path = os.path.join(config.OUTPUT_DIR, "featured_dataset.csv")
-    df_clean.to_csv(clean_path, index=False, encoding="utf-8-sig")
-    print(f"✔ Dataset limpio guardado en {clean_path}")
-    return df_clean
-
-def balance_dataset(df):
-    print("=== BLOQUE 2C: BALANCEO DE CLASES ===")
-    X = df.drop(columns=["Anemia"])
-    y = df["Anemia"]
-    smt = SMOTETomek(random_state=42)
-    X_bal, y_bal = smt.fit_resample(X, y)
-    df_bal = pd.DataFrame(X_bal, columns=X.columns)
-    df_bal["Anemia"] = y_bal
-    out_path = os.path.join(config.OUTPUT_DIR, "featured_dataset_balanced.csv")
-    df_bal.to_csv(out_path, index=False, encoding="utf-8-sig")
-    print(f"✔ Dataset balanceado guardado en {out_path}")
-    return df_bal
+
+@profiled("preprocess")
+def preprocess_data(sample_size=config.SAMPLE_SIZE, sparse_output=config.SPARSE_FEATURES,
+                    path=config.DATASET_PATH, compact=config.COMPACT_FEATURES):
+    """Ajusta el preprocesador y escribe la matriz de características en el almacén.
+
+    Devuelve solo los metadatos del resultado (ruta, filas, columnas, tipo): las
+    etapas siguientes leen el almacén con load_features, así que la matriz completa
+    nunca se copia a un DataFrame.
+    """
+    print("=== BLOQUE 2: PREPROCESAMIENTO ===")
+    config.ensure_dirs()
+    with step("lectura_csv") as frame:
+        df = pd.read_csv(path, encoding="utf-8-sig")
+        if sample_size is not None and sample_size < len(df):
+            df = df.sample(n=sample_size, random_state=42)
+        frame.rows = len(df)
+
+    set_rows(len(df))
+    num_cols = list(NUM_COLS)
+    cat_cols = [c for c in df.columns if c not in num_cols + ["Anemia", "ID"]]
+
+    preprocessor = build_preprocessor(num_cols, cat_cols, sparse_output, compact)
+    with step("ajuste_transformacion", rows=len(df)):
+        data = preprocessor.fit_transform(df[num_cols + cat_cols])
+        feat_names = get_feature_names(preprocessor, num_cols, cat_cols)
+
+    with step("guardado", rows=len(df)):
+        # Guardar el preprocesador ajustado para que la inferencia no vuelva a ajustarlo
+        joblib.dump({
+            "preprocessor": preprocessor,
+            "num_cols": num_cols,
+            "cat_cols": cat_cols,
+            "feature_names": feat_names,
+            "compact": compact,
+            "feature_types": feature_types(preprocessor, num_cols, cat_cols)
+        }, PREPROCESSOR_PATH)
+        print(f"✔ Preprocesador ajustado guardado en {PREPROCESSOR_PATH}")
+        if compact:
+            print(f"✔ Vocabulario de categorías guardado en {save_vocabulary(preprocessor, cat_cols)}")
+
+        clean_path = save_features(data, df["Anemia"].values, feat_names)
+        print(f"✔ Dataset limpio ({data.shape[0]} filas x {data.shape[1]} columnas {data.dtype}"
+              f"{', disperso' if sparse.issparse(data) else ''}) guardado en {clean_path}")
+
+    return {
+        "ruta": clean_path,
+        "filas": data.shape[0],
+        "columnas": data.shape[1],
+        "dtype": str(data.dtype),
+        "disperso": sparse.issparse(data)
+    }
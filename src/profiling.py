@@ -0,0 +1,422 @@
+# src/profiling.py
+import os
+import sys
+import json
+import time
+import atexit
+import glob
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from src import config
+
+METRICS_DIR = os.path.join(config.ARTIFACTS_DIR, "metrics")
+PROMETHEUS_PATH = os.path.join(METRICS_DIR, "anemia.prom")
+
+# Etapas a perfilar y modo; configure() los cambia en el proceso que ejecuta la etapa.
+# reset_peak solo se activa en procesos propios del perfilador (los trabajadores del
+# runner): reiniciar el pico en un proceso compartido, como la app, borra el de las demás sesiones
+_profile = {"stages": set(config.PROFILE_STAGES), "mode": config.PROFILE_MODE, "reset_peak": False}
+_local = threading.local()
+
+
+# === Memoria y CPU del proceso ===
+
+def _status_kb(field):
+    """Campo de /proc/self/status en kB (None fuera de Linux)."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _resource():
+    """Módulo resource (solo Unix); None en Windows."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource
+
+
+@functools.lru_cache(maxsize=None)
+def _psutil():
+    """psutil si está instalado (alternativa a resource en Windows)."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil
+
+
+def _peak_kb():
+    """RSS pico del proceso en kB, o None si la plataforma no lo expone."""
+    peak = _status_kb("VmHWM")
+    if peak is not None:
+        return peak
+    resource = _resource()
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS informa ru_maxrss en bytes; Linux y los BSD en kB
+        return maxrss // 1024 if sys.platform == "darwin" else maxrss
+    psutil = _psutil()
+    peak_wset = getattr(psutil.Process().memory_info(), "peak_wset", None) if psutil is not None else None
+    return peak_wset // 1024 if peak_wset is not None else None
+
+
+def _reset_peak():
+    """Reinicia el pico de RSS del proceso (Linux >= 4.0); sin soporte, el pico es el de todo el proceso.
+
+    Solo actúa si configure(reset_peak=True) marcó el proceso como propio.
+    """
+    if not _profile["reset_peak"]:
+        return
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _cpu_seconds():
+    # Incluye los hijos ya terminados (pools de procesos de figuras, scoring, joblib)
+    resource = _resource()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return time.process_time() + children.ru_utime + children.ru_stime
+    psutil = _psutil()
+    if psutil is not None:
+        times = psutil.Process().cpu_times()
+        return time.process_time() + times.children_user + times.children_system
+    return time.process_time()
+
+
+def _max_kb(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+# === Marcos de medición ===
+
+class _Frame:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.steps = []
+        self.peak_kb = None
+        self.start = time.perf_counter()
+        self.cpu = _cpu_seconds()
+
+    def record(self):
+        seconds = time.perf_counter() - self.start
+        return {
+            "nombre": self.name,
+            "segundos": round(seconds, 4),
+            "cpu_segundos": round(_cpu_seconds() - self.cpu, 4),
+            "rss_pico_mb": round(self.peak_kb / 1024, 1) if self.peak_kb is not None else None,
+            "filas": self.rows,
+            "filas_por_segundo": round(self.rows / seconds, 1) if self.rows and seconds > 0 else None,
+            "pasos": self.steps
+        }
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def step(name, rows=None):
+    """Mide un paso dentro de la etapa en curso: reloj, CPU, RSS pico y filas.
+
+    El marco se devuelve para fijar las filas al conocerlas (frame.rows = n). En
+    un proceso propio (configure(reset_peak=True)) el pico de RSS se reinicia al
+    entrar, y el pico previo se acumula en los marcos abiertos, así cada nivel
+    conserva su propio máximo; en los demás el pico es el del proceso.
+    """
+    stack = _stack()
+    peak = _peak_kb()
+    for frame in stack:
+        frame.peak_kb = _max_kb(frame.peak_kb, peak)
+    _reset_peak()
+    frame = _Frame(name, rows)
+    stack.append(frame)
+    try:
+        yield frame
+    finally:
+        frame.peak_kb = _max_kb(frame.peak_kb, _peak_kb())
+        stack.pop()
+        if stack:
+            stack[-1].peak_kb = _max_kb(stack[-1].peak_kb, frame.peak_kb)
+            stack[-1].steps.append(frame.record())
+        else:
+            _local.last = frame.record()
+
+
+def set_rows(n):
+    """Filas procesadas por la etapa en curso (el marco más externo)."""
+    stack = _stack()
+    if stack:
+        stack[0].rows = int(n)
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Mide una etapa completa y guarda sus métricas en JSON y en formato Prometheus.
+
+    Dentro de otra etapa se comporta como un paso. Si la etapa está en
+    PROFILE_STAGES además corre bajo cProfile o el muestreador de pilas.
+    """
+    if _stack():
+        with step(name, rows) as frame:
+            yield frame
+        return
+
+    mode = _profile["mode"] if name in _profile["stages"] else None
+    profiler = _start_profiler(mode)
+    try:
+        with step(name, rows) as frame:
+            yield frame
+    finally:
+        _stop_profiler(mode, profiler, name)
+    write_stage_metrics(name, _local.last)
+
+
+class StepMetrics:
+    """Mediciones de un proceso interactivo (la app) acumuladas en memoria.
+
+    measure() usa step(), que no toca el disco; las mediciones se vuelcan a
+    stage_<nombre>.json y al archivo Prometheus como mucho cada flush_s segundos
+    (y al salir), bajo un lock, así las sesiones concurrentes no compiten por los archivos.
+    """
+
+    def __init__(self, flush_s=config.METRICS_FLUSH_S):
+        self.flush_s = flush_s
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed = time.monotonic()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def measure(self, name, rows=None):
+        nested = bool(_stack())
+        with step(name, rows) as frame:
+            yield frame
+        if nested:
+            return  # quedó como paso del marco abierto
+        with self._lock:
+            runs, seconds, _ = self._pending.get(name, (0, 0.0, None))
+            self._pending[name] = (runs + 1, seconds + _local.last["segundos"], _local.last)
+            due = time.monotonic() - self._flushed >= self.flush_s
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+            for name, (runs, seconds, record) in pending.items():
+                write_stage_metrics(name, record, runs=runs, seconds=seconds, export=False)
+            if pending:
+                export_prometheus()
+
+
+def profiled(name):
+    """Decorador: la función es la etapa `name` (o un paso si ya hay una etapa abierta)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure(stages=None, mode=None, reset_peak=None):
+    """Cambia las etapas perfiladas y el modo en este proceso.
+
+    reset_peak=True permite reiniciar el pico de RSS en cada paso; úsese solo en
+    procesos dedicados a las etapas, nunca en uno que atiende a otras sesiones.
+    """
+    if stages is not None:
+        _profile["stages"] = set(stages)
+    if mode is not None:
+        _profile["mode"] = mode
+    if reset_peak is not None:
+        _profile["reset_peak"] = bool(reset_peak)
+
+
+# === Perfiladores opcionales ===
+
+class StackSampler:
+    """Perfilador por muestreo: cada `interval` segundos anota la pila de un hilo.
+
+    Escribe pilas colapsadas ("a;b;c N"), el formato que leen flamegraph.pl y
+    speedscope. Con intervalos de 10 ms la sobrecarga es mucho menor que cProfile.
+    """
+
+    def __init__(self, thread_id, interval=config.PROFILE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _start_profiler(mode):
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if mode == "sampling":
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+        return profiler
+    if mode is not None:
+        raise ValueError(f"Modo de perfilado desconocido: {mode}")
+    return None
+
+
+def _stop_profiler(mode, profiler, name):
+    if profiler is None:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    if mode == "cprofile":
+        import pstats
+        profiler.disable()
+        path = os.path.join(METRICS_DIR, f"profile_{name}.pstats")
+        profiler.dump_stats(path)
+        pstats.Stats(path).sort_stats("cumulative").print_stats(15)
+    else:
+        profiler.stop()
+        path = os.path.join(METRICS_DIR, f"profile_{name}.folded")
+        profiler.dump(path)
+    print(f"Perfil de '{name}' guardado en {path}")
+
+
+# === Exportación ===
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_stage_metrics(name, record, runs=1, seconds=None, export=True):
+    """Guarda la última medición de la etapa (con acumulados) y regenera el archivo Prometheus.
+
+    runs y seconds suman varias ejecuciones de una vez (StepMetrics.flush).
+    """
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"stage_{name}.json")
+    previous = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    data = {
+        "etapa": name,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "timestamp": time.time(),
+        "ejecuciones": previous.get("ejecuciones", 0) + runs,
+        "segundos_acumulados": round(previous.get("segundos_acumulados", 0.0)
+                                     + (record["segundos"] if seconds is None else seconds), 4),
+        "ultima": record
+    }
+    _atomic_write(path, json.dumps(data, indent=2, ensure_ascii=False))
+    if export:
+        export_prometheus()
+    return path
+
+
+def export_prometheus(path=PROMETHEUS_PATH):
+    """Regenera el archivo Prometheus con la última medición de todas las etapas."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_write(path, prometheus_text(load_stage_metrics()))
+    return path
+
+
+def load_stage_metrics(metrics_dir=METRICS_DIR):
+    metrics = []
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "stage_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            metrics.append(json.load(f))
+    return metrics
+
+
+GAUGES = [
+    ("wall_seconds", "segundos", 1, "Tiempo de reloj de la última ejecución"),
+    ("cpu_seconds", "cpu_segundos", 1, "Tiempo de CPU (proceso e hijos terminados) de la última ejecución"),
+    ("peak_rss_bytes", "rss_pico_mb", 1024 * 1024, "RSS pico de la última ejecución"),
+    ("rows", "filas", 1, "Filas procesadas en la última ejecución"),
+    ("rows_per_second", "filas_por_segundo", 1, "Throughput de la última ejecución")
+]
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _flatten(record, prefix=""):
+    """(ruta del paso, registro) de la etapa y de todos sus pasos anidados; la etapa tiene ruta ""."""
+    yield prefix, record
+    for child in record["pasos"]:
+        path = f"{prefix}/{child['nombre']}" if prefix else child["nombre"]
+        yield from _flatten(child, path)
+
+
+def prometheus_text(metrics):
+    """Formato de texto de Prometheus (para el textfile collector de node_exporter)."""
+    lines = []
+    for metric, key, scale, help_text in GAUGES:
+        lines += [f"# HELP anemia_stage_{metric} {help_text}.", f"# TYPE anemia_stage_{metric} gauge"]
+        for data in metrics:
+            for path, record in _flatten(data["ultima"]):
+                if record.get(key) is not None:
+                    lines.append(f'anemia_stage_{metric}{{stage="{_label(data["etapa"])}",'
+                                 f'step="{_label(path)}"}} {_number(round(record[key] * scale, 4))}')
+    counters = [
+        ("runs_total", "counter", "ejecuciones", "Ejecuciones de la etapa"),
+        ("wall_seconds_total", "counter", "segundos_acumulados", "Tiempo de reloj acumulado"),
+        ("last_run_timestamp_seconds", "gauge", "timestamp", "Fin de la última ejecución (epoch)")
+    ]
+    for metric, kind, key, help_text in counters:
+        lines += [f"# HELP anemia_stage_{metric} {help_text}.", f"# TYPE anemia_stage_{metric} {kind}"]
+        for data in metrics:
+            lines.append(f'anemia_stage_{metric}{{stage="{_label(data["etapa"])}"}} {_number(data[key])}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,299 @@
+# src/tree_compiler.py
+import json
+import numpy as np
+
+# Filas por bloque en el recorrido vectorizado (acota la memoria de los índices n x árboles)
+BLOCK_ROWS = 1024
+# Clave (nodo, categoría) = nodo * CATEGORY_STRIDE + código; XGBoost no admite códigos >= 2^24
+CATEGORY_STRIDE = 1 << 24
+
+
+class CompiledForest:
+    """Ensamble de árboles aplanado en arreglos NumPy contiguos.
+
+    Todos los árboles comparten los mismos arreglos de nodos; roots indica el nodo
+    raíz de cada árbol. En las hojas left == right == el propio nodo, así que
+    avanzar desde una hoja la deja en su lugar.
+
+    kind == "random_forest": se va a la izquierda si x <= umbral y la
+    probabilidad es el promedio de las distribuciones de clase de las hojas.
+    kind == "xgboost": se va a la izquierda si x < umbral, los faltantes siguen
+    default_left y el margen por clase (base_score + suma de hojas) pasa por softmax.
+    En sus divisiones categóricas (modo compacto) el código va a la derecha si
+    (nodo, código) está en category_keys y a la izquierda si no, o si es negativo.
+    """
+
+    ARRAY_NAMES = ("feature", "threshold", "left", "right", "default_left",
+                   "value", "roots", "tree_class")
+    # Solo los usan los modelos con divisiones categóricas; los artefactos previos no los traen
+    OPTIONAL_NAMES = ("categorical", "category_keys")
+    # Derivados de los anteriores; se guardan junto a ellos para no recalcularlos al cargar
+    DERIVED_NAMES = ("internal", "used_columns", "compact_feature", "children")
+
+    def __init__(self, kind, n_classes, n_features, max_depth, base_score=0.0,
+                 zero_as_missing=False, **arrays):
+        self.kind = kind
+        self.n_classes = int(n_classes)
+        self.n_features = int(n_features)
+        self.max_depth = int(max_depth)
+        self.base_score = float(base_score)
+        # Modelos XGBoost entrenados con CSR: los ceros no almacenados son "faltantes"
+        self.zero_as_missing = bool(zero_as_missing)
+        for name in self.ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.categorical = arrays.get("categorical", np.zeros(len(self.left), dtype=bool))
+        self.category_keys = arrays.get("category_keys", np.empty(0, dtype=np.int64))
+        self.has_categories = bool(len(self.category_keys))
+        if all(name in arrays for name in self.DERIVED_NAMES):
+            for name in self.DERIVED_NAMES:
+                setattr(self, name, arrays[name])
+        else:
+            self._derive()
+        if kind == "xgboost":
+            self._class_matrix = np.zeros((len(self.roots), self.n_classes))
+            self._class_matrix[np.arange(len(self.roots)), self.tree_class] = 1.0
+
+    def arrays(self):
+        names = self.ARRAY_NAMES + self.DERIVED_NAMES
+        if self.has_categories:
+            names += self.OPTIONAL_NAMES
+        return {name: getattr(self, name) for name in names}
+
+    def params(self):
+        return {
+            "kind": self.kind,
+            "n_classes": self.n_classes,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "base_score": self.base_score,
+            "zero_as_missing": self.zero_as_missing
+        }
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _derive(self):
+        self.internal = self.left != np.arange(len(self.left))
+        # Columnas que usa algún nodo interno y su índice dentro del bloque compacto
+        self.used_columns = np.unique(self.feature[self.internal]).astype(np.int32)
+        col_of = np.zeros(self.n_features, dtype=np.int32)
+        col_of[self.used_columns] = np.arange(len(self.used_columns), dtype=np.int32)
+        self.compact_feature = col_of[self.feature]
+        # Tabla de hijos [izquierdo, derecho, faltante] aplanada: un solo gather por paso
+        missing = np.where(self.default_left, self.left, self.right)
+        self.children = np.stack([self.left, self.right, missing], axis=1).ravel()
+
+    def _prepare(self, X):
+        """Bloque denso float32 solo con las columnas usadas por los árboles."""
+        if isinstance(X, np.ndarray) and X.ndim == 1:
+            X = X.reshape(1, -1)
+        if hasattr(X, "toarray"):  # CSR de scipy sin importar scipy en el camino de puntuación
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)[:, self.used_columns]
+        if self.zero_as_missing:
+            X[X == 0] = np.nan
+        return X
+
+    def _step(self, nodes, x, has_nan=True):
+        # rama 0 = izquierda, 1 = derecha, 2 = valor faltante
+        if self.kind == "xgboost":
+            branch = (x >= self.threshold[nodes]).view(np.int8).astype(np.intp)
+            if self.has_categories:
+                self._categorical_branch(nodes, x, branch)
+        else:
+            branch = (x > self.threshold[nodes]).view(np.int8).astype(np.intp)
+        if has_nan:
+            branch[np.isnan(x)] = 2
+        return self.children[nodes * 3 + branch]
+
+    def _categorical_branch(self, nodes, x, branch):
+        """Rama de los nodos categóricos: derecha si el código está en el conjunto del nodo."""
+        cat = np.flatnonzero(self.categorical[nodes])
+        if not cat.size:
+            return
+        code = x[cat]
+        valid = code >= 0  # NaN también da False; luego lo resuelve la rama de faltantes
+        keys = nodes[cat].astype(np.int64) * CATEGORY_STRIDE + np.where(valid, code, 0).astype(np.int64)
+        pos = np.minimum(np.searchsorted(self.category_keys, keys), len(self.category_keys) - 1)
+        branch[cat] = valid & (self.category_keys[pos] == keys)
+
+    def _leaves(self, X):
+        """Índice de hoja por (fila, árbol) para un bloque preparado.
+
+        Solo se avanzan los pares (fila, árbol) que aún no llegaron a una hoja, así
+        que el costo es la suma de las longitudes de camino y no n x árboles x max_depth.
+        """
+        n, width = X.shape
+        n_trees = len(self.roots)
+        has_nan = bool(np.isnan(X).any())
+        nodes = np.tile(self.roots, n)
+        row_offset = np.repeat(np.arange(n, dtype=np.int64) * width, n_trees)
+        flat = X.ravel()
+        active = np.flatnonzero(self.internal[nodes])
+        while active.size:
+            current = nodes[active]
+            x = flat[row_offset[active] + self.compact_feature[current]]
+            nxt = self._step(current, x, has_nan)
+            nodes[active] = nxt
+            active = active[self.internal[nxt]]
+        return nodes.reshape(n, n_trees)
+
+    def _proba_from_leaves(self, leaves):
+        if self.kind == "random_forest":
+            return self.value[leaves].mean(axis=-2)
+        margin = self.value[leaves] @ self._class_matrix + self.base_score
+        margin -= margin.max(axis=-1, keepdims=True)
+        expm = np.exp(margin)
+        return expm / expm.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, X):
+        out = np.empty((X.shape[0], self.n_classes))
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            block = self._prepare(X[start:start + BLOCK_ROWS])
+            out[start:start + len(block)] = self._proba_from_leaves(self._leaves(block))
+        return out
+
+    def predict_proba_row(self, x):
+        """Camino rápido para una sola fila: un índice de nodo por árbol, sin bloques."""
+        x = self._prepare(x)[0]
+        has_nan = bool(np.isnan(x).any())
+        nodes = self.roots.copy()
+        for _ in range(self.max_depth):
+            nodes = self._step(nodes, x[self.compact_feature[nodes]], has_nan)
+        return self._proba_from_leaves(nodes)
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+
+def _depths(left, right, roots):
+    """Profundidad máxima de todos los árboles (recorrido por niveles)."""
+    depth = 0
+    frontier = np.asarray(roots)
+    while True:
+        is_internal = left[frontier] != frontier
+        frontier = np.concatenate([left[frontier][is_internal], right[frontier][is_internal]])
+        if len(frontier) == 0:
+            return depth
+        depth += 1
+
+
+def compile_random_forest(model):
+    """Exporta un RandomForestClassifier de scikit-learn a un CompiledForest."""
+    features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    n_classes = len(model.classes_)
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        left = np.where(is_leaf, np.arange(n), tree.children_left) + offset
+        right = np.where(is_leaf, np.arange(n), tree.children_right) + offset
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(n, dtype=np.uint8))
+
+        # value puede venir en conteos ponderados: se normaliza a proporciones por hoja
+        counts = tree.value[:, 0, :n_classes].astype(np.float64)
+        totals = counts.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(left)
+        rights.append(right)
+        defaults.append(np.asarray(missing_left, dtype=bool))
+        values.append(counts / totals)
+        roots.append(offset)
+        offset += n
+
+    left = np.concatenate(lefts).astype(np.int32)
+    right = np.concatenate(rights).astype(np.int32)
+    roots = np.asarray(roots, dtype=np.int32)
+    return CompiledForest(
+        "random_forest", n_classes, model.n_features_in_, _depths(left, right, roots),
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=left,
+        right=right,
+        default_left=np.concatenate(defaults),
+        value=np.ascontiguousarray(np.concatenate(values)),
+        roots=roots,
+        tree_class=np.full(len(roots), -1, dtype=np.int32)
+    )
+
+
+def compile_xgboost(model, zero_as_missing=False):
+    """Exporta un XGBClassifier (o Booster) a un CompiledForest desde su modelo JSON."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    raw = json.loads(booster.save_raw(raw_format="json"))
+    learner = raw["learner"]
+    gbtree = learner["gradient_booster"]["model"]
+    n_classes = max(int(learner["learner_model_param"]["num_class"]), 1)
+    base_score = float(learner["learner_model_param"]["base_score"])
+
+    trees = gbtree["trees"]
+    tree_info = gbtree["tree_info"]
+    # Con early stopping, predict usa solo las rondas hasta best_iteration
+    best_iteration = booster.attr("best_iteration")
+    if best_iteration is not None:
+        per_round = n_classes * int(gbtree["gbtree_model_param"].get("num_parallel_tree", 1))
+        trees = trees[:(int(best_iteration) + 1) * per_round]
+        tree_info = tree_info[:len(trees)]
+
+    features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+    categorical, category_keys = [], []
+    offset = 0
+    for tree in trees:
+        left_children = np.asarray(tree["left_children"], dtype=np.int64)
+        n = len(left_children)
+        is_leaf = left_children == -1
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        # Divisiones categóricas: conjunto de categorías que van a la derecha, por nodo
+        categorical.append(np.asarray(tree.get("split_type", [0] * n), dtype=np.int8) == 1)
+        cats = np.asarray(tree.get("categories", []), dtype=np.int64)
+        for node, start, size in zip(tree.get("categories_nodes", []), tree.get("categories_segments", []),
+                                     tree.get("categories_sizes", [])):
+            category_keys.append((offset + node) * CATEGORY_STRIDE + cats[start:start + size])
+        features.append(np.where(is_leaf, 0, np.asarray(tree["split_indices"])))
+        thresholds.append(conditions)
+        lefts.append(np.where(is_leaf, np.arange(n), left_children) + offset)
+        rights.append(np.where(is_leaf, np.arange(n), tree["right_children"]) + offset)
+        defaults.append(np.asarray(tree["default_left"], dtype=bool))
+        # En las hojas split_conditions guarda el peso de la hoja
+        values.append(np.where(is_leaf, conditions, 0.0).astype(np.float64))
+        roots.append(offset)
+        offset += n
+
+    left = np.concatenate(lefts).astype(np.int32)
+    right = np.concatenate(rights).astype(np.int32)
+    roots = np.asarray(roots, dtype=np.int32)
+    optional = {}
+    if category_keys:
+        optional = {"categorical": np.concatenate(categorical),
+                    "category_keys": np.sort(np.concatenate(category_keys))}
+    return CompiledForest(
+        "xgboost", n_classes, booster.num_features(), _depths(left, right, roots),
+        base_score=base_score,
+        zero_as_missing=zero_as_missing,
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds),
+        left=left,
+        right=right,
+        default_left=np.concatenate(defaults),
+        value=np.concatenate(values),
+        roots=roots,
+        tree_class=np.asarray(tree_info, dtype=np.int32),
+        **optional
+    )
+
+
+def compile_model(model, zero_as_missing=False):
+    if hasattr(model, "estimators_"):
+        return compile_random_forest(model)
+    return compile_xgboost(model, zero_as_missing=zero_as_missing)
+
+
+def compile_pipeline(pipeline):
+    """Compila el modelo de un InferencePipeline respetando cómo se entrenó (denso o CSR)."""
+    zero_as_missing = bool(getattr(pipeline.preprocessor, "sparse_output_", False))
+    return compile_model(pipeline.model, zero_as_missing=zero_as_missing)
@@ -0,0 +1,90 @@
+# tests/conftest.py — Entorno aislado y datos sintéticos compartidos por las pruebas
+import os
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Antes de importar src.config: artifacts/, output/ y data/ van a una carpeta temporal,
+# así ninguna prueba toca los artefactos del repositorio
+for _key in [k for k in os.environ if k.startswith("ANEMIA_")]:
+    del os.environ[_key]
+TEST_BASE_DIR = tempfile.mkdtemp(prefix="anemia_tests_")
+os.environ["ANEMIA_BASE_DIR"] = TEST_BASE_DIR
+os.environ["ANEMIA_N_JOBS"] = "2"
+# El generador sintético toma el esquema del reporte de validación y el vocabulario del modelo heredado
+os.makedirs(os.path.join(TEST_BASE_DIR, "artifacts"))
+shutil.copy(os.path.join(REPO_DIR, "artifacts", "validation_report.json"),
+            os.path.join(TEST_BASE_DIR, "artifacts", "validation_report.json"))
+shutil.copy(os.path.join(REPO_DIR, "model_XGBoost.joblib"), os.path.join(TEST_BASE_DIR, "model_XGBoost.joblib"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+SYNTHETIC_ROWS = 4000
+SMALL_PARAMS = {
+    "RandomForest": {"n_estimators": 15, "max_depth": 12},
+    "XGBoost": {"n_estimators": 15, "learning_rate": 0.3, "max_depth": 4},
+}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_BASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def raw_csv():
+    """CSV sintético con el esquema del dataset real (semilla fija)."""
+    from benchmarks.synthetic_data import generate_dataset
+    path = os.path.join(TEST_BASE_DIR, "data", "sintetico.csv")
+    return generate_dataset(SYNTHETIC_ROWS, path, chunk_rows=1500)
+
+
+@pytest.fixture(scope="session")
+def raw_df(raw_csv):
+    return pd.read_csv(raw_csv, encoding="utf-8-sig")
+
+
+def fit_pipelines(df, compact, params=SMALL_PARAMS):
+    """{modelo: InferencePipeline} con árboles pequeños, ajustados como en preprocess y train."""
+    from src.inference import InferencePipeline
+    from src.model_search import make_model
+    from src.preprocessing import NUM_COLS, build_preprocessor, feature_types, get_feature_names
+
+    num_cols = list(NUM_COLS)
+    cat_cols = [c for c in df.columns if c not in num_cols + ["Anemia", "ID"]]
+    preprocessor = build_preprocessor(num_cols, cat_cols, sparse_output=not compact, compact=compact)
+    X = preprocessor.fit_transform(df[num_cols + cat_cols])
+    classes = sorted(df["Anemia"].astype(str).unique())
+    label_map = {c: i for i, c in enumerate(classes)}
+    y = df["Anemia"].astype(str).map(label_map).to_numpy()
+    types = feature_types(preprocessor, num_cols, cat_cols)
+    names = get_feature_names(preprocessor, num_cols, cat_cols)
+
+    pipelines = {}
+    for name, model_params in params.items():
+        model = make_model(name, model_params, len(classes), n_jobs=1, feature_types=types).fit(X, y)
+        pipelines[name] = InferencePipeline(preprocessor, model, num_cols, cat_cols, names, label_map, name)
+    return pipelines
+
+
+@pytest.fixture(scope="session")
+def onehot_pipelines(raw_df):
+    return fit_pipelines(raw_df, compact=False)
+
+
+@pytest.fixture(scope="session")
+def compact_pipelines(raw_df):
+    return fit_pipelines(raw_df, compact=True)
+
+
+@pytest.fixture(params=["onehot", "compact"])
+def pipelines(request):
+    """Ambos modos de preprocesamiento: one-hot disperso y códigos de categoría float32."""
+    return request.getfixturevalue(f"{request.param}_pipelines")
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils.class_weight import compute_sample_weight
+from src.balancing import _nearest_neighbors, class_sample_weights, smote_minority
+
+
+def test_class_sample_weights_match_sklearn_balanced(rng):
+    y = rng.choice(4, size=2000, p=[0.7, 0.2, 0.08, 0.02])
+    np.testing.assert_allclose(class_sample_weights(y, max_weight=1e9), compute_sample_weight("balanced", y))
+    assert class_sample_weights(y, max_weight=2.0).max() == 2.0
+
+
+def test_neighbors_exclude_only_the_row_itself(rng):
+    # Cada fila aparece dos veces: su copia es su vecino a distancia cero
+    X = sparse.csr_matrix(np.repeat(rng.random((40, 3)), 2, axis=0))
+    neighbors = _nearest_neighbors(X, X, 1, pool_pos=np.arange(80))
+
+    assert (neighbors[:, 0] != np.arange(80)).all()
+    np.testing.assert_array_equal(neighbors[:, 0], np.arange(80) ^ 1)
+
+
+def test_neighbors_against_sampled_pool_match_brute_force(rng):
+    X = rng.random((600, 4))
+    pool_idx = rng.choice(600, size=100, replace=False)
+    pool_pos = np.full(600, -1)
+    pool_pos[pool_idx] = np.arange(100)
+
+    found = _nearest_neighbors(sparse.csr_matrix(X), sparse.csr_matrix(X[pool_idx]), 3, pool_pos)
+
+    # Referencia: los 4 más cercanos del pool, sin la propia fila si está en él
+    _, ref = NearestNeighbors(n_neighbors=4).fit(X[pool_idx]).kneighbors(X)
+    for i in range(600):
+        expected = [j for j in ref[i] if j != pool_pos[i]][:3]
+        np.testing.assert_array_equal(found[i], expected)
+
+
+@pytest.mark.parametrize("pool_size", [10_000, 50])
+def test_smote_rows_interpolate_between_distinct_rows_of_the_class(rng, pool_size):
+    X = np.vstack([rng.random((2000, 3)), 5 + rng.random((300, 3))])
+    y = np.array(["No"] * 2000 + ["Severa"] * 300, dtype=object)
+
+    X_syn, y_syn, generated = smote_minority(X, y, n_numeric=3, target_ratio=0.5, pool_size=pool_size,
+                                             numeric_neighbors=True)
+
+    assert generated == {"Severa": 700}
+    assert (y_syn == "Severa").all()
+    X_syn = X_syn.toarray()
+    # Dentro de la caja de la minoría y sin copias exactas de filas reales
+    assert (X_syn >= 5).all() and (X_syn <= 6).all()
+    assert not (X_syn[:, None, :] == X[None, 2000:, :]).all(axis=2).any()
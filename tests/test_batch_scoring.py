@@ -0,0 +1,31 @@
+import csv
+import numpy as np
+import pandas as pd
+import pytest
+from src.batch_scoring import score_file
+from src.inference import save_pipeline
+
+
+@pytest.mark.parametrize("output", ["puntuado.csv", "puntuado.parquet"])
+def test_scored_file_keeps_rounded_contributions(pipelines, raw_df, tmp_path, output):
+    input_path = str(tmp_path / "entrada.csv")
+    raw_df.head(250).to_csv(input_path, index=False, encoding="utf-8-sig")
+    pipeline_file = save_pipeline(pipelines["XGBoost"], str(tmp_path / "pipeline_XGBoost.joblib"))
+    output_path = str(tmp_path / output)
+
+    assert score_file(input_path, output_path, pipeline_file, chunk_rows=100, workers=1, use_cache=False,
+                      top_k=3) == 250
+
+    aportes = [f"aporte_{i}" for i in range(1, 4)]
+    if output.endswith(".parquet"):
+        scored = pd.read_parquet(output_path)
+        assert all(scored[c].dtype == np.float32 for c in aportes)
+    else:
+        with open(output_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        # Texto del CSV: a lo sumo 4 decimales, no la representación float32 completa
+        assert all(len(row[c].partition(".")[2]) <= 4 for row in rows for c in aportes)
+        scored = pd.read_csv(output_path, encoding="utf-8-sig")
+        assert all(scored[c].dtype == np.float64 for c in aportes)
+    assert all(scored[f"factor_{i}"].isin(pipelines["XGBoost"].raw_columns).all() for i in range(1, 4))
+    np.testing.assert_array_equal(scored[aportes].to_numpy(), scored[aportes].to_numpy().round(4))
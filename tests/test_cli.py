@@ -0,0 +1,42 @@
+import json
+import pytest
+from src import config
+from src.cli import apply_configuration
+
+
+@pytest.fixture
+def restore_config(monkeypatch):
+    """apply_configuration cambia src.config y exporta al entorno: ambos se restauran."""
+    saved = config.settings()
+    for key in (config.CONFIG_FILE_ENV, "ANEMIA_SMOTE_K", "ANEMIA_EVAL_BOOTSTRAP",
+                "ANEMIA_CACHE_TTL_S", "ANEMIA_EXTERNAL_CHUNK_ROWS"):
+        monkeypatch.delenv(key, raising=False)
+    yield monkeypatch
+    config.apply_overrides(saved)
+
+
+def test_file_then_environment_then_set(restore_config, tmp_path):
+    path = tmp_path / "ajustes.json"
+    path.write_text(json.dumps({"SMOTE_K": 3, "EVAL_BOOTSTRAP": 5, "CACHE_TTL_S": 7}), encoding="utf-8")
+    restore_config.setenv("ANEMIA_EVAL_BOOTSTRAP", "9")
+    restore_config.setenv("ANEMIA_CACHE_TTL_S", "10")
+
+    apply_configuration(str(path), ["CACHE_TTL_S=11"])
+
+    assert (config.SMOTE_K, config.EVAL_BOOTSTRAP, config.CACHE_TTL_S) == (3, 9, 11)
+    # Un proceso hijo relee el entorno con la misma precedencia
+    assert config.env_overrides()["CACHE_TTL_S"] == 11
+
+
+def test_train_external_applies_set_before_reading_defaults(restore_config):
+    import train_external
+    import src.external_training
+    calls = []
+    restore_config.setattr(src.external_training, "train_xgboost_external",
+                           lambda path, **kwargs: calls.append((path, kwargs)))
+
+    train_external.main(["--set", "EXTERNAL_CHUNK_ROWS=123", "--dmatrix", "quantile", "--no-save"])
+
+    path, kwargs = calls[0]
+    assert path == config.DATASET_PATH
+    assert kwargs == {"chunk_rows": 123, "dmatrix": "quantile", "n_jobs": config.N_JOBS, "save": False}
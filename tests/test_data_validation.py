@@ -0,0 +1,35 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.data_validation import DuplicateCounter, validate_dataset
+
+
+@pytest.mark.parametrize("buffer_rows", [10_000_000, 700, 64])
+def test_duplicate_counter_matches_pandas(rng, tmp_path, buffer_rows):
+    df = pd.DataFrame({"a": rng.integers(0, 40, 5000), "b": rng.choice(["x", "y", "z"], 5000)})
+    counter = DuplicateCounter(str(tmp_path), buffer_rows=buffer_rows)
+    for start in range(0, len(df), 512):
+        counter.add(pd.util.hash_pandas_object(df.iloc[start:start + 512], index=False).to_numpy())
+
+    assert counter.count() == df.duplicated().sum()
+    # Con un búfer chico los hashes pasan por corridas en disco
+    assert bool(os.listdir(tmp_path)) == (buffer_rows < len(df))
+
+
+def test_validate_dataset_matches_pandas(raw_df, tmp_path):
+    df = pd.concat([raw_df, raw_df.sample(137, random_state=1)], ignore_index=True)
+    df.loc[df.sample(50, random_state=2).index, "Peso_kg"] = np.nan
+    path = str(tmp_path / "dataset.csv")
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+
+    report = validate_dataset(path, chunksize=700)
+
+    assert report["n_filas"] == len(df)
+    assert report["columnas"] == df.columns.tolist()
+    assert report["duplicados"] == df.duplicated().sum()
+    assert report["nulos"] == {c: int(n) for c, n in df.isna().sum().items()}
+    with open(os.path.join(config.ARTIFACTS_DIR, "validation_report.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["duplicados"] == report["duplicados"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.metrics import (accuracy_score, cohen_kappa_score, confusion_matrix, f1_score,
+                             roc_auc_score)
+from src.evaluation import evaluate_predictions
+
+
+def _predictions(rng, n=3000, n_classes=4, decimals=None):
+    y = rng.choice(n_classes, size=n, p=[0.6, 0.25, 0.1, 0.05])
+    proba = rng.dirichlet(np.ones(n_classes), size=n)
+    # Sesgo hacia la clase real para que las métricas no sean triviales
+    proba[np.arange(n), y] += rng.random(n)
+    proba /= proba.sum(axis=1, keepdims=True)
+    if decimals is not None:
+        proba = proba.round(decimals)  # empates en los puntajes
+    return y, proba
+
+
+@pytest.mark.parametrize("decimals", [None, 1])
+def test_point_metrics_match_sklearn(rng, decimals):
+    y, proba = _predictions(rng, decimals=decimals)
+    y_pred = proba.argmax(axis=1)
+    result = evaluate_predictions(y, proba, n_boot=0)
+
+    assert result["accuracy"] == pytest.approx(accuracy_score(y, y_pred))
+    assert result["f1_macro"] == pytest.approx(f1_score(y, y_pred, average="macro"))
+    assert result["kappa"] == pytest.approx(cohen_kappa_score(y, y_pred))
+    np.testing.assert_array_equal(result["confusion"], confusion_matrix(y, y_pred, labels=range(4)))
+    for c in range(4):
+        assert result["auc_por_clase"][c] == pytest.approx(roc_auc_score(y == c, proba[:, c]))
+    assert result["auc"] == pytest.approx(np.mean([roc_auc_score(y == c, proba[:, c]) for c in range(4)]))
+    assert result["gini"] == pytest.approx(2 * result["auc"] - 1)
+
+
+def test_f1_macro_skips_classes_absent_from_truth_and_predictions(rng):
+    y, proba = _predictions(rng)
+    keep = y != 3
+    y, proba = y[keep], proba[keep]
+    proba[:, 3] = 0.0
+    y_pred = proba.argmax(axis=1)
+    result = evaluate_predictions(y, proba, n_boot=0)
+
+    assert result["f1_macro"] == pytest.approx(f1_score(y, y_pred, average="macro"))
+    assert np.isnan(result["auc_por_clase"][3])
+
+
+def test_bootstrap_intervals_bracket_the_point_estimate(rng):
+    y, proba = _predictions(rng)
+    result = evaluate_predictions(y, proba, n_boot=200, n_jobs=2)
+
+    for key in ("accuracy", "f1_macro", "kappa", "auc", "gini"):
+        low, high = result["ic"][key]
+        # El AUC de las réplicas usa histogramas: se admite el error de los bins
+        assert low - 0.005 <= result[key] <= high + 0.005
+        assert low < high
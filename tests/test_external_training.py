@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+from conftest import REPO_DIR
+from src.external_training import fit_preprocessor_streaming, train_xgboost_external
+from src.inference import InferencePipeline
+
+
+def _mixed_csv(raw_df, tmp_path):
+    """Una columna categórica que el primer bloque lee como números y el segundo como texto."""
+    df = raw_df.head(600).copy()
+    df["Distrito"] = ["101", "102"] * 150 + ["Lima", "101"] * 150
+    df.loc[df.index[::7], "Distrito"] = np.nan
+    path = str(tmp_path / "mixto.csv")
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path, df
+
+
+def test_mixed_type_categories_are_collected_as_text(raw_df, tmp_path):
+    path, df = _mixed_csv(raw_df, tmp_path)
+    prep = fit_preprocessor_streaming(path, chunk_rows=300, sample_rows=400)
+    position = prep["cat_cols"].index("Distrito")
+    encoder = prep["preprocessor"].named_transformers_["cat"].named_steps["encoder"]
+
+    assert list(encoder.categories_[position]) == ["101", "102", "Lima"]
+    pipeline = InferencePipeline(prep["preprocessor"], None, prep["num_cols"], prep["cat_cols"],
+                                 prep["feature_names"], {}, "XGBoostExterno")
+    # El código leído como número y como texto cae en la misma columna one-hot
+    as_number, as_text = df.head(1).assign(Distrito=101), df.head(1).assign(Distrito="101")
+    assert (pipeline.transform(as_number) != pipeline.transform(as_text)).nnz == 0
+    column = prep["feature_names"].index("Distrito_101")
+    assert pipeline.transform(as_number)[0, column] == 1
+
+
+def test_external_training_runs_on_mixed_type_columns(raw_df, tmp_path):
+    path, _ = _mixed_csv(raw_df, tmp_path)
+    _, metrics = train_xgboost_external(path, chunk_rows=300, dmatrix="quantile", n_jobs=1, save=False)
+
+    assert 0 <= metrics["accuracy"] <= 1
+
+
+def test_update_path_does_not_import_xgboost():
+    code = "import sys, src.incremental_training; assert 'xgboost' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, check=True)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from src.feature_store import load_features, load_meta, save_features
+
+
+@pytest.mark.parametrize("kind", ["csr", "dense64", "dense32"])
+def test_load_features_round_trip(rng, kind):
+    dense = rng.random((300, 12)) * (rng.random((300, 12)) < 0.3)
+    X = {"csr": sparse.csr_matrix(dense), "dense64": dense, "dense32": dense.astype(np.float32)}[kind]
+    y = rng.choice(np.array(["No", "Leve", "Moderada", "Severa"], dtype=object), size=300)
+    names = [f"f{i}" for i in range(12)]
+
+    save_features(X, y, names, name=f"prueba_{kind}", export_csv=False)
+    X_back, y_back, names_back = load_features(f"prueba_{kind}")
+
+    assert sparse.issparse(X_back) == sparse.issparse(X)
+    assert X_back.dtype == X.dtype
+    np.testing.assert_array_equal(X_back.toarray() if sparse.issparse(X_back) else X_back,
+                                  X.toarray() if sparse.issparse(X) else X)
+    np.testing.assert_array_equal(y_back, y)
+    assert names_back == names
+    assert load_meta(f"prueba_{kind}")["shape"] == [300, 12]
+
+
+def test_load_features_is_memory_mapped(rng):
+    save_features(rng.random((50, 3)), np.array(["No"] * 50), ["a", "b", "c"], name="prueba_mmap",
+                  export_csv=False)
+    X, _, _ = load_features("prueba_mmap")
+
+    assert isinstance(X, np.memmap)
+    assert not X.flags.writeable
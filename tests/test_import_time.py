@@ -0,0 +1,19 @@
+import os
+import pytest
+from benchmarks.check_import_time import BUDGETS, HEAVY, measure, missing_dependencies
+
+# Máquinas lentas o CI compartido: IMPORT_BUDGET_SCALE=2 duplica los presupuestos
+SCALE = float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+
+
+@pytest.mark.parametrize("module", list(BUDGETS))
+def test_import_within_budget(module):
+    missing = missing_dependencies(module)
+    if missing:
+        pytest.skip(f"falta {', '.join(missing)}")
+    budget_ms, allowed = BUDGETS[module]
+
+    ms, modules = measure(module, repeat=3)
+
+    assert [m for m in HEAVY if m in modules and m not in allowed] == []
+    assert ms <= budget_ms * SCALE, f"{module}: {ms:.1f} ms (presupuesto {budget_ms * SCALE:.0f} ms)"
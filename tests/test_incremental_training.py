@@ -0,0 +1,71 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from conftest import SMALL_PARAMS, TEST_BASE_DIR
+from src.inference import find_pipeline_path, load_pipeline
+from src.incremental_training import update_models
+from src.preprocessing import PREPROCESSOR_PATH
+
+
+@pytest.fixture(scope="module")
+def trained(raw_csv):
+    """preprocess y train reales (modo compacto) sobre el CSV sintético, con árboles pequeños."""
+    from src import model_training
+    from src.preprocessing import preprocess_data
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(model_training, "DEFAULT_PARAMS", SMALL_PARAMS)
+        preprocess_data(path=raw_csv, compact=True)
+        model_training.train_models(mode="fixed")
+
+
+@pytest.fixture
+def batch_csv(trained, raw_df):
+    """Lote nuevo: filas del histórico con un distrito que el vocabulario no conoce."""
+    df = raw_df.sample(600, random_state=3).reset_index(drop=True)
+    df.loc[:99, "Distrito"] = "DISTRITO_NUEVO"
+    path = os.path.join(TEST_BASE_DIR, "data", "lote.csv")
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path, df
+
+
+def _saved_encoder():
+    return joblib.load(PREPROCESSOR_PATH)["preprocessor"].named_transformers_["cat"].named_steps["encoder"]
+
+
+def _versions():
+    return {name: load_pipeline(find_pipeline_path(name)).version for name in ("RandomForest", "XGBoost")}
+
+
+def test_candidate_that_loses_f1_is_not_promoted(batch_csv):
+    path, _ = batch_csv
+    before = _versions()
+    vocabulary = _saved_encoder().vocabulary_
+
+    # Una caída máxima negativa exige mejorar más de lo posible: ningún candidato pasa
+    entry = update_models(path, extra_trees=3, extra_rounds=3, max_f1_drop=-1.0)
+
+    assert not any(result["promovido"] for result in entry["modelos"].values())
+    assert _versions() == before
+    assert _saved_encoder().vocabulary_ == vocabulary
+
+
+def test_promoted_update_extends_the_vocabulary_without_moving_codes(batch_csv, raw_df):
+    path, df = batch_csv
+    before = _versions()
+    old = load_pipeline(find_pipeline_path("XGBoost"))
+    old_codes = old.transform(raw_df.head(200))
+
+    entry = update_models(path, extra_trees=3, extra_rounds=3, max_f1_drop=1.0)
+
+    assert all(result["promovido"] for result in entry["modelos"].values())
+    assert all(_versions()[name] != before[name] for name in before)
+    new = load_pipeline(find_pipeline_path("XGBoost"))
+    np.testing.assert_array_equal(new.transform(raw_df.head(200)), old_codes)
+    district = new.feature_names.index("Distrito")
+    assert (new.transform(df.head(100))[:, district] >= 0).all()
+    assert (old.transform(df.head(100))[:, district] == -1).all()
+    assert new.model.get_booster().num_boosted_rounds() == old.model.get_booster().num_boosted_rounds() + 3
+    assert len(load_pipeline(find_pipeline_path("RandomForest")).model.estimators_) == \
+        SMALL_PARAMS["RandomForest"]["n_estimators"] + 3
+    assert "DISTRITO_NUEVO" in _saved_encoder().vocabulary_[new.cat_cols.index("Distrito")]
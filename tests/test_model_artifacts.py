@@ -0,0 +1,24 @@
+import os
+import numpy as np
+import pytest
+from src.model_artifacts import export_shared_model, load_manifest, load_shared_model
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "XGBoost"])
+def test_shared_artifact_round_trip(pipelines, raw_df, tmp_path, name):
+    pipeline = pipelines[name]
+    shared = load_shared_model(export_shared_model(pipeline, out_dir=str(tmp_path / name)))
+    df = raw_df.head(200)
+
+    assert shared.version == pipeline.version
+    np.testing.assert_allclose(shared.predict_proba(df), pipeline.predict_proba(df), atol=1e-5)
+
+
+def test_shared_arrays_are_read_only_memory_maps(onehot_pipelines, tmp_path):
+    model_dir = export_shared_model(onehot_pipelines["RandomForest"], out_dir=str(tmp_path / "rf"))
+    forest = load_shared_model(model_dir).model
+
+    for name in load_manifest(model_dir)["arrays"]:
+        array = getattr(forest, name)
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+    assert not os.path.exists(model_dir + ".tmp")
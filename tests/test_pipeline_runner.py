@@ -0,0 +1,88 @@
+import os
+import pytest
+from src import config, pipeline_runner
+from src.pipeline_runner import Stage, adopt_outputs, run_pipeline
+
+
+# Etapas de prueba: se ejecutan en otro proceso y toman su carpeta de config.STAGE_TEST_DIR
+def _copy(source, target, transform):
+    with open(os.path.join(config.STAGE_TEST_DIR, source), "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(os.path.join(config.STAGE_TEST_DIR, target), "w", encoding="utf-8") as f:
+        f.write(transform(text))
+
+
+def write_first():
+    _copy("fuente.txt", "primera.txt", str.strip)
+
+
+def write_second():
+    _copy("primera.txt", "segunda.txt", str.upper)
+
+
+def write_third():
+    _copy("segunda.txt", "tercera.txt", lambda text: text[::-1])
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    """Tres etapas encadenadas sobre archivos de tmp_path, con su propio estado."""
+    monkeypatch.setattr(config, "STAGE_TEST_DIR", str(tmp_path), raising=False)
+    (tmp_path / "fuente.txt").write_text("datos", encoding="utf-8")
+    chain = [
+        Stage("first", f"{__name__}:write_first", inputs=[str(tmp_path / "fuente.txt")],
+              outputs=[str(tmp_path / "primera.txt")]),
+        Stage("second", f"{__name__}:write_second", deps=["first"], outputs=[str(tmp_path / "segunda.txt")]),
+        Stage("third", f"{__name__}:write_third", deps=["second"], outputs=[str(tmp_path / "tercera.txt")]),
+    ]
+    monkeypatch.setattr(pipeline_runner, "STAGES", chain)
+    monkeypatch.setattr(pipeline_runner, "STATE_PATH", str(tmp_path / "estado.json"))
+    monkeypatch.setattr(pipeline_runner, "RUN_REPORT_PATH", str(tmp_path / "corrida.json"))
+    return chain, tmp_path
+
+
+def _run(chain):
+    report = run_pipeline(chain, max_workers=1, profile_stages=[])
+    return {name: info["estado"] for name, info in report.items()}
+
+
+def test_unchanged_stages_are_skipped(stages):
+    chain, tmp_path = stages
+    assert _run(chain) == {"first": "miss", "second": "miss", "third": "miss"}
+    assert _run(chain) == {"first": "hit", "second": "hit", "third": "hit"}
+
+    # Mismo resultado de first: las siguientes no se repiten
+    (tmp_path / "fuente.txt").write_text("datos\n", encoding="utf-8")
+    assert _run(chain) == {"first": "miss", "second": "hit", "third": "hit"}
+
+
+def test_modified_outputs_rerun_the_stage(stages):
+    chain, tmp_path = stages
+    _run(chain)
+    (tmp_path / "segunda.txt").write_text("editado a mano", encoding="utf-8")
+
+    assert _run(chain) == {"first": "hit", "second": "miss", "third": "hit"}
+    assert (tmp_path / "segunda.txt").read_text(encoding="utf-8") == "DATOS"
+
+
+def test_adopted_outputs_are_kept_and_only_consumers_rerun(stages):
+    chain, tmp_path = stages
+    _run(chain)
+    with adopt_outputs("first", "second"):
+        (tmp_path / "primera.txt").write_text("extendido", encoding="utf-8")
+        (tmp_path / "segunda.txt").write_text("ACTUALIZADO", encoding="utf-8")
+
+    assert _run(chain) == {"first": "hit", "second": "hit", "third": "miss"}
+    assert (tmp_path / "segunda.txt").read_text(encoding="utf-8") == "ACTUALIZADO"
+    assert (tmp_path / "tercera.txt").read_text(encoding="utf-8") == "ODAZILAUTCA"
+
+
+def test_stale_stages_are_not_adopted(stages):
+    chain, tmp_path = stages
+    _run(chain)
+    (tmp_path / "fuente.txt").write_text("otros", encoding="utf-8")
+    with adopt_outputs("first"):
+        (tmp_path / "primera.txt").write_text("extendido", encoding="utf-8")
+
+    assert _run(chain)["first"] == "miss"
+    assert (tmp_path / "primera.txt").read_text(encoding="utf-8") == "otros"
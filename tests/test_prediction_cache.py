@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.prediction_cache import PredictionCache
+
+
+def _through(cache, pipeline, frames):
+    return np.concatenate([cache.predict_proba(pipeline, df) for df in frames])
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "XGBoost"])
+def test_cached_predictions_equal_uncached(pipelines, raw_df, tmp_path, name):
+    pipeline = pipelines[name]
+    df = raw_df.head(300)
+    # Bloques que se solapan: la segunda mitad repite filas de la primera
+    frames = [df.iloc[:200], df.iloc[100:], df]
+    expected = np.concatenate([pipeline.predict_proba(f) for f in frames])
+    disk = str(tmp_path / "cache.sqlite")
+
+    cache = PredictionCache.for_pipeline(pipeline, disk_path=disk)
+    np.testing.assert_array_equal(_through(cache, pipeline, frames), expected)
+    assert cache.hits > 0
+    cache.close()
+    reopened = PredictionCache.for_pipeline(pipeline, disk_path=disk)
+    np.testing.assert_array_equal(_through(reopened, pipeline, frames), expected)
+    assert reopened.disk_hits > 0
+    reopened.close()
+
+
+def test_new_version_never_reuses_entries(onehot_pipelines, raw_df):
+    pipeline = onehot_pipelines["XGBoost"]
+    df = raw_df.head(20)
+    keys = PredictionCache.for_pipeline(pipeline).row_keys(df, pipeline)
+
+    assert not np.isin(PredictionCache(pipeline.model_name, "otra").row_keys(df, pipeline), keys).any()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_int_and_float_categories_get_the_model_prediction(compact):
+    """17, 17.0 y "17" llegan al codificador como categorías que pueden diferir según el modo."""
+    from sklearn.ensemble import RandomForestClassifier
+    from src.inference import InferencePipeline
+    from src.preprocessing import build_preprocessor
+
+    train = pd.DataFrame({"a": np.tile([1.0, 2.0, 3.0, 4.0], 10),
+                          "c": pd.Series(np.tile([17, "x", 17, "x"], 10), dtype=object)})
+    y = np.tile([0, 1, 0, 1], 10)
+    prep = build_preprocessor(["a"], ["c"], compact=compact).fit(train)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(prep.transform(train), y)
+    pipeline = InferencePipeline(prep, model, ["a"], ["c"], ["a", "c"], {"No": 0, "Leve": 1}, "RF")
+    rows = [pd.DataFrame({"a": [1.0], "c": pd.Series([value], dtype=object)}) for value in (17, 17.0, "17")]
+
+    cache = PredictionCache.for_pipeline(pipeline)
+    for df in rows + rows:
+        np.testing.assert_array_equal(cache.predict_proba(pipeline, df), pipeline.predict_proba(df))
+    # Las filas que el codificador distingue no comparten entrada (una se cachearía con la predicción de otra)
+    codes = [tuple(pipeline.transform(df)[0]) for df in rows]
+    keys = [cache.row_keys(df, pipeline)[0] for df in rows]
+    assert [a == b for a in codes for b in codes] == [a == b for a in keys for b in keys]
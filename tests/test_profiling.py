@@ -0,0 +1,59 @@
+import builtins
+import sys
+import pytest
+from src import profiling
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Rutas abiertas por src.profiling durante la prueba."""
+    paths = []
+
+    def spy(path, *args, **kwargs):
+        paths.append(path)
+        return builtins.open(path, *args, **kwargs)
+    monkeypatch.setattr(profiling, "open", spy, raising=False)
+    return paths
+
+
+def test_shared_process_never_resets_the_peak(opened, monkeypatch):
+    monkeypatch.setitem(profiling._profile, "reset_peak", False)
+    metrics = profiling.StepMetrics(flush_s=3600)
+    with metrics.measure("prediccion_prueba", rows=1):
+        with profiling.step("interno"):
+            pass
+    metrics.flush()
+
+    assert "/proc/self/clear_refs" not in opened
+
+
+def test_runner_worker_resets_the_peak(opened, monkeypatch):
+    monkeypatch.setitem(profiling._profile, "reset_peak", False)
+    profiling.configure(reset_peak=True)
+    with profiling.step("paso"):
+        pass
+
+    assert "/proc/self/clear_refs" in opened
+
+
+def test_peak_is_unknown_without_proc_resource_or_psutil(monkeypatch):
+    # Como en Windows sin psutil
+    monkeypatch.setattr(profiling, "_status_kb", lambda field: None)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    profiling._resource.cache_clear()
+    profiling._psutil.cache_clear()
+    try:
+        with profiling.step("paso", rows=10):
+            with profiling.step("interno"):
+                pass
+        record = profiling._local.last
+    finally:
+        profiling._resource.cache_clear()
+        profiling._psutil.cache_clear()
+
+    assert record["rss_pico_mb"] is None and record["pasos"][0]["rss_pico_mb"] is None
+    assert record["cpu_segundos"] >= 0
+    text = profiling.prometheus_text([{"etapa": "paso", "ultima": record, "ejecuciones": 1,
+                                       "segundos_acumulados": 0.1, "timestamp": 0}])
+    assert "anemia_stage_peak_rss_bytes{" not in text
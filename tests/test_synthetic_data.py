@@ -0,0 +1,23 @@
+import filecmp
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_dataset, load_schema
+
+
+def test_generated_rows_follow_the_validation_schema(raw_df):
+    columns, types, anemia_dist = load_schema()
+
+    assert raw_df.columns.tolist() == columns
+    assert {c: str(raw_df[c].dtype) for c in columns} == types
+    observed = raw_df["Anemia"].value_counts(normalize=True) * 100
+    for label, pct in anemia_dist.items():
+        assert observed.get(label, 0.0) == pytest.approx(pct, abs=3.0)
+
+
+def test_same_seed_writes_the_same_file(tmp_path):
+    first, second = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    generate_dataset(900, first, chunk_rows=400, seed=5)
+    generate_dataset(900, second, chunk_rows=400, seed=5)
+
+    assert filecmp.cmp(first, second, shallow=False)
+    assert len(pd.read_csv(first, encoding="utf-8-sig")) == 900
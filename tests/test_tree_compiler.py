@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from src.tree_compiler import compile_pipeline
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "XGBoost"])
+def test_compiled_forest_matches_native_predict_proba(pipelines, raw_df, name):
+    pipeline = pipelines[name]
+    X = pipeline.transform(raw_df.head(500))
+    compiled = compile_pipeline(pipeline)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), pipeline.model.predict_proba(X), atol=1e-5)
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "XGBoost"])
+def test_single_row_path_matches_native_predict_proba(pipelines, raw_df, name):
+    pipeline = pipelines[name]
+    X = pipeline.transform(raw_df.head(30))
+    compiled = compile_pipeline(pipeline)
+    native = pipeline.model.predict_proba(X)
+
+    for i in range(X.shape[0]):
+        np.testing.assert_allclose(compiled.predict_proba_row(X[i:i + 1]), native[i], atol=1e-5)
+
+
+def test_unknown_categories_match_native_predict_proba(compact_pipelines, raw_df):
+    pipeline = compact_pipelines["XGBoost"]
+    df = raw_df.head(50).copy()
+    df["Distrito"] = "DISTRITO_NUEVO"
+    X = pipeline.transform(df)
+    assert (X[:, pipeline.feature_names.index("Distrito")] == -1).all()
+
+    np.testing.assert_allclose(compile_pipeline(pipeline).predict_proba(X),
+                               pipeline.model.predict_proba(X), atol=1e-5)
@@ -0,0 +1,42 @@
+# train_external.py — Entrenamiento de XGBoost fuera de memoria sobre el CSV completo
+import argparse
+from src import config
+from src.cli import add_configuration_arguments, apply_configuration
+
+
+def parse_args(argv=None):
+    # Sin valores por defecto de config aquí: se resuelven después de --config/--set
+    parser = argparse.ArgumentParser(
+        description="Entrena XGBoost leyendo el dataset por bloques (memoria acotada).",
+        epilog="Los ajustes de src/config.py también se fijan con variables ANEMIA_<AJUSTE> "
+               "o con un archivo JSON/TOML en ANEMIA_CONFIG."
+    )
+    add_configuration_arguments(parser)
+    parser.add_argument("input", nargs="?", default=None,
+                        help="CSV crudo (default: DATASET_PATH)")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="Filas por bloque (default: EXTERNAL_CHUNK_ROWS)")
+    parser.add_argument("--dmatrix", default=None, choices=["external", "quantile"],
+                        help="Caché en disco o histograma en RAM (default: EXTERNAL_DMATRIX)")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos de XGBoost (default: N_JOBS)")
+    parser.add_argument("--no-save", action="store_true",
+                        help="Solo reportar métricas, sin guardar los artefactos de XGBoostExterno")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Antes de importar el entrenamiento: sus rutas y valores por defecto salen de config
+    apply_configuration(args.config, args.set)
+    from src.external_training import train_xgboost_external
+    train_xgboost_external(
+        args.input or config.DATASET_PATH,
+        chunk_rows=args.chunk_rows or config.EXTERNAL_CHUNK_ROWS,
+        dmatrix=args.dmatrix or config.EXTERNAL_DMATRIX,
+        n_jobs=args.workers if args.workers is not None else config.N_JOBS,
+        save=not args.no_save
+    )
+
+
+if __name__ == "__main__":
+    main()